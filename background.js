@@ -50,8 +50,48 @@ chrome.runtime.onInstalled.addListener(() => {
     }
   });
   
+  // json/corpus.json (written by data_pipeline/corpus_manifest.py): every title that has
+  // data and where its files are. Loaded once per service worker and kept in memory, so
+  // content scripts can skip pages without data without fetching anything.
+  let corpusManifestPromise = null;
+
+  function loadCorpusManifest() {
+    if (!corpusManifestPromise) {
+      corpusManifestPromise = fetch(chrome.runtime.getURL('json/corpus.json'))
+        .then(response => (response.ok ? response.json() : null))
+        .catch(() => null);
+    }
+    return corpusManifestPromise;
+  }
+
+  // Same normalization as lookup_key in data_pipeline/corpus_manifest.py
+  function normalizeLookupTitle(title) {
+    return title
+      .replace(/_/g, ' ')
+      .normalize('NFKD')
+      .replace(/[\u0300-\u036f]/g, '')
+      .replace(/\s+/g, ' ')
+      .trim()
+      .toLowerCase();
+  }
+
+  // { found: true, topic, entry }, { found: false }, or { found: null } without a manifest
+  async function lookupTopic(titles) {
+    const manifest = await loadCorpusManifest();
+    if (!manifest) return { found: null };
+    for (const title of titles) {
+      const topic = manifest.titles[normalizeLookupTitle(title)];
+      if (topic) return { found: true, topic, entry: manifest.topics[topic] };
+    }
+    return { found: false };
+  }
+
   // Listen for messages from content script or popup
   chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
+    if (message.action === 'lookupTopic') {
+      lookupTopic(message.titles || []).then(sendResponse);
+      return true; // Indicates we will respond asynchronously
+    }
     if (message.action === 'getFactsData') {
       // In a real implementation, this would make API calls to Wikipedia
       // For demonstration, we'll return mock data
@@ -67,6 +67,10 @@ function buildTextFragmentUrl(baseLink, snippet) {
     fr: [],
     ru: []
   };
+  // Sentence -> paragraph index written by the pipeline next to the facts (null if absent)
+  let matchIndex = null;
+  // Inverted index over this topic's facts, for the search box (null if absent)
+  let searchIndex = null;
   // Track user text selections
   let lastSelected = "";
   let selectionTimeout = null;
@@ -569,15 +573,76 @@ function buildTextFragmentUrl(baseLink, snippet) {
     }
   }
   
-  // Filter facts by search term
+  // Same normalization and tokenization as data_pipeline/search_index.py
+  const CJK_RUN = /([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+)/;
+
+  function normalizeSearchText(text) {
+    return text.normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+  }
+
+  // Query terms: words, and the character pairs of CJK runs (a lone CJK character as is)
+  function tokenizeSearchQuery(text) {
+    const terms = [];
+    (normalizeSearchText(text).match(/[\p{L}\p{N}_]+/gu) || []).forEach(word => {
+      word.split(CJK_RUN).forEach((piece, i) => {
+        if (!piece) return;
+        if (i % 2 === 0 || piece.length === 1) {
+          terms.push(piece);
+          return;
+        }
+        for (let c = 0; c < piece.length - 1; c++) terms.push(piece.slice(c, c + 2));
+      });
+    });
+    return terms;
+  }
+
+  function indexTermsWithPrefix(index, prefix) {
+    const terms = index.sortedTerms;
+    let low = 0;
+    let high = terms.length;
+    while (low < high) {
+      const mid = (low + high) >> 1;
+      if (terms[mid] < prefix) low = mid + 1; else high = mid;
+    }
+    const found = [];
+    for (let i = low; i < terms.length && terms[i].startsWith(prefix); i++) found.push(terms[i]);
+    return found;
+  }
+
+  // Ids of the facts containing every query term (the last one as a prefix, so results
+  // follow the typing), or null when the query has no terms
+  function searchFactIds(index, query) {
+    const tokens = tokenizeSearchQuery(query);
+    if (!tokens.length) return null;
+    const last = tokens[tokens.length - 1];
+    let matches = null;
+    for (const token of new Set(tokens)) {
+      const terms = token === last && !CJK_RUN.test(token) ? indexTermsWithPrefix(index, token) : [token];
+      const facts = new Set();
+      terms.forEach(term => {
+        const flat = index.terms[term] || [];
+        for (let i = 0; i < flat.length; i += 2) facts.add(flat[i]);
+      });
+      matches = matches ? new Set([...matches].filter(fact => facts.has(fact))) : facts;
+      if (!matches.size) break;
+    }
+    return new Set([...matches].map(fact => index.facts[fact]));
+  }
+
+  // Filter facts by search term, through the search index when the topic has one
   function filterFactsBySearch(searchTerm) {
     const factElements = document.querySelectorAll('.wikigap-fact');
+    const indexed = searchIndex && searchTerm ? searchFactIds(searchIndex, searchTerm) : null;
     let visibleCount = 0;
 
     factElements.forEach(fact => {
-      const factContent = fact.querySelector('.wikigap-fact-content').textContent.toLowerCase();
       const factLanguage = fact.querySelector('.wikigap-fact-language').textContent.toLowerCase();
-      const matches = factContent.includes(searchTerm) || factLanguage.includes(searchTerm);
+      let matches = factLanguage.includes(searchTerm);
+      if (!matches && indexed) {
+        matches = indexed.has(fact.dataset.factId);
+      } else if (!matches) {
+        matches = fact.querySelector('.wikigap-fact-content').textContent.toLowerCase().includes(searchTerm);
+      }
       
       if (matches) {
         fact.style.display = 'block';
@@ -609,28 +674,147 @@ function buildTextFragmentUrl(baseLink, snippet) {
     }
   }
   
+  // Page titles to look up in the corpus manifest: the displayed title, and the one in
+  // the URL, which keeps the redirect's name when the reader arrived through a redirect
+  function currentPageTitles() {
+    const titles = [document.title.replace(' - Wikipedia', '').trim()];
+    const match = window.location.pathname.match(/^\/wiki\/([^?#]+)/);
+    if (match) {
+      try {
+        titles.push(decodeURIComponent(match[1]));
+      } catch (e) {
+        // Malformed escape in the URL; the displayed title is enough
+      }
+    }
+    return titles;
+  }
+
+  // Ask the background worker's in-memory corpus manifest whether this page has data.
+  // Resolves to { found: true, topic, entry }, { found: false }, or { found: null } when
+  // there is no manifest, in which case the files are probed by title as before.
+  function lookupTopic(titles) {
+    return chrome.runtime.sendMessage({ action: 'lookupTopic', titles })
+      .then(response => response || { found: null })
+      .catch(() => ({ found: null }));
+  }
+
+  async function fetchJsonResource(path) {
+    const response = await fetch(chrome.runtime.getURL(`json/${path}`));
+    if (!response.ok) {
+      throw new Error('Failed to fetch ' + path);
+    }
+    return response.json();
+  }
+
+  // Merge per-language shards back into one { topic: { languages: {...} } } object
+  function mergeShards(shards) {
+    const data = {};
+    shards.forEach(shard => {
+      Object.keys(shard).forEach(person => {
+        data[person] = data[person] || { languages: {} };
+        Object.assign(data[person].languages, shard[person].languages);
+      });
+    });
+    return data;
+  }
+
+  // Load the topic's facts in the same nested shape whether the pipeline wrote a
+  // single json/{topic}.json or a sharded json/{topic}/manifest.json + {lang}.json.
+  // With a corpus manifest entry the files are known up front (the binary bundle first, see
+  // factBundle.js); without one they are probed.
+  async function loadTopicData(pageTitle, entry) {
+    if (entry) {
+      if (entry.bundle) {
+        try {
+          return await fetchFactBundle(chrome.runtime.getURL(`json/${entry.bundle}`));
+        } catch (error) {
+          console.warn("WikiGap: could not read fact bundle, falling back to JSON:", error);
+        }
+      }
+      if (entry.shards) {
+        return mergeShards(await Promise.all(Object.values(entry.shards).map(fetchJsonResource)));
+      }
+      return fetchJsonResource(entry.file);
+    }
+
+    const manifestResponse = await fetch(chrome.runtime.getURL(`json/${pageTitle}/manifest.json`))
+      .catch(() => null);
+
+    if (manifestResponse && manifestResponse.ok) {
+      const manifest = await manifestResponse.json();
+      const shards = await Promise.all(
+        Object.values(manifest.languages).map(shard => fetchJsonResource(`${pageTitle}/${shard.file}`))
+      );
+      return mergeShards(shards);
+    }
+
+    // Construct the path for the JSON file (adjust path or logic as needed)
+    const jsonFilePath = chrome.runtime.getURL(`json/${pageTitle}.json`);
+    const response = await fetch(jsonFilePath);
+    if (!response.ok) {
+      throw new Error('Failed to fetch data for ' + pageTitle);
+    }
+    return response.json();
+  }
+
+  // Same normalization as data_pipeline/match_index.py: collapse whitespace, trim, lower-case
+  function normalizeMatchText(text) {
+    return text.replace(/\s+/g, ' ').trim().toLowerCase();
+  }
+
+  // json/{topic}/match.json next to sharded output, json/{topic}.match.json otherwise
+  async function loadMatchIndex(pageTitle, entry) {
+    if (entry) {
+      return entry.match ? fetchJsonResource(entry.match) : null;
+    }
+    for (const path of [`json/${pageTitle}/match.json`, `json/${pageTitle}.match.json`]) {
+      const response = await fetch(chrome.runtime.getURL(path)).catch(() => null);
+      if (response && response.ok) {
+        return response.json();
+      }
+    }
+    return null;
+  }
+
+  // json/{topic}.search.json (see data_pipeline/search_index.py); only listed in the corpus manifest
+  async function loadSearchIndex(entry) {
+    if (!entry || !entry.search) return null;
+    const index = await fetchJsonResource(entry.search);
+    index.sortedTerms = Object.keys(index.terms).sort();
+    return index;
+  }
+
   async function fetchFacts() {
     console.log("WikiGap: Fetching facts from external JSON data...");
     // Grab the current Wikipedia article title
     const pageTitle = document.title.replace(' - Wikipedia', '').trim();
     console.log(pageTitle)
-  
-    // Construct the path for the JSON file (adjust path or logic as needed)
-    const jsonFilePath = chrome.runtime.getURL(`json/${pageTitle}.json`);
-    console.log(jsonFilePath)
+
+    // Most pages have no data: the manifest lookup answers that without any fetch
+    const lookup = await lookupTopic(currentPageTitles());
+    if (lookup.found === false) {
+      console.log("WikiGap: no data for page:", pageTitle);
+      languageFacts.zh = [];
+      languageFacts.fr = [];
+      languageFacts.ru = [];
+      totalFacts = 0;
+      return false;
+    }
+    const entry = lookup.found ? lookup.entry : null;
+    // Top-level key inside the topic file(s); differs from the page title for redirects
+    const dataKey = entry ? entry.key : pageTitle;
   
     try {
-      const response = await fetch(jsonFilePath);
-      if (!response.ok) {
-        throw new Error('Failed to fetch data for ' + pageTitle);
-      }
-       console.log("pageTitle:", pageTitle);
-  
-      // Parse JSON
-      const data = await response.json();
+      const [data, index, factSearchIndex] = await Promise.all([
+        loadTopicData(pageTitle, entry),
+        loadMatchIndex(pageTitle, entry).catch(() => null),
+        loadSearchIndex(entry).catch(() => null)
+      ]);
+      matchIndex = index;
+      searchIndex = factSearchIndex;
   
       // Bail out if no matching structure
-      if (!data[pageTitle] || !data[pageTitle].languages) {
+      if (!data[dataKey] || !data[dataKey].languages) {
         console.warn("No language data found for page:", pageTitle);
         // fallback
         languageFacts.zh = [];
@@ -648,7 +832,7 @@ function buildTextFragmentUrl(baseLink, snippet) {
       function parseLanguage(langCode) {
         let counter = 1;
         const MAX_FACTS = 40; // limit for demonstration
-        const langData = data[pageTitle].languages[langCode];
+        const langData = data[dataKey].languages[langCode];
         if (!langData || !langData.headers) return;
       
         Object.keys(langData.headers).forEach(headerKey => {
@@ -697,7 +881,7 @@ function buildTextFragmentUrl(baseLink, snippet) {
       totalFacts = languageFacts.zh.length 
                  + languageFacts.fr.length 
                  + languageFacts.ru.length;
-      console.log(`Fetched ${totalFacts} facts from ${pageTitle}.json`);
+      console.log(`Fetched ${totalFacts} facts for ${dataKey}`);
       return true;
     } catch (err) {
       // TODO: There will be an error when clicking the URL
@@ -712,13 +896,101 @@ function buildTextFragmentUrl(baseLink, snippet) {
   }
 
 
+  // Wrap the first occurrence of `sentence` inside `element` in a highlight span.
+  // Returns false if the sentence isn't in a single text node of the element.
+  function highlightSentence(element, sentence, lang, fact) {
+    const index = element.textContent.indexOf(sentence);
+    if (index === -1) return false;
+
+    // Use DOM methods to find and wrap the text node
+    const walker = document.createTreeWalker(
+      element,
+      NodeFilter.SHOW_TEXT,
+      null,
+      false
+    );
+
+    let currentNode;
+    let currentPos = 0;
+    let targetNode = null;
+    let targetIndex = 0;
+
+    // Find the text node containing our target sentence
+    while ((currentNode = walker.nextNode())) {
+      const nodeTextLength = currentNode.textContent.length;
+      if (index >= currentPos && index < currentPos + nodeTextLength) {
+        targetNode = currentNode;
+        targetIndex = index - currentPos;
+        break;
+      }
+      currentPos += nodeTextLength;
+    }
+
+    if (!targetNode) return false;
+
+    const span = document.createElement('span');
+    span.className = `wikigap-underline wikigap-underline-${lang}`;
+    span.dataset.factId = fact.id;
+
+    const beforeText = targetNode.textContent.substring(0, targetIndex);
+    const targetText = sentence;
+    const afterText = targetNode.textContent.substring(targetIndex + targetText.length);
+
+    // Create text nodes for before and after
+    const beforeTextNode = document.createTextNode(beforeText);
+    const afterTextNode = document.createTextNode(afterText);
+
+    // Set the target text as the span content
+    span.textContent = targetText;
+
+    // Replace the original text node with our sequence
+    const parentNode = targetNode.parentNode;
+    parentNode.insertBefore(beforeTextNode, targetNode);
+    parentNode.insertBefore(span, targetNode);
+    parentNode.insertBefore(afterTextNode, targetNode);
+    parentNode.removeChild(targetNode);
+
+    // Add to highlighted sentences list
+    highlightedSentences.push({
+      id: fact.id,
+      element: span,
+      fact: fact
+    });
+    return true;
+  }
+
+  // Map paragraph indices of the match index to page elements, using the
+  // normalized opening characters of each paragraph as its anchor.
+  function mapParagraphElements(textElements) {
+    const elementsByParagraph = new Map();
+    if (!matchIndex) return elementsByParagraph;
+
+    const paragraphsByAnchor = new Map();
+    matchIndex.paragraphs.forEach((paragraph, i) => {
+      if (!paragraph.anchor) return;
+      if (!paragraphsByAnchor.has(paragraph.anchor)) paragraphsByAnchor.set(paragraph.anchor, []);
+      paragraphsByAnchor.get(paragraph.anchor).push(i);
+    });
+
+    textElements.forEach(element => {
+      const anchor = normalizeMatchText(element.textContent).slice(0, matchIndex.anchor_length);
+      (paragraphsByAnchor.get(anchor) || []).forEach(i => {
+        if (!elementsByParagraph.has(i)) elementsByParagraph.set(i, element);
+      });
+    });
+    return elementsByParagraph;
+  }
+
   // Process article content to highlight relevant sentences
   function processArticleContent() {
     const contentElement = document.querySelector('.mw-parser-output');
     if (!contentElement) return;
     
     // Find all paragraphs and other text elements in the content
-    const textElements = contentElement.querySelectorAll('p, li, h1, h2, h3, h4, h5, h6');
+    const textElements = Array.from(contentElement.querySelectorAll('p, li, h1, h2, h3, h4, h5, h6'));
+    const elementsByParagraph = mapParagraphElements(textElements);
+    let indexedMatches = 0;
+    let scannedMatches = 0;
     
     // Process each language's facts
     for (const lang in languageFacts) {
@@ -728,91 +1000,27 @@ function buildTextFragmentUrl(baseLink, snippet) {
         if (!fact.relatedTexts || fact.relatedTexts.length === 0) return;
         
         fact.relatedTexts.forEach(sentence => {
-          // Try to find the sentence in the text elements
-          let found = false;
-          
-          textElements.forEach(element => {
-            console.log("Searching for snippet:", sentence);
-            console.log("In element:", element, element.textContent);
-            if (element.textContent.includes(sentence) && !found) {
-              // Try to find the exact text
-              const html = element.innerHTML;
-              const index = element.textContent.indexOf(sentence);
-              console.log("Match found at index:", index);
-              
-              if (index !== -1) {
-                // Use DOM methods to find and wrap the text node
-                const walker = document.createTreeWalker(
-                  element,
-                  NodeFilter.SHOW_TEXT,
-                  null,
-                  false
-                );
-                
-                let currentNode;
-                let currentPos = 0;
-                let targetNode = null;
-                let targetIndex = 0;
-                
-                // Find the text node containing our target sentence
-                while ((currentNode = walker.nextNode())) {
-                  const nodeTextLength = currentNode.textContent.length;
-                  if (index >= currentPos && index < currentPos + nodeTextLength) {
-                    targetNode = currentNode;
-                    targetIndex = index - currentPos;
-                    break;
-                  }
-                  currentPos += nodeTextLength;
-                }
-                
-                if (targetNode) {
-                  const span = document.createElement('span');
-                  span.className = `wikigap-underline wikigap-underline-${lang}`;
-                  span.dataset.factId = fact.id;
-                  
-                  const beforeText = targetNode.textContent.substring(0, targetIndex);
-                  const targetText = sentence;
-                  const afterText = targetNode.textContent.substring(targetIndex + targetText.length);
-                  
-                  // Create text nodes for before and after
-                  const beforeTextNode = document.createTextNode(beforeText);
-                  const afterTextNode = document.createTextNode(afterText);
-                  
-                  // Set the target text as the span content
-                  span.textContent = targetText;
+          if (typeof sentence !== 'string' || !sentence) return;
 
-                  // Log before insertion
-                  console.log("Found target node:", targetNode, "with text:", targetNode.textContent);
-                  console.log("Before insertion, parent HTML is:", targetNode.parentNode.innerHTML);
-                  console.log("Target index:", targetIndex, "and snippet:", sentence);
+          // Jump straight to the paragraphs the match index points at
+          const hits = matchIndex ? matchIndex.sentences[normalizeMatchText(sentence)] || [] : [];
+          const candidates = hits.map(([paragraphIndex]) => elementsByParagraph.get(paragraphIndex)).filter(Boolean);
+          if (candidates.some(element => highlightSentence(element, sentence, lang, fact))) {
+            indexedMatches++;
+            return;
+          }
 
-                  // Replace the original text node with our sequence
-                  const parentNode = targetNode.parentNode;
-                  parentNode.insertBefore(beforeTextNode, targetNode);
-                  parentNode.insertBefore(span, targetNode);
-                  parentNode.insertBefore(afterTextNode, targetNode);
-                  parentNode.removeChild(targetNode);
-                  console.log("After insertion, parent HTML is now:", parentNode.innerHTML);
-                  console.log("Created highlight span:", span);
-                  
-                  found = true;
-                  
-                  // Add to highlighted sentences list
-                  highlightedSentences.push({
-                    id: fact.id,
-                    element: span,
-                    fact: fact
-                  });
-                }
-              }
-            }
-          });
+          // Not indexed (or the page changed since scraping): scan the page once for it
+          if (textElements.some(element => highlightSentence(element, sentence, lang, fact))) {
+            scannedMatches++;
+          }
         });
         
         // Create fact card once per fact
         createFactCard(fact, lang);
       });
     }
+    console.log(`WikiGap: highlighted ${indexedMatches} sentences via the match index, ${scannedMatches} by scanning`);
     
     // Add event listeners to the highlighted sentences
     highlightedSentences.forEach(item => {
@@ -0,0 +1,126 @@
+import os
+import re
+import time
+
+import loguru
+
+logger = loguru.logger
+
+# ---------------------------
+# Annotation catalog
+# ---------------------------
+# The annotation directory collects files from several runs:
+#
+#   data_pipeline/wikigap_data/annotation_{date}_{topic}_{lang}.json
+#
+# scan_annotations() indexes them by (topic, lang) -> {date: file name} and
+# latest_annotations() picks the newest date of every unit, so the pipeline
+# follows whatever was annotated last instead of a hard-coded date.
+# AnnotationWatcher polls the directory for new, changed or deleted files and
+# reports the (topic, lang) units they belong to; a file is only reported once
+# its size and mtime have stayed the same for one poll, so half-written files
+# are never picked up.
+
+ANNOTATION_PATTERN = re.compile(r"^annotation_(\d{4}-\d{2}-\d{2})_(.+)_([a-z]{2,3}(?:-[A-Za-z]+)?)\.json$")
+WATCH_INTERVAL = 1.0  # Seconds between polls
+
+
+def annotation_file_name(topic, lang, date):
+    return f"annotation_{date}_{topic}_{lang}.json"
+
+
+def parse_annotation_file_name(file_name):
+    """'annotation_2025-03-24_Peking duck_fr.json' -> ('Peking duck', 'fr', '2025-03-24'), None otherwise."""
+    match = ANNOTATION_PATTERN.match(file_name)
+    if not match:
+        return None
+    date, topic, lang = match.groups()
+    return topic, lang, date
+
+
+def scan_annotations(directory):
+    """{(topic, lang): {date: file name}} for every annotation file in `directory`."""
+    catalog = {}
+    if not os.path.isdir(directory):
+        logger.warning(f"Annotation directory {directory} does not exist")
+        return catalog
+    for file_name in sorted(os.listdir(directory)):
+        parsed = parse_annotation_file_name(file_name)
+        if parsed is None:
+            continue
+        topic, lang, date = parsed
+        catalog.setdefault((topic, lang), {})[date] = file_name
+    return catalog
+
+
+def latest_annotations(catalog):
+    """{(topic, lang): (date, file name)} with the newest date of every unit (ISO dates sort as strings)."""
+    latest = {}
+    for unit, files in catalog.items():
+        date = max(files)
+        latest[unit] = (date, files[date])
+    return latest
+
+
+def latest_annotation_file(directory, topic, lang):
+    """File name of the newest annotation for (topic, lang), or None if there is none."""
+    latest = latest_annotations(scan_annotations(directory)).get((topic, lang))
+    return latest[1] if latest else None
+
+
+def catalog_topics(catalog):
+    """Topics in the catalog, in first-seen (file name) order."""
+    return list(dict.fromkeys(topic for topic, _ in catalog))
+
+
+class AnnotationWatcher:
+    """
+    watcher.poll() -> set of (topic, lang) units whose annotation files appeared, changed or
+    disappeared since the previous report. The first poll takes a baseline and reports nothing.
+    """
+
+    def __init__(self, directory, interval=WATCH_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.reported = None
+        self.previous = None
+
+    def _snapshot(self):
+        snapshot = {}
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return snapshot
+        for file_name in names:
+            if parse_annotation_file_name(file_name) is None:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, file_name))
+            except FileNotFoundError:
+                continue
+            snapshot[file_name] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self):
+        snapshot = self._snapshot()
+        previous, self.previous = self.previous, snapshot
+        if self.reported is None:
+            self.reported = snapshot
+            return set()
+        # Wait until the directory holds still for one interval before reporting
+        if snapshot != previous:
+            return set()
+        changed = {
+            name for name in set(snapshot) | set(self.reported)
+            if snapshot.get(name) != self.reported.get(name)
+        }
+        self.reported = snapshot
+        return {parse_annotation_file_name(name)[:2] for name in changed}
+
+    def watch(self):
+        """Yield every non-empty set of changed units, forever."""
+        while True:
+            units = self.poll()
+            if units:
+                yield units
+            time.sleep(self.interval)
@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import mmap
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------
+# Columnar annotation reader
+# ---------------------------
+# The annotation_*.json files are written in a Polars-style columnar layout:
+#   {"columns": [{"name": ..., "datatype": ..., "bit_settings": ..., "values": [...]}, ...]}
+# Instead of json.load-ing the whole tree, we scan the file's bytes once through a
+# read-only mmap, record where each column's "values" array starts and ends, and only
+# decode the arrays for the requested column names. Unrequested columns are skipped
+# without building any Python objects for them, and the file is never copied into one
+# big string, so memory grows with the requested columns rather than the file.
+
+# Everything up to the next structural bracket, strings (escapes included) consumed whole.
+# The patterns run over UTF-8 bytes: '"', '\\' and the brackets never occur inside a
+# multi-byte sequence.
+_SKIP_RUN = re.compile(rb'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+# A scalar: a string, or a number/true/false/null up to the next delimiter
+_SCALAR = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[^\s,\]}]+')
+_WHITESPACE = re.compile(rb"\s*")
+_INT_DATATYPES = ("Int64", "Int32", "UInt32", "UInt64")
+
+
+class ColumnarLayoutError(ValueError):
+    """Raised when a file does not follow the {"columns": [...]} layout."""
+    pass
+
+
+def _skip_ws(buf, pos):
+    return _WHITESPACE.match(buf, pos).end()
+
+
+def _expect(buf, pos, char):
+    pos = _skip_ws(buf, pos)
+    if buf[pos:pos + 1] != char:
+        raise ColumnarLayoutError(f"Expected {char!r} at offset {pos}")
+    return pos + 1
+
+
+def _skip_value(buf, pos):
+    """
+    Return the offset right after the JSON value starting at `pos`,
+    without materializing anything.
+    """
+    if buf[pos:pos + 1] not in (b"[", b"{"):
+        match = _SCALAR.match(buf, pos)
+        if match is None:
+            raise ColumnarLayoutError(f"Malformed value at offset {pos}")
+        return match.end()
+
+    depth = 0
+    while True:
+        pos = _SKIP_RUN.match(buf, pos).end()
+        char = buf[pos:pos + 1]
+        pos += 1
+        if char in (b"[", b"{"):
+            depth += 1
+        elif char in (b"]", b"}"):
+            depth -= 1
+            if depth == 0:
+                return pos
+        else:
+            # End of input, or a string that never closes
+            raise ColumnarLayoutError("Unterminated JSON container")
+
+
+def _decode_value(buf, pos):
+    """Decode the JSON value starting at `pos` from just its own bytes; returns (value, end offset)."""
+    end = _skip_value(buf, pos)
+    return json.loads(buf[pos:end]), end
+
+
+def _iter_object_keys(buf, pos):
+    """
+    Walk the JSON object starting at `pos`, yielding (key, value_start).
+    The caller sends back the offset right after the value it consumed
+    (or None to have the value skipped). Returns the offset after the object.
+    """
+    pos = _expect(buf, pos, b"{")
+    pos = _skip_ws(buf, pos)
+    if buf[pos:pos + 1] == b"}":
+        return pos + 1
+
+    while True:
+        pos = _skip_ws(buf, pos)
+        key, pos = _decode_value(buf, pos)
+        start = _skip_ws(buf, _expect(buf, pos, b":"))
+        end = yield key, start
+        if end is None:
+            end = _skip_value(buf, start)
+
+        pos = _skip_ws(buf, end)
+        if buf[pos:pos + 1] == b",":
+            pos += 1
+            continue
+        if buf[pos:pos + 1] == b"}":
+            return pos + 1
+        raise ColumnarLayoutError(f"Malformed object at offset {pos}")
+
+
+def _walk_object(buf, pos, handle):
+    """
+    Drive _iter_object_keys, letting `handle(key, start)` return the consumed end offset or None.
+    Returns the offset after the object.
+    """
+    walker = _iter_object_keys(buf, pos)
+    try:
+        key, start = next(walker)
+        while True:
+            key, start = walker.send(handle(key, start))
+    except StopIteration as stop:
+        return stop.value
+
+
+def _iter_array_items(buf, pos):
+    """
+    Yield the start offset of each item of the JSON array at `pos`; the caller sends back
+    its end (or None to have it skipped). Returns the offset after the array.
+    """
+    pos = _expect(buf, pos, b"[")
+    pos = _skip_ws(buf, pos)
+    if buf[pos:pos + 1] == b"]":
+        return pos + 1
+
+    while True:
+        start = _skip_ws(buf, pos)
+        end = yield start
+        if end is None:
+            end = _skip_value(buf, start)
+
+        pos = _skip_ws(buf, end)
+        if buf[pos:pos + 1] == b",":
+            pos += 1
+            continue
+        if buf[pos:pos + 1] == b"]":
+            return pos + 1
+        raise ColumnarLayoutError(f"Malformed array at offset {pos}")
+
+
+def _read_column(buf, pos, target_names):
+    """
+    Parse one column object. Returns (name, datatype, values, end_offset);
+    values is None when the column was not requested.
+    """
+    column = {"name": None, "datatype": None, "values": None, "values_start": None}
+
+    def handle(key, start):
+        if key in ("name", "datatype"):
+            column[key], end = _decode_value(buf, start)
+            return end
+        if key == "values":
+            if column["name"] is not None:
+                if column["name"] not in target_names:
+                    return None
+                column["values"], end = _decode_value(buf, start)
+                return end
+            # "values" came before "name": remember where it is and decide later
+            column["values_start"] = start
+        return None
+
+    end = _walk_object(buf, pos, handle)
+
+    if column["values"] is None and column["values_start"] is not None and column["name"] in target_names:
+        column["values"] = _decode_value(buf, column["values_start"])[0]
+    return column["name"], column["datatype"], column["values"], end
+
+
+def scan_columns(buf, target_names):
+    """
+    Scan a columnar annotation document (UTF-8 bytes, an mmap, or str) and decode only
+    the requested columns. Returns { name: (datatype, values) } for every name in
+    target_names that exists.
+    """
+    if isinstance(buf, str):
+        buf = buf.encode("utf-8")
+    columns = {}
+    found = []
+
+    def handle_top_level(key, start):
+        if key != "columns":
+            return None
+        found.append(True)
+        items = _iter_array_items(buf, start)
+        try:
+            col_start = next(items)
+            while True:
+                name, datatype, values, col_end = _read_column(buf, col_start, target_names)
+                if values is not None:
+                    columns[name] = (datatype, values)
+                col_start = items.send(col_end)
+        except StopIteration as stop:
+            return stop.value
+
+    _walk_object(buf, _skip_ws(buf, 0), handle_top_level)
+    if not found:
+        raise ColumnarLayoutError("No top-level 'columns' array")
+    return columns
+
+
+def _flatten_list_value(value):
+    """
+    Nested list cells come as {'values': [...]}; deeper levels nest the same way.
+    Flatten them down to a plain list of leaf values (None stays None).
+    """
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        value = value.get("values", [])
+    flat = []
+    for item in value:
+        if isinstance(item, dict):
+            flat.extend(_flatten_list_value(item))
+        else:
+            flat.append(item)
+    return flat
+
+
+def to_typed_column(datatype, values):
+    """Convert raw column values into a typed pandas-ready array based on the Polars datatype."""
+    if isinstance(datatype, dict) and "List" in datatype:
+        column = np.empty(len(values), dtype=object)
+        column[:] = [_flatten_list_value(v) for v in values]
+        return column
+
+    # Nulls give the dtypes pd.DataFrame(values) would: ints become float64 with NaN
+    # (as they also come back from the Parquet intermediates), booleans stay objects
+    has_nulls = any(v is None for v in values)
+    if datatype in _INT_DATATYPES and not has_nulls:
+        return np.asarray(values, dtype=np.int64)
+    if datatype in _INT_DATATYPES or datatype in ("Float64", "Float32"):
+        return np.asarray([np.nan if v is None else v for v in values], dtype=np.float64)
+    if datatype == "Boolean" and not has_nulls:
+        return np.asarray(values, dtype=bool)
+
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def read_columnar_annotation(file_path, target_names):
+    """
+    Read only `target_names` from a columnar annotation JSON file into a DataFrame.
+    Raises ColumnarLayoutError if the file is not in the columnar layout.
+    """
+    with open(file_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise ColumnarLayoutError("Empty file")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            columns = scan_columns(buf, target_names)
+    if not columns:
+        return pd.DataFrame()
+
+    # Pad shorter columns with None so every column has the same length
+    max_length = max(len(values) for _, values in columns.values())
+    data = {}
+    for name, (datatype, values) in columns.items():
+        if len(values) < max_length:
+            values = values + [None] * (max_length - len(values))
+        data[name] = to_typed_column(datatype, values)
+
+    return pd.DataFrame(data)
@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+
+import loguru
+
+logger = loguru.logger
+
+# ---------------------------
+# Indexed article store
+# ---------------------------
+# All prescraped articles in one file, replacing the per-article dill pickles.
+#
+#   [file header]  MAGIC (8 bytes) | version u32 | index_offset u64 | index_length u64
+#   [articles]     one block per article:
+#                    record_count u32
+#                    record_count x (kind u8 | level u8 | text_offset u32 | text_length u32)
+#                    UTF-8 text blob (offsets are relative to the blob start)
+#   [index]        JSON: {"<title>\t<lang>": [block_offset, block_length], ...}
+#
+# Opening the store maps the file and parses only the small JSON index.
+# Loading an article is a seek into the map; its strings are sliced from the
+# mapped blob (memoryview, no copy) and only decoded when asked for.
+#
+# The pickles stay next to the store on purpose: they are what the InfoGap scraper
+# produces, so they are the source and the store is built from them
+# (`python data_pipeline/article_store.py migrate`; the same pickles always give the
+# same bytes). A newly scraped article is read from its pickle until the next
+# migrate. tests/test_article_store.py fails if the store and the pickles disagree.
+
+ARTICLE_STORE_PATH = "data_pipeline/wiki_food/articles.wgstore"
+MAGIC = b"WGART001"
+VERSION = 1
+
+_FILE_HEADER = struct.Struct("<8sIQQ")
+_COUNT = struct.Struct("<I")
+_RECORD = struct.Struct("<BBII")
+
+KIND_PARAGRAPH = 0
+KIND_HEADER = 1
+
+
+class ArticleNotFoundError(KeyError):
+    """Raised when an article is not in the store."""
+    pass
+
+
+def _index_key(title, lang):
+    return f"{title}\t{lang}"
+
+
+def _encode_article(blocks):
+    """Encode a list of {'header_N': text} / {'paragraph': text} dicts into one article block."""
+    records = []
+    blob = bytearray()
+    for item in blocks:
+        header_key = next((k for k in item.keys() if k.startswith("header")), None)
+        if header_key:
+            level_str = header_key.split("_")[1] if "_" in header_key else "1"
+            kind, level, text = KIND_HEADER, int(level_str) if level_str.isdigit() else 1, item[header_key]
+        elif "paragraph" in item:
+            kind, level, text = KIND_PARAGRAPH, 0, item["paragraph"]
+        else:
+            continue
+        encoded = (text or "").encode("utf-8")
+        records.append(_RECORD.pack(kind, level, len(blob), len(encoded)))
+        blob += encoded
+    return _COUNT.pack(len(records)) + b"".join(records) + bytes(blob)
+
+
+def write_article_store(articles, path=ARTICLE_STORE_PATH):
+    """
+    Write {(title, lang): blocks} to a new store file (atomically replaced).
+    Returns the number of articles written.
+    """
+    tmp_path = f"{path}.tmp"
+    index = {}
+    with open(tmp_path, "wb") as f:
+        f.write(_FILE_HEADER.pack(MAGIC, VERSION, 0, 0))
+        for (title, lang), blocks in sorted(articles.items()):
+            block = _encode_article(blocks)
+            index[_index_key(title, lang)] = [f.tell(), len(block)]
+            f.write(block)
+        index_offset = f.tell()
+        index_bytes = json.dumps(index, ensure_ascii=False).encode("utf-8")
+        f.write(index_bytes)
+        f.seek(0)
+        f.write(_FILE_HEADER.pack(MAGIC, VERSION, index_offset, len(index_bytes)))
+    os.replace(tmp_path, path)
+    return len(index)
+
+
+class ArticleView:
+    """Read-only view over one article's records inside the mapped store."""
+
+    def __init__(self, buffer, offset):
+        (self.count,) = _COUNT.unpack_from(buffer, offset)
+        self._buffer = buffer
+        self._records_offset = offset + _COUNT.size
+        self._blob_offset = self._records_offset + self.count * _RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def record(self, i):
+        """(kind, level, memoryview of the UTF-8 text) for record i; no copy is made."""
+        kind, level, text_offset, text_length = _RECORD.unpack_from(
+            self._buffer, self._records_offset + i * _RECORD.size
+        )
+        start = self._blob_offset + text_offset
+        return kind, level, self._buffer[start:start + text_length]
+
+    def iter_records(self):
+        for i in range(self.count):
+            yield self.record(i)
+
+    def to_blocks(self):
+        """Decode into the same list-of-dicts shape the pickles held."""
+        blocks = []
+        for kind, level, text in self.iter_records():
+            key = f"header_{level}" if kind == KIND_HEADER else "paragraph"
+            blocks.append({key: str(text, "utf-8")})
+        return blocks
+
+
+class ArticleStore:
+    """Memory-mapped article store. Safe to open from many processes at once."""
+
+    def __init__(self, path=ARTICLE_STORE_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        magic, version, index_offset, index_length = _FILE_HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a v{VERSION} article store")
+        self._index = json.loads(bytes(self._buffer[index_offset:index_offset + index_length]))
+
+    def __contains__(self, key):
+        title, lang = key
+        return _index_key(title, lang) in self._index
+
+    def keys(self):
+        return [tuple(key.split("\t", 1)) for key in self._index]
+
+    def view(self, title, lang):
+        entry = self._index.get(_index_key(title, lang))
+        if entry is None:
+            raise ArticleNotFoundError(f"{title} ({lang}) is not in {self.path}")
+        return ArticleView(self._buffer, entry[0])
+
+    def raw_bytes(self, title, lang):
+        """The encoded article block, e.g. for content hashing."""
+        entry = self._index.get(_index_key(title, lang))
+        if entry is None:
+            raise ArticleNotFoundError(f"{title} ({lang}) is not in {self.path}")
+        offset, length = entry
+        return bytes(self._buffer[offset:offset + length])
+
+    def load_blocks(self, title, lang):
+        return self.view(title, lang).to_blocks()
+
+    def close(self):
+        self._buffer.release()
+        self._mmap.close()
+        self._file.close()
+
+
+_STORES = {}
+
+
+def get_article_store(path=ARTICLE_STORE_PATH):
+    """One mapping per (process, path); returns None if the store hasn't been built."""
+    key = (os.getpid(), path)
+    if key not in _STORES:
+        _STORES[key] = ArticleStore(path) if os.path.exists(path) else None
+    return _STORES[key]
+
+
+# ---------------------------
+# Migration from dill pickles
+# ---------------------------
+def migrate_pickles(src_dir, out_path=ARTICLE_STORE_PATH):
+    """Convert every '{title}_{lang}.pkl' in src_dir into a single article store."""
+    import dill
+
+    articles = {}
+    for filename in sorted(os.listdir(src_dir)):
+        if not filename.endswith(".pkl"):
+            continue
+        title, _, lang = filename[:-len(".pkl")].rpartition("_")
+        with open(os.path.join(src_dir, filename), "rb") as f:
+            blocks = dill.load(f)
+        if not isinstance(blocks, list):
+            logger.warning(f"{filename} doesn't contain a list, skipping.")
+            continue
+        articles[(title, lang)] = blocks
+
+    count = write_article_store(articles, out_path)
+    logger.info(f"Wrote {count} articles to {out_path}")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build/inspect the WikiGap article store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Convert *.pkl articles into one store file")
+    migrate.add_argument("--src", default="data_pipeline/wiki_food")
+    migrate.add_argument("--out", default=ARTICLE_STORE_PATH)
+
+    inspect = subparsers.add_parser("list", help="List the articles in a store")
+    inspect.add_argument("--path", default=ARTICLE_STORE_PATH)
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate_pickles(args.src, args.out)
+    else:
+        store = ArticleStore(args.path)
+        for title, lang in store.keys():
+            sys.stdout.write(f"{lang}\t{len(store.view(title, lang))}\t{title}\n")
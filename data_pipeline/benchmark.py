@@ -0,0 +1,394 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+from contextlib import contextmanager
+
+import dill
+import pandas as pd
+import loguru
+
+import process_annotations
+from process_annotations import (
+    LANG_CODE_MAPPING,
+    LANG_CODE_MAPPING_HEADER,
+    OUTPUT_BUNDLE_COMPRESSION,
+    TARGET_NAMES,
+    attach_headers,
+    dedup_facts,
+    df_to_nested_json,
+    iter_nested_groups,
+    process_json_file,
+    process_paragraphs_with_headers,
+    translate_facts,
+    translate_headers,
+)
+from topic_writer import write_topic_json
+from topic_bundle import bundle_path, write_topic_bundle
+from search_index import build_search_index, search_index_path, write_corpus_search_index, write_search_index
+from corpus_manifest import topic_entry, update_corpus_manifest
+from frame_schema import concat_frames
+
+logger = loguru.logger
+
+# ---------------------------
+# Pipeline benchmark
+# ---------------------------
+# Generates a synthetic corpus in the same columnar layout as data_pipeline/wikigap_data
+# (plus matching article pickles) and times the hot pipeline functions on it, with
+# translation and Wikidata replaced by local stubs so runs are offline and repeatable.
+# The topic outputs (JSON, search index, bundle) and the corpus manifest and search
+# index are written under the corpus directory, the same way nest_topics writes them
+# to json/; the match index is left out, as it needs the English article of a real topic.
+# Every run is appended to RESULTS_PATH with the git commit it ran on, and --compare
+# prints the latest run against the previous one at the same scale.
+#
+#   python data_pipeline/benchmark.py --topics 6 --facts 300 --repeats 5 --compare
+
+CORPUS_DIR = "data_pipeline/.cache/benchmark_corpus"
+RESULTS_PATH = "data_pipeline/benchmark_results/results.jsonl"
+TOPICS = 6
+LANGUAGES = ["ru", "fr", "zh"]
+FACTS = 300  # rows per annotation file
+PARAGRAPHS = 80  # paragraphs per synthetic article
+REPEATS = 5
+SEED = 0
+DATE = "2000-01-01"
+
+STAGES = ["process_json_file", "process_paragraphs_with_headers", "attach_headers", "translate_stub", "merge",
+          "df_to_nested_json", "write_topic_json", "search_index", "bundle", "corpus_manifest", "corpus_search"]
+
+_ALPHABETS = {
+    "en": "abcdefghijklmnopqrstuvwxyz",
+    "fr": "abcdefghijklmnopqrstuvwxyzéèàç",
+    "ru": "абвгдеёжзийклмнопрстуфхцчшщыэюя",
+    "zh": "的一是不了人我在有他这中大来上国个到说们为子和你地出道也时年",
+}
+
+
+# ---------------------------
+# Synthetic corpus
+# ---------------------------
+def synthetic_sentence(rng, lang, words=12):
+    alphabet = _ALPHABETS.get(lang, _ALPHABETS["en"])
+    if lang == "zh":
+        return "".join(rng.choice(alphabet) for _ in range(words * 2)) + "。"
+    sentence = " ".join("".join(rng.choice(alphabet) for _ in range(rng.randint(2, 9))) for _ in range(words))
+    return sentence.capitalize() + "."
+
+
+def synthetic_article(rng, lang, paragraphs=PARAGRAPHS):
+    """Content blocks like the prescraped pickles: header_1/header_2 dicts between paragraphs."""
+    blocks = []
+    for i in range(paragraphs):
+        if i and i % 8 == 0:
+            blocks.append({"header_1": synthetic_sentence(rng, lang, 2).rstrip(".。")})
+        elif i and i % 3 == 0:
+            blocks.append({"header_2": synthetic_sentence(rng, lang, 3).rstrip(".。")})
+        blocks.append({"paragraph": " ".join(synthetic_sentence(rng, lang) for _ in range(rng.randint(2, 6)))})
+    return blocks
+
+
+def _column(name, datatype, values):
+    return {"name": name, "datatype": datatype, "bit_settings": "", "values": values}
+
+
+def _list_cell(values, datatype="Utf8"):
+    return _column("", datatype, values)
+
+
+def synthetic_annotation(rng, topic, lang, facts=FACTS, paragraphs=PARAGRAPHS):
+    """One annotation file's {"columns": [...]} dict, EN and target-language rows mixed."""
+    rows = []
+    for i in range(facts):
+        row_lang = rng.choice(["en", lang])
+        tgt_sentences = [[synthetic_sentence(rng, lang)] for _ in range(rng.randint(1, 3))]
+        rows.append({
+            "fact": synthetic_sentence(rng, row_lang),
+            "fact_index": i,
+            "fact_aligned_sentence": synthetic_sentence(rng, row_lang, 20),
+            "src_context": [synthetic_sentence(rng, row_lang, 16) for _ in range(3)],
+            "tgt_contexts": [[synthetic_sentence(rng, lang, 16)] for _ in range(len(tgt_sentences))],
+            "tgt_fact_indices": [float(rng.randrange(facts)) for _ in range(len(tgt_sentences))],
+            "tgt_fact_aligned_sentences": tgt_sentences,
+            "paragraph_index": rng.randrange(paragraphs),
+            "intersection_label": rng.choice(["no", "no", "no", "yes", "yes"]),
+            "language": row_lang,
+        })
+
+    def values(name):
+        return [row[name] for row in rows]
+
+    return {"columns": [
+        _column("fact", "Utf8", values("fact")),
+        _column("fact_index", "Int64", values("fact_index")),
+        _column("person_name", "Utf8", [topic] * facts),
+        _column("fact_aligned_sentence", "Utf8", values("fact_aligned_sentence")),
+        _column("src_context", {"List": "Utf8"}, [_list_cell(v) for v in values("src_context")]),
+        _column("tgt_contexts", {"List": {"List": "Utf8"}},
+                [_list_cell([_list_cell(inner) for inner in v], {"List": "Utf8"}) for v in values("tgt_contexts")]),
+        _column("tgt_fact_indices", {"List": "Float64"}, [_list_cell(v, "Float64") for v in values("tgt_fact_indices")]),
+        _column("tgt_fact_aligned_sentences", {"List": {"List": "Utf8"}},
+                [_list_cell([_list_cell(inner) for inner in v], {"List": "Utf8"})
+                 for v in values("tgt_fact_aligned_sentences")]),
+        _column("paragraph_index", "Int64", values("paragraph_index")),
+        _column("intersection_label", "Utf8", values("intersection_label")),
+        _column("language", "Utf8", values("language")),
+    ]}
+
+
+def generate_corpus(corpus_dir=CORPUS_DIR, topics=TOPICS, languages=LANGUAGES, facts=FACTS,
+                    paragraphs=PARAGRAPHS, seed=SEED):
+    """
+    Write annotation_{DATE}_{topic}_{lang}.json files and {title}_{lang}.pkl articles under
+    corpus_dir. The same arguments always produce the same bytes.
+    Returns [(topic, lang, annotation_path, tgt_article_path), ...].
+    """
+    rng = random.Random(seed)
+    os.makedirs(corpus_dir, exist_ok=True)
+    units = []
+    for t in range(topics):
+        topic = f"Topic {t:03d}"
+        with open(os.path.join(corpus_dir, f"{topic}_en.pkl"), "wb") as f:
+            dill.dump(synthetic_article(rng, "en", paragraphs), f)
+        for lang in languages:
+            article_path = os.path.join(corpus_dir, f"{topic}_{lang}.pkl")
+            with open(article_path, "wb") as f:
+                dill.dump(synthetic_article(rng, lang, paragraphs), f)
+            annotation_path = os.path.join(corpus_dir, f"annotation_{DATE}_{topic}_{lang}.json")
+            with open(annotation_path, "w", encoding="utf-8") as f:
+                json.dump(synthetic_annotation(rng, topic, lang, facts, paragraphs), f, ensure_ascii=False)
+            units.append((topic, lang, annotation_path, article_path))
+    return units
+
+
+# ---------------------------
+# Stubs
+# ---------------------------
+@contextmanager
+def stubbed_wikidata():
+    """Resolve every wiki link locally instead of through the Wikidata resolver."""
+    original = process_annotations.get_tgt_wiki_links
+    process_annotations.get_tgt_wiki_links = lambda name, src_lang, tgt_langs: {
+        tgt_lang: f"https://{tgt_lang}.wikipedia.org/wiki/{name.replace(' ', '_')}" for tgt_lang in tgt_langs
+    }
+    try:
+        yield
+    finally:
+        process_annotations.get_tgt_wiki_links = original
+
+
+@contextmanager
+def stubbed_translation():
+    """Route translate_headers/translate_facts to the offline, uncached stub backend."""
+    names = ("HEADER_BACKEND", "HEADER_BACKEND_OPTIONS", "FACT_BACKEND", "FACT_BACKEND_OPTIONS")
+    original = {name: getattr(process_annotations, name) for name in names}
+    process_annotations.HEADER_BACKEND = process_annotations.FACT_BACKEND = "stub"
+    process_annotations.HEADER_BACKEND_OPTIONS = process_annotations.FACT_BACKEND_OPTIONS = {}
+    try:
+        yield
+    finally:
+        for name, value in original.items():
+            setattr(process_annotations, name, value)
+
+
+def stub_translate(df, lang):
+    """The pipeline's translation steps, run against the stub backend."""
+    with stubbed_translation():
+        df = translate_headers(df, LANG_CODE_MAPPING_HEADER.get(lang, lang), "en")
+        df = dedup_facts(df)
+        return translate_facts(df, LANG_CODE_MAPPING.get(lang, lang), "English")
+
+
+# ---------------------------
+# Timing
+# ---------------------------
+def _timed(totals, stage, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    totals[stage] = totals.get(stage, 0.0) + time.perf_counter() - start
+    return result
+
+
+def _count_rows(rows, stage, n):
+    rows[stage] = rows.get(stage, 0) + n
+
+
+def run_once(units, output_dir):
+    """One pass over the corpus. Returns ({stage: seconds summed over units/topics}, {stage: rows})."""
+    totals, rows = {}, {}
+    dfs_by_topic = {}
+    facts_by_topic = {}
+    corpus_entries = {}
+    index_paths = {}
+    for topic, lang, annotation_path, article_path in units:
+        df = _timed(totals, "process_json_file", process_json_file, annotation_path, TARGET_NAMES)
+        with open(article_path, "rb") as f:
+            blocks = dill.load(f)
+        paragraph_table = _timed(totals, "process_paragraphs_with_headers", process_paragraphs_with_headers, blocks)
+        df_tgt = df[df["language"] != "en"].copy()
+        df_tgt = _timed(totals, "attach_headers", attach_headers, df_tgt, paragraph_table)
+        df_filtered = df_tgt[df_tgt["intersection_label"] == "no"]
+        df_filtered = df_filtered.where(pd.notna(df_filtered), None)
+        df_translated = _timed(totals, "translate_stub", stub_translate, df_filtered.copy(), lang)
+        dfs_by_topic.setdefault(topic, []).append(df_translated)
+        facts_by_topic.setdefault(topic, {})[lang] = len(df_translated)
+
+        _count_rows(rows, "process_json_file", len(df))
+        _count_rows(rows, "process_paragraphs_with_headers", len(paragraph_table))
+        _count_rows(rows, "attach_headers", len(df_tgt))
+        _count_rows(rows, "translate_stub", len(df_filtered))
+
+    with stubbed_wikidata():
+        for topic, dfs in dfs_by_topic.items():
+            # concat_frames converts its inputs in place; later passes start from fresh frames anyway
+            df_merged = _timed(totals, "merge", concat_frames, dfs)
+            df_merged = df_merged.where(df_merged.notna(), None)
+            _count_rows(rows, "merge", len(df_merged))
+            _timed(totals, "df_to_nested_json", df_to_nested_json, df_merged)
+            _count_rows(rows, "df_to_nested_json", len(df_merged))
+            # Materialize the groups first so each write is timed on its own
+            groups = list(iter_nested_groups(df_merged))
+            path = os.path.join(output_dir, f"{topic}.json")
+            _count_rows(rows, "write_topic_json", _timed(totals, "write_topic_json", write_topic_json, groups, path))
+
+            search_path = search_index_path(path)
+            index = _timed(totals, "search_index", build_search_index, topic, groups)
+            _count_rows(rows, "search_index", _timed(totals, "search_index", write_search_index, index, search_path))
+            bundle = bundle_path(path, OUTPUT_BUNDLE_COMPRESSION)
+            _count_rows(rows, "bundle", _timed(
+                totals, "bundle", write_topic_bundle, groups, bundle, compression=OUTPUT_BUNDLE_COMPRESSION
+            ))
+
+            corpus_entries[topic] = topic_entry(topic, path, facts_by_topic[topic], None, bundle, search_path,
+                                                json_dir=output_dir)
+            index_paths[topic] = search_path
+
+    _timed(totals, "corpus_manifest", update_corpus_manifest, corpus_entries, os.path.join(output_dir, "corpus.json"))
+    _count_rows(rows, "corpus_manifest", len(corpus_entries))
+    _count_rows(rows, "corpus_search", _timed(
+        totals, "corpus_search", write_corpus_search_index, index_paths, os.path.join(output_dir, "corpus-search")
+    ))
+    return totals, rows
+
+
+def git_revision():
+    """(commit, dirty) of the working tree, or (None, None) outside a git checkout."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def run_benchmark(topics=TOPICS, languages=LANGUAGES, facts=FACTS, paragraphs=PARAGRAPHS, repeats=REPEATS,
+                  seed=SEED, corpus_dir=CORPUS_DIR, keep_corpus=False):
+    """Generate the corpus, time `repeats` passes and return the result record."""
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    units = generate_corpus(corpus_dir, topics, languages, facts, paragraphs, seed)
+    output_dir = os.path.join(corpus_dir, "out")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # One untimed pass to warm imports and the OS file cache
+    run_once(units, output_dir)
+    passes = []
+    for _ in range(repeats):
+        totals, rows = run_once(units, output_dir)
+        passes.append(totals)
+
+    if not keep_corpus:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    commit, dirty = git_revision()
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "scale": {"topics": topics, "languages": list(languages), "facts": facts, "paragraphs": paragraphs,
+                  "seed": seed},
+        "repeats": repeats,
+        "stages": {
+            stage: {
+                "min_s": round(min(p[stage] for p in passes), 6),
+                "median_s": round(statistics.median(p[stage] for p in passes), 6),
+                "rows": rows.get(stage),
+            }
+            for stage in STAGES
+        },
+    }
+
+
+# ---------------------------
+# Results
+# ---------------------------
+def append_result(result, results_path=RESULTS_PATH):
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def load_results(results_path=RESULTS_PATH):
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def format_comparison(current, baseline):
+    """Table of median times, baseline vs current, with the ratio (>1 means slower)."""
+    label = lambda r: f"{r['commit']}{'+' if r['dirty'] else ''}"
+    lines = [f"{'stage':<34}{label(baseline):>14}{label(current):>14}{'ratio':>8}"]
+    for stage in STAGES:
+        before = baseline["stages"].get(stage, {}).get("median_s")
+        after = current["stages"][stage]["median_s"]
+        ratio = f"{after / before:.2f}" if before else "-"
+        lines.append(f"{stage:<34}{before if before is not None else '-':>14}{after:>14}{ratio:>8}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the annotation pipeline on a synthetic corpus")
+    parser.add_argument("--topics", type=int, default=TOPICS)
+    parser.add_argument("--languages", nargs="+", default=LANGUAGES)
+    parser.add_argument("--facts", type=int, default=FACTS)
+    parser.add_argument("--paragraphs", type=int, default=PARAGRAPHS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--results", default=RESULTS_PATH)
+    parser.add_argument("--keep-corpus", action="store_true", help=f"leave the generated files in {CORPUS_DIR}")
+    parser.add_argument("--compare", action="store_true", help="compare with the previous run at the same scale")
+    parser.add_argument("--no-record", action="store_true", help="don't append this run to the results file")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    result = run_benchmark(args.topics, args.languages, args.facts, args.paragraphs, args.repeats, args.seed,
+                           keep_corpus=args.keep_corpus)
+    previous = [r for r in load_results(args.results) if r["scale"] == result["scale"]]
+    if not args.no_record:
+        append_result(result, args.results)
+
+    for stage, timing in result["stages"].items():
+        print(f"{stage:<34} median {timing['median_s']:.4f}s  min {timing['min_s']:.4f}s  rows {timing['rows']}")
+    if args.compare:
+        if previous:
+            print()
+            print(format_comparison(result, previous[-1]))
+        else:
+            print("\nNo earlier run at this scale to compare with.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+
+import loguru
+
+from run_metrics import count
+
+logger = loguru.logger
+
+# ---------------------------
+# Incremental build cache
+# ---------------------------
+# Every stage output is stored under a key derived from the content hashes of
+# everything that stage depends on (annotation file, article, title pairs,
+# pipeline config, and the key of the previous stage). A rerun recomputes a
+# stage only when its key is new, so only the (topic, lang) units whose inputs
+# changed are redone. The build manifest records, per unit and per topic,
+# which inputs and stage keys produced the current outputs.
+
+STAGE_CACHE_DIR = "data_pipeline/.cache/stages"
+BUILD_MANIFEST_PATH = "data_pipeline/.cache/build_manifest.json"
+
+
+def file_digest(path):
+    """sha256 of a file's content, or None if it doesn't exist."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bytes_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def stage_key(*parts):
+    """Combine hashes/config values into one stage key (order matters)."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """Content-addressed store of stage outputs, one pickle file per (stage, key)."""
+
+    def __init__(self, root=STAGE_CACHE_DIR):
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, stage, key):
+        return os.path.join(self.root, stage, key[:2], f"{key}.pkl")
+
+    def contains(self, stage, key):
+        """Whether an output is stored, without loading (or unpickling) it."""
+        return os.path.exists(self._path(stage, key))
+
+    def load(self, stage, key):
+        """Return the cached output, or None on a miss."""
+        path = self._path(stage, key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            count("stage_cache_misses")
+            return None
+        except (pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"Discarding corrupt {stage} cache entry {key}: {e}")
+            self.misses += 1
+            count("stage_cache_misses")
+            return None
+        self.hits += 1
+        count("stage_cache_hits")
+        return value
+
+    def save(self, stage, key, value):
+        """Write atomically so concurrent workers never see a partial entry."""
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return value
+
+
+class BuildManifest:
+    """JSON record of the inputs and stage keys behind each unit/topic output."""
+
+    def __init__(self, path=BUILD_MANIFEST_PATH):
+        self.path = path
+        self.data = {"units": {}, "topics": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def unit(self, topic, lang):
+        return self.data["units"].get(f"{topic}\t{lang}")
+
+    def record_unit(self, topic, lang, inputs, keys):
+        self.data["units"][f"{topic}\t{lang}"] = {"inputs": inputs, "keys": keys, "built_at": time.time()}
+
+    def topic(self, topic):
+        return self.data["topics"].get(topic)
+
+    def record_topic(self, topic, key, output_path):
+        self.data["topics"][topic] = {"key": key, "output": output_path, "built_at": time.time()}
+
+    def topics(self):
+        return list(self.data["topics"])
+
+    def remove_topic(self, topic):
+        """Forget a topic's output record and the records of its units."""
+        self.data["topics"].pop(topic, None)
+        for key in [key for key in self.data["units"] if key.split("\t", 1)[0] == topic]:
+            del self.data["units"][key]
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+_STAGE_CACHES = {}
+
+
+def get_stage_cache(root=STAGE_CACHE_DIR):
+    if root not in _STAGE_CACHES:
+        _STAGE_CACHES[root] = StageCache(root)
+    return _STAGE_CACHES[root]
@@ -0,0 +1,347 @@
+import os
+import re
+import sys
+import json
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import dill
+import pandas as pd
+import loguru
+
+from annotation_catalog import parse_annotation_file_name
+from annotation_reader import read_columnar_annotation
+from article_store import ARTICLE_STORE_PATH, KIND_HEADER, ArticleStore
+
+logger = loguru.logger
+
+# ---------------------------
+# Corpus-wide analytics
+# ---------------------------
+# One command for the whole corpus instead of per-topic scripts:
+#
+#   python data_pipeline/corpus_analytics.py                 # summary tables
+#   python data_pipeline/corpus_analytics.py --topic Injera  # one topic in detail
+#   python data_pipeline/corpus_analytics.py --plot-word-counts
+#
+# Every source file (annotation JSON, topic JSON, article store / pickle) is analysed on
+# its own, in parallel, into a few rows of counts. Those rows are cached in Parquet under
+# ANALYTICS_DIR together with the source's size and mtime, so a rerun only re-reads files
+# that changed; the report tables are cheap groupbys over the cached rows.
+
+ANNOTATION_DIR = "data_pipeline/wikigap_data"
+# Earlier directories win when the same topic has a JSON file in several of them
+TOPIC_JSON_DIRS = ["data_pipeline/wikigap_data/json", "json"]
+ARTICLE_DIR = "data_pipeline/wiki_food"
+ANALYTICS_DIR = "data_pipeline/.cache/analytics"
+MAX_WORKERS = None
+
+TABLES = ["annotations", "headers", "articles"]
+
+_ARTICLE_NAME = re.compile(r"^(.+)_([a-z]{2,3})\.pkl$")
+_LABEL_COLUMNS = ["intersection_label", "gpt-4o_intersection_label"]
+
+
+def source_signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+# ---------------------------
+# Per-source analysers (run in worker processes)
+# ---------------------------
+def analyze_annotation(path):
+    """Fact counts per (row language, intersection_label) of one annotation file."""
+    parsed = parse_annotation_file_name(os.path.basename(path))
+    if parsed is None:
+        return []
+    topic, file_lang, date = parsed
+    df = read_columnar_annotation(path, {"language", *_LABEL_COLUMNS})
+    if df.empty:
+        return []
+    label_column = next((c for c in _LABEL_COLUMNS if c in df.columns), None)
+    labels = df[label_column].fillna("unknown") if label_column else pd.Series("unknown", index=df.index)
+    counts = df.groupby([df["language"].fillna("unknown"), labels]).size()
+    return [
+        {"topic": topic, "file_language": file_lang, "date": date, "language": language,
+         "intersection_label": label, "facts": int(n)}
+        for (language, label), n in counts.items()
+    ]
+
+
+def analyze_topic_json(path):
+    """Entry counts per (topic, language, header_1) of one nested topic file."""
+    with open(path, "r", encoding="utf-8") as f:
+        nested = json.load(f)
+    rows = []
+    for topic, person in nested.items():
+        if not isinstance(person, dict) or "languages" not in person:
+            continue
+        for language, language_data in person["languages"].items():
+            for header, header_data in language_data.get("headers", {}).items():
+                rows.append({"topic": topic, "language": language, "header": header,
+                             "entries": len(header_data.get("entries", []))})
+    return rows
+
+
+def _article_row(title, language, records):
+    words = chars = paragraphs = headers = 0
+    for is_header, text in records:
+        words += len(text.split())
+        chars += len(text)
+        headers += is_header
+        paragraphs += not is_header
+    return {"title": title, "language": language, "words": words, "chars": chars,
+            "paragraphs": paragraphs, "headers": headers}
+
+
+def analyze_article_store(path):
+    """Word/character/paragraph counts of every article in the store, read straight from the mapping."""
+    store = ArticleStore(path)
+    try:
+        return [
+            _article_row(title, lang, ((kind == KIND_HEADER, str(text, "utf-8"))
+                                       for kind, _, text in store.view(title, lang).iter_records()))
+            for title, lang in store.keys()
+        ]
+    finally:
+        store.close()
+
+
+def analyze_article_pickle(path):
+    match = _ARTICLE_NAME.match(os.path.basename(path))
+    if match is None:
+        return []
+    with open(path, "rb") as f:
+        blocks = dill.load(f)
+    records = []
+    for block in blocks:
+        for key, text in block.items():
+            if isinstance(text, str):
+                records.append((key.startswith("header"), text))
+    return [_article_row(match.group(1), match.group(2), records)]
+
+
+_ANALYZERS = {
+    "annotation": ("annotations", analyze_annotation),
+    "topic_json": ("headers", analyze_topic_json),
+    "article_store": ("articles", analyze_article_store),
+    "article_pickle": ("articles", analyze_article_pickle),
+}
+
+
+def _analyze(source):
+    kind, path = source
+    try:
+        return source, _ANALYZERS[kind][1](path), None
+    except Exception as e:
+        return source, [], f"{type(e).__name__}: {e}"
+
+
+# ---------------------------
+# Discovery & incremental refresh
+# ---------------------------
+def discover_sources(annotation_dir=ANNOTATION_DIR, topic_json_dirs=TOPIC_JSON_DIRS, article_dir=ARTICLE_DIR):
+    """[(kind, path), ...] for every file the analytics read."""
+    sources = [("annotation", p) for p in sorted(glob.glob(os.path.join(annotation_dir, "annotation_*.json")))]
+    for directory in topic_json_dirs:
+        sources.extend(("topic_json", p) for p in sorted(glob.glob(os.path.join(directory, "*.json")))
+                       if not p.endswith(".match.json"))
+
+    store_path = os.path.join(article_dir, os.path.basename(ARTICLE_STORE_PATH))
+    stored = set()
+    if os.path.exists(store_path):
+        sources.append(("article_store", store_path))
+        store = ArticleStore(store_path)
+        stored = set(store.keys())
+        store.close()
+    # Legacy pickles only for articles the store doesn't have
+    for path in sorted(glob.glob(os.path.join(article_dir, "*.pkl"))):
+        match = _ARTICLE_NAME.match(os.path.basename(path))
+        if match and (match.group(1), match.group(2)) not in stored:
+            sources.append(("article_pickle", path))
+    return sources
+
+
+def _table_path(analytics_dir, table):
+    return os.path.join(analytics_dir, f"{table}.parquet")
+
+
+def load_tables(analytics_dir=ANALYTICS_DIR):
+    tables = {}
+    for table in TABLES:
+        path = _table_path(analytics_dir, table)
+        tables[table] = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+    return tables
+
+
+def refresh(sources=None, analytics_dir=ANALYTICS_DIR, max_workers=MAX_WORKERS, force=False):
+    """
+    Bring the cached per-source tables up to date and return them.
+    Only sources that are new or whose size/mtime changed are analysed; rows of
+    sources that no longer exist are dropped.
+    """
+    sources = discover_sources() if sources is None else sources
+    signatures = {path: source_signature(path) for _, path in sources}
+    cached = {table: pd.DataFrame() for table in TABLES} if force else load_tables(analytics_dir)
+
+    kept = {}
+    fresh_paths = set()
+    for table, df in cached.items():
+        if df.empty:
+            kept[table] = df
+            continue
+        current = df["source"].map(signatures) == df["signature"]
+        kept[table] = df[current]
+        fresh_paths.update(df.loc[current, "source"])
+    stale = [source for source in sources if source[1] not in fresh_paths]
+    dropped = any(len(kept[table]) != len(cached[table]) for table in TABLES)
+
+    new_rows = {table: [] for table in TABLES}
+    if stale:
+        logger.info(f"Analysing {len(stale)} of {len(sources)} sources")
+        if len(stale) == 1 or max_workers == 1:
+            results = [_analyze(source) for source in stale]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(_analyze, stale, chunksize=max(1, len(stale) // 64)))
+        for (kind, path), rows, error in results:
+            if error is not None:
+                logger.warning(f"Skipping {path}: {error}")
+                continue
+            table = _ANALYZERS[kind][0]
+            signature = signatures[path]
+            new_rows[table].extend(dict(row, source=path, signature=signature) for row in rows)
+
+    os.makedirs(analytics_dir, exist_ok=True)
+    tables = {}
+    for table in TABLES:
+        parts = [df for df in (kept[table], pd.DataFrame(new_rows[table])) if not df.empty]
+        tables[table] = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        if stale or dropped or force or not os.path.exists(_table_path(analytics_dir, table)):
+            tables[table].to_parquet(_table_path(analytics_dir, table), index=False)
+    return tables
+
+
+# ---------------------------
+# Reports
+# ---------------------------
+def _primary_topic_rows(headers):
+    """
+    One topic file per topic: prefer the file named after the topic (not Paella_all.json
+    or 'X copy.json'), then the earlier directory in TOPIC_JSON_DIRS.
+    """
+    if headers.empty:
+        return headers
+    stem = headers["source"].map(lambda p: os.path.splitext(os.path.basename(p))[0])
+    directory = headers["source"].map(os.path.dirname)
+    dir_rank = directory.map({os.path.normpath(d): i for i, d in enumerate(TOPIC_JSON_DIRS)}).fillna(len(TOPIC_JSON_DIRS))
+    ranked = headers.assign(_rank=(stem != headers["topic"]).astype(int) * 100 + dir_rank)
+    best = ranked.groupby("topic")["_rank"].transform("min")
+    return ranked[ranked["_rank"] == best].drop(columns="_rank")
+
+
+def fact_counts(tables):
+    """Published facts per (topic, language), from the topic JSON files."""
+    headers = _primary_topic_rows(tables["headers"])
+    if headers.empty:
+        return pd.DataFrame(columns=["topic", "language", "facts"])
+    return headers.groupby(["topic", "language"], as_index=False)["entries"].sum().rename(columns={"entries": "facts"})
+
+
+def gap_ratios(tables):
+    """
+    Per (topic, target language): target-language facts and the share of them labelled
+    'no' (missing from English), from the latest annotation date of each pair.
+    """
+    annotations = tables["annotations"]
+    if annotations.empty:
+        return pd.DataFrame(columns=["topic", "language", "date", "facts", "gaps", "gap_ratio"])
+    latest = annotations.groupby(["topic", "file_language"])["date"].transform("max")
+    rows = annotations[(annotations["date"] == latest) & (annotations["language"] == annotations["file_language"])]
+    rows = rows.assign(gaps=rows["facts"].where(rows["intersection_label"] == "no", 0))
+    summary = rows.groupby(["topic", "file_language", "date"], as_index=False)[["facts", "gaps"]].sum()
+    summary = summary.rename(columns={"file_language": "language"})
+    summary["gap_ratio"] = (summary["gaps"] / summary["facts"]).round(4)
+    return summary
+
+
+def header_distribution(tables, topic=None):
+    headers = _primary_topic_rows(tables["headers"])
+    if topic is not None and not headers.empty:
+        headers = headers[headers["topic"] == topic]
+    if headers.empty:
+        return pd.DataFrame(columns=["topic", "language", "header", "entries", "share"])
+    dist = headers.groupby(["topic", "language", "header"], as_index=False, sort=False)["entries"].sum()
+    dist["share"] = (dist["entries"] / dist.groupby(["topic", "language"])["entries"].transform("sum")).round(4)
+    return dist.sort_values(["topic", "language", "entries"], ascending=[True, True, False], ignore_index=True)
+
+
+def word_counts(tables, language=None):
+    articles = tables["articles"]
+    if articles.empty:
+        return pd.DataFrame(columns=["title", "language", "words", "chars", "paragraphs", "headers"])
+    if language is not None:
+        articles = articles[articles["language"] == language]
+    columns = ["title", "language", "words", "chars", "paragraphs", "headers"]
+    return articles[columns].drop_duplicates(["title", "language"]).sort_values(["language", "title"], ignore_index=True)
+
+
+def plot_word_counts(counts):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 6))
+    bars = plt.bar(counts["title"], counts["words"])
+    plt.xlabel("Wikipedia Topics")
+    plt.ylabel("Word Count")
+    plt.title("Word Count of English Wikipedia Articles")
+    plt.xticks(rotation=45, ha="right")
+    # Add word count labels above each bar
+    for bar, count in zip(bars, counts["words"]):
+        plt.text(bar.get_x() + bar.get_width() / 2, bar.get_height(), str(count), ha="center", va="bottom")
+    plt.tight_layout()
+    plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Corpus-wide WikiGap analytics")
+    parser.add_argument("--topic", help="show one topic's facts, gap ratios and headers in detail")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--force", action="store_true", help="ignore the cached per-source rows")
+    parser.add_argument("--export", help="directory to write the report tables to as Parquet")
+    parser.add_argument("--plot-word-counts", action="store_true", help="bar chart of English article word counts")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    tables = refresh(max_workers=args.workers, force=args.force)
+
+    reports = {
+        "fact_counts": fact_counts(tables),
+        "gap_ratios": gap_ratios(tables),
+        "header_distribution": header_distribution(tables, args.topic),
+        "word_counts": word_counts(tables),
+    }
+    if args.topic:
+        for name in ("fact_counts", "gap_ratios"):
+            reports[name] = reports[name][reports[name]["topic"] == args.topic]
+        reports["word_counts"] = reports["word_counts"][reports["word_counts"]["title"] == args.topic]
+
+    with pd.option_context("display.max_rows", 200, "display.width", 160):
+        for name, report in reports.items():
+            if name == "header_distribution" and not args.topic:
+                report = report.groupby(["topic", "language"]).size().rename("headers").reset_index()
+            print(f"\n== {name} ==")
+            print(report.to_string(index=False) if not report.empty else "(no data)")
+
+    if args.export:
+        os.makedirs(args.export, exist_ok=True)
+        for name, report in reports.items():
+            report.to_parquet(os.path.join(args.export, f"{name}.parquet"), index=False)
+    if args.plot_word_counts:
+        plot_word_counts(word_counts(tables, "en"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import os
+import re
+import sys
+import json
+import glob
+import unicodedata
+
+import loguru
+
+from topic_writer import SHARD_FORMAT, SHARD_MANIFEST_NAME
+from topic_bundle import bundle_path
+from search_index import search_index_path
+
+logger = loguru.logger
+
+# ---------------------------
+# Corpus manifest
+# ---------------------------
+# One small file that tells the extension which English articles have data and
+# where it is, so a page without data costs a lookup instead of failed fetches:
+#
+#   json/corpus.json
+#   {
+#     "format": "wikigap-corpus-v1",
+#     "topics": {
+#       "Paella": {
+#         "key": "Paella",                        # top-level key inside the topic file(s)
+#         "file": "Paella.json",                  # or "shards": {"fr": "Paella/fr.json", ...}
+#         "match": "Paella.match.json",           # null when there is no match index
+#         "bundle": "Paella.wgb.gz",              # binary fact bundle, or null (see topic_bundle.py)
+#         "search": "Paella.search.json",         # fact search index, or null (see search_index.py)
+#         "facts": {"fr": 45, "ru": 50, "zh": 47}
+#       }, ...
+#     },
+#     "titles": {"paella": "Paella", "paella valenciana": "Paella", ...}
+#   }
+#
+# Paths are relative to json/. "titles" maps lookup_key() of every title that should
+# find a topic -- the topic itself, its key and its English redirects -- to the topic.
+# content.js/background.js apply the same lookup_key() to the page title and URL.
+# Redirects come from REDIRECTS_PATH ({topic: [redirect, ...]}), which
+# `python data_pipeline/corpus_manifest.py --fetch-redirects` fills from the Wikipedia API.
+
+CORPUS_MANIFEST_PATH = "json/corpus.json"
+CORPUS_FORMAT = "wikigap-corpus-v1"
+REDIRECTS_PATH = "data_pipeline/title_redirects.json"
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+WIKIPEDIA_BATCH_SIZE = 50
+
+_COMBINING_MARKS = re.compile("[\u0300-\u036f]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def lookup_key(title):
+    """
+    'Crème_brûlée ' -> 'creme brulee': underscores are spaces, accents, case and
+    whitespace runs don't matter. Mirrors normalizeLookupTitle in background.js.
+    """
+    title = unicodedata.normalize("NFKD", title.replace("_", " "))
+    return _WHITESPACE.sub(" ", _COMBINING_MARKS.sub("", title)).strip().lower()
+
+
+def _relative(path, json_dir):
+    return os.path.relpath(path, json_dir).replace(os.sep, "/")
+
+
+def topic_entry(key, output_json, facts, match_path=None, bundle=None, search_path=None, json_dir="json"):
+    """
+    Manifest entry for a topic written to `output_json` (a file, or a shard directory).
+    Brotli bundles are left out: the extension has no way to decompress them.
+    """
+    entry = {"key": key}
+    if os.path.isdir(output_json):
+        with open(os.path.join(output_json, SHARD_MANIFEST_NAME), "r", encoding="utf-8") as f:
+            shards = json.load(f)["languages"]
+        entry["shards"] = {lang: _relative(os.path.join(output_json, shard["file"]), json_dir)
+                           for lang, shard in shards.items()}
+    else:
+        entry["file"] = _relative(output_json, json_dir)
+    entry["match"] = _relative(match_path, json_dir) if match_path and os.path.exists(match_path) else None
+    readable = bundle and not bundle.endswith(".br") and os.path.exists(bundle)
+    entry["bundle"] = _relative(bundle, json_dir) if readable else None
+    entry["search"] = _relative(search_path, json_dir) if search_path and os.path.exists(search_path) else None
+    entry["facts"] = dict(sorted(facts.items()))
+    return entry
+
+
+def _count_facts(nested):
+    """({lang: entries}, top-level key) of a nested topic dict."""
+    facts = {}
+    for person in nested.values():
+        for lang, language_data in person.get("languages", {}).items():
+            facts[lang] = facts.get(lang, 0) + sum(
+                len(header.get("entries", [])) for header in language_data.get("headers", {}).values()
+            )
+    return facts, next(iter(nested), None)
+
+
+def _existing_bundle(output_json):
+    """The bundle next to a topic output the extension can read, gzip preferred."""
+    for compression in ("gzip", None):
+        path = bundle_path(output_json, compression)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def scan_topic_outputs(json_dir="json"):
+    """
+    Entries for every topic output under json_dir: {topic}.json files whose top-level key
+    is the topic (copies such as 'Paella_all.json' are skipped) and sharded {topic}/ directories.
+    """
+    entries = {}
+    for path in sorted(glob.glob(os.path.join(json_dir, "*.json"))):
+        topic = os.path.splitext(os.path.basename(path))[0]
+        if topic.endswith((".match", ".search")) or os.path.basename(path) == os.path.basename(CORPUS_MANIFEST_PATH):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            nested = json.load(f)
+        facts, key = _count_facts(nested)
+        if key != topic:
+            logger.info(f"Skipping {path}: top-level key {key!r} is not the file's topic")
+            continue
+        entries[topic] = topic_entry(
+            key, path, facts, os.path.join(json_dir, f"{topic}.match.json"), _existing_bundle(path),
+            search_index_path(path), json_dir,
+        )
+
+    for shard_manifest in sorted(glob.glob(os.path.join(json_dir, "*", SHARD_MANIFEST_NAME))):
+        with open(shard_manifest, "r", encoding="utf-8") as f:
+            shards = json.load(f)
+        if shards.get("format") != SHARD_FORMAT:
+            continue
+        output_dir = os.path.dirname(shard_manifest)
+        facts = {lang: shard["entries"] for lang, shard in shards["languages"].items()}
+        key = next((shard["person"] for shard in shards["languages"].values()), shards["topic"])
+        entries[shards["topic"]] = topic_entry(
+            key, output_dir, facts, os.path.join(output_dir, "match.json"), _existing_bundle(output_dir),
+            search_index_path(output_dir), json_dir,
+        )
+    return entries
+
+
+def load_redirects(path=REDIRECTS_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_titles(topics, redirects):
+    """lookup_key -> topic for every topic, its key and its redirects; the first claim on a key wins."""
+    titles = {}
+    for topic, entry in topics.items():
+        for title in [topic, entry["key"]] + list(redirects.get(topic, [])):
+            key = lookup_key(title)
+            owner = titles.setdefault(key, topic)
+            if owner != topic:
+                logger.warning(f"Title {title!r} of {topic} already points to {owner}; keeping {owner}")
+    return dict(sorted(titles.items()))
+
+
+def load_corpus_manifest(path=CORPUS_MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {"format": CORPUS_FORMAT, "topics": {}, "titles": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_corpus_manifest(topics, path=CORPUS_MANIFEST_PATH, redirects_path=REDIRECTS_PATH):
+    manifest = {
+        "format": CORPUS_FORMAT,
+        "topics": dict(sorted(topics.items())),
+        "titles": build_titles(topics, load_redirects(redirects_path)),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def update_corpus_manifest(entries, path=CORPUS_MANIFEST_PATH, redirects_path=REDIRECTS_PATH, removed=()):
+    """Replace the given {topic: entry} in the existing manifest, drop the `removed` topics and rewrite it."""
+    topics = load_corpus_manifest(path)["topics"]
+    topics.update(entries)
+    for topic in removed:
+        topics.pop(topic, None)
+    return write_corpus_manifest(topics, path, redirects_path)
+
+
+# ---------------------------
+# Redirects from the Wikipedia API
+# ---------------------------
+def fetch_redirects(titles, session=None, api_url=WIKIPEDIA_API_URL):
+    """{title: [redirect titles]} for English Wikipedia titles, 50 titles per request."""
+    import requests
+
+    from wikidata_resolver import USER_AGENT
+
+    session = session or requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    redirects = {title: [] for title in titles}
+    for i in range(0, len(titles), WIKIPEDIA_BATCH_SIZE):
+        chunk = titles[i:i + WIKIPEDIA_BATCH_SIZE]
+        params = {
+            "action": "query", "titles": "|".join(chunk), "prop": "redirects", "rdlimit": "max",
+            "redirects": 1, "format": "json", "formatversion": 2,
+        }
+        while True:
+            resp = session.get(api_url, params=params, timeout=(5, 30))
+            resp.raise_for_status()
+            data = resp.json()
+            # Requested title -> canonical page title (normalization and redirects we asked through)
+            canonical = {title: title for title in chunk}
+            for step in data.get("query", {}).get("normalized", []) + data.get("query", {}).get("redirects", []):
+                for title, target in canonical.items():
+                    if target == step["from"]:
+                        canonical[title] = step["to"]
+            pages = {page["title"]: page for page in data.get("query", {}).get("pages", [])}
+            for title, page_title in canonical.items():
+                for redirect in pages.get(page_title, {}).get("redirects", []):
+                    redirects[title].append(redirect["title"])
+            if "continue" not in data:
+                break
+            params.update(data["continue"])
+    return {title: sorted(set(found)) for title, found in redirects.items()}
+
+
+def main():
+    """
+    python data_pipeline/corpus_manifest.py [--json-dir json] [--out json/corpus.json] [--fetch-redirects]
+    Rescan the topic outputs and rewrite the corpus manifest (the pipeline keeps it up to
+    date on its own; this is for hand-placed files or after parallel per-topic jobs).
+    """
+    args = sys.argv[1:]
+    json_dir = args[args.index("--json-dir") + 1] if "--json-dir" in args else "json"
+    out_path = args[args.index("--out") + 1] if "--out" in args else os.path.join(json_dir, "corpus.json")
+
+    topics = scan_topic_outputs(json_dir)
+    if "--fetch-redirects" in args:
+        redirects = load_redirects()
+        redirects.update(fetch_redirects(sorted(topics)))
+        with open(REDIRECTS_PATH, "w", encoding="utf-8") as f:
+            json.dump(redirects, f, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"{REDIRECTS_PATH}: {sum(len(r) for r in redirects.values())} redirects")
+
+    manifest = write_corpus_manifest(topics, out_path)
+    print(f"{out_path}: {len(manifest['topics'])} topics, {len(manifest['titles'])} titles")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import re
+import sys
+import json
+import zlib
+from collections import defaultdict
+
+# ---------------------------
+# Fact deduplication / near-duplicate report
+# ---------------------------
+# exact_representatives() groups facts by their normalized text (case and whitespace
+# folded). That is all the translate path uses: each group is translated once, through
+# its earliest member, and every member gets that translation.
+#
+# Near-duplicates are a report only, never a reason to copy a translation: "built in
+# 1920" / "built in 1929" or "is" / "is not" look alike and mean different things.
+# cluster_facts() clusters distinct texts with MinHash signatures over character
+# shingles and an LSH banding index: only texts sharing a band bucket are compared,
+# and a pair joins the same cluster when the Jaccard similarity of its shingle sets
+# is at least SIMILARITY_THRESHOLD. Character shingles work the same for fr/ru/zh
+# text. The report runs per topic, over every language of a written topic JSON:
+#
+#   python data_pipeline/fact_dedup.py json/Paella.json json/Oolong.json
+#
+# numpy is imported on first use.
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16  # 4 rows per band: pairs above ~0.5 Jaccard become candidates
+SIMILARITY_THRESHOLD = 0.85
+SEED = 1
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_fact(text):
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _permutations(num_perm=NUM_PERM, seed=SEED):
+    import numpy as np
+
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(shingle_sets, num_perm=NUM_PERM, seed=SEED):
+    """(len(shingle_sets), num_perm) array of MinHash values, deterministic across processes."""
+    import numpy as np
+
+    a, b = _permutations(num_perm, seed)
+    signatures = np.empty((len(shingle_sets), num_perm), dtype=np.uint64)
+    for i, items in enumerate(shingle_sets):
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) % _MERSENNE_PRIME for s in items), dtype=np.uint64, count=len(items)
+        )
+        # (a * x + b) mod p for every permutation and shingle; a, x < 2^31 so nothing overflows
+        signatures[i] = ((np.outer(hashes, a) + b) % _MERSENNE_PRIME).min(axis=0)
+    return signatures
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # Keep the earliest index as the root so it becomes the representative
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def exact_representatives(texts):
+    """{text: earliest text with the same normalized form} for every non-empty string."""
+    by_key = {}
+    representatives = {}
+    for text in texts:
+        if isinstance(text, str) and text.strip():
+            representatives[text] = by_key.setdefault(normalize_fact(text), text)
+    return representatives
+
+
+def cluster_facts(texts, threshold=SIMILARITY_THRESHOLD, bands=BANDS, num_perm=NUM_PERM):
+    """
+    Near-duplicate clusters of the distinct (normalized) texts, for reporting.
+    Returns (clusters, stats): clusters lists the texts of every cluster with 2+ members,
+    stats counts the facts, the exact-distinct texts and the clusters.
+    """
+    texts = [t for t in texts if isinstance(t, str) and t.strip()]
+    by_key = {}
+    for text in texts:
+        by_key.setdefault(normalize_fact(text), text)
+    keys = list(by_key)
+
+    uf = _UnionFind(len(keys))
+    if len(keys) > 1:
+        sets = [shingles(key) for key in keys]
+        signatures = minhash_signatures(sets, num_perm)
+        rows = num_perm // bands
+        compared = set()
+        for band in range(bands):
+            buckets = defaultdict(list)
+            for i, row in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+                buckets[row.tobytes()].append(i)
+            for members in buckets.values():
+                for x in range(len(members)):
+                    for y in range(x + 1, len(members)):
+                        i, j = members[x], members[y]
+                        if (i, j) in compared:
+                            continue
+                        compared.add((i, j))
+                        if len(sets[i] & sets[j]) / len(sets[i] | sets[j]) >= threshold:
+                            uf.union(i, j)
+
+    groups = defaultdict(list)
+    for i, key in enumerate(keys):
+        groups[uf.find(i)].append(by_key[key])
+    stats = {
+        "facts": len(texts),
+        "distinct": len(keys),
+        "clusters": len(groups),
+    }
+    return [members for members in groups.values() if len(members) > 1], stats
+
+
+def topic_facts(nested):
+    """(original, translated) of every entry in a nested topic dict, all languages together."""
+    return [
+        (entry["fact"]["original"], entry["fact"]["translated"])
+        for person in nested.values()
+        for language in person.get("languages", {}).values()
+        for header in language.get("headers", {}).values()
+        for entry in header.get("entries", [])
+    ]
+
+
+def main():
+    """
+    python data_pipeline/fact_dedup.py json/{topic}.json ...
+    Prints the near-duplicate clusters of each topic's translated facts (across languages)
+    and of its original facts.
+    """
+    if len(sys.argv) < 2:
+        print(main.__doc__)
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        with open(path, "r", encoding="utf-8") as f:
+            facts = topic_facts(json.load(f))
+        for label, texts in (("translated", [t for _, t in facts]), ("original", [o for o, _ in facts])):
+            clusters, stats = cluster_facts(texts)
+            print(f"{path} ({label}): {stats['facts']} facts, {stats['distinct']} distinct, "
+                  f"{len(clusters)} near-duplicate clusters")
+            for members in clusters:
+                print("  - " + "\n    ".join(members))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import sys
+from functools import lru_cache
+
+from intermediate_store import LIST_COLUMNS
+
+# ---------------------------
+# Frame schema
+# ---------------------------
+# The per-unit frames repeat the same few values on every row (language, person,
+# label, source file, section headers) and the same sentences across many list
+# cells. Left as object columns, every occurrence is its own Python string, and
+# merging many topics multiplies them. apply_schema() gives the columns compact dtypes:
+#
+#   categorical  low-cardinality labels: one copy of each value plus integer codes
+#   text         Arrow-backed strings (pandas' "str" dtype with pyarrow storage),
+#                falling back to interned Python strings without pyarrow
+#   list         cells stay Python lists (downstream code expects them), their
+#                strings interned so repeated sentences share one object
+#
+# concat_frames() merges frames without losing the categorical dtypes, and
+# frame_memory_mb() is the figure the run report records per stage.
+# pandas is imported on first use, so importing this module stays cheap.
+
+CATEGORICAL_COLUMNS = (
+    "language",
+    "person_name",
+    "intersection_label",
+    "source_file",
+    "header_1",
+    "header_2",
+    "header_1_translated",
+    "header_2_translated",
+)
+TEXT_COLUMNS = ("fact", "fact_aligned_sentence", "fact_representative", "fact_translated")
+
+
+@lru_cache(maxsize=None)
+def _text_dtype():
+    """Arrow-backed string dtype with NaN for missing values, or None if unavailable."""
+    import numpy as np
+    import pandas as pd
+
+    try:
+        import pyarrow  # noqa: F401
+        # NaN rather than pd.NA, so code testing isinstance(v, str) / pd.isna(v) sees no change
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except (ImportError, TypeError):
+        return None
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _intern_list(cell):
+    return [_intern(item) for item in cell] if isinstance(cell, list) else cell
+
+
+def apply_schema(df):
+    """
+    Convert the known columns of `df` in place to their compact dtypes and return it.
+    Columns already in their target dtype are left alone, so this is cheap to repeat
+    after every stage.
+    """
+    import pandas as pd
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+
+    text_dtype = _text_dtype()
+    for column in TEXT_COLUMNS:
+        if column not in df.columns or df[column].dtype == text_dtype:
+            continue
+        if text_dtype is not None:
+            df[column] = df[column].astype(text_dtype)
+        else:
+            df[column] = [_intern(value) for value in df[column].tolist()]
+
+    for column in LIST_COLUMNS:
+        if column in df.columns and df[column].dtype == object:
+            df[column] = [_intern_list(cell) for cell in df[column].tolist()]
+    return df
+
+
+def concat_frames(frames):
+    """
+    pd.concat(frames, ignore_index=True) that keeps categorical columns categorical
+    (plain concat falls back to object columns when the categories differ).
+    The input frames are converted in place rather than copied.
+    """
+    import pandas as pd
+
+    frames = [apply_schema(frame) for frame in frames]
+    for column in CATEGORICAL_COLUMNS:
+        present = [frame for frame in frames if column in frame.columns]
+        if len(present) < 2:
+            continue
+        # Built by hand: union_categoricals rejects an all-missing column's empty object categories
+        categories = pd.Index(list(dict.fromkeys(c for frame in present for c in frame[column].cat.categories)))
+        for frame in present:
+            frame[column] = frame[column].cat.set_categories(categories)
+    # A column missing from some frames comes back as object; apply_schema converts it again
+    return apply_schema(pd.concat(frames, ignore_index=True))
+
+
+def frame_memory_mb(df):
+    """
+    Deep memory of `df` in MB, including the strings inside list cells, which
+    memory_usage(deep=True) doesn't see; shared (interned) strings count once.
+    """
+    total = int(df.memory_usage(deep=True).sum())
+    seen = set()
+    for column in LIST_COLUMNS:
+        if column not in df.columns:
+            continue
+        for cell in df[column].tolist():
+            if not isinstance(cell, list):
+                continue
+            for item in cell:
+                if id(item) not in seen:
+                    seen.add(id(item))
+                    total += sys.getsizeof(item)
+    return round(total / (1024 * 1024), 3)
@@ -0,0 +1,77 @@
+import os
+
+# ---------------------------
+# Columnar intermediates
+# ---------------------------
+# Each (topic, lang) extraction is kept as its own Parquet file,
+#   data_pipeline/.cache/extracted/annotation_{date}_{topic}_{lang}.parquet
+# with native list<string> columns, so nothing downstream has to parse
+# stringified lists back. The extract-stage key (see build_cache.stage_key) is
+# stored in the file's schema metadata: a file whose key matches is reused
+# instead of re-parsing the annotation JSON. pyarrow is imported on first use, so
+# importing this module (e.g. for INTERMEDIATE_DIR) costs nothing.
+
+INTERMEDIATE_DIR = "data_pipeline/.cache/extracted"
+LIST_COLUMNS = ("src_context", "tgt_contexts", "tgt_fact_aligned_sentences")
+_KEY_METADATA = b"wikigap.extract_key"
+
+
+def intermediate_path(annotation_filename, directory=INTERMEDIATE_DIR):
+    return os.path.join(directory, os.path.splitext(annotation_filename)[0] + ".parquet")
+
+
+def _to_table(df):
+    import pyarrow as pa
+
+    fields = []
+    for column in df.columns:
+        if column in LIST_COLUMNS:
+            fields.append(pa.field(column, pa.list_(pa.string())))
+        elif column == "paragraph_index":
+            fields.append(pa.field(column, pa.int64()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    return pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+
+
+def write_extracted(df, path, key=None):
+    """Write one extraction atomically, tagged with its extract-stage key."""
+    import pyarrow.parquet as pq
+
+    table = _to_table(df)
+    if key is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _KEY_METADATA: key.encode()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def extracted_key(path):
+    """The extract key a file was written with, or None if there is no (readable) file."""
+    if not os.path.exists(path):
+        return None
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    key = metadata.get(_KEY_METADATA)
+    return key.decode() if key is not None else None
+
+
+def read_extracted(path, columns=None):
+    """
+    Load an extraction (optionally only `columns`) from a memory-mapped file.
+    List columns come back as Python lists, scalar columns as regular pandas columns.
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    list_columns = [c for c in table.column_names if c in LIST_COLUMNS]
+    df = table.drop_columns(list_columns).to_pandas()
+    for column in list_columns:
+        df[column] = table.column(column).to_pylist()
+    return df[table.column_names]
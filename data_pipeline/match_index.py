@@ -0,0 +1,152 @@
+import os
+import re
+import json
+import bisect
+
+# ---------------------------
+# Sentence-match index
+# ---------------------------
+# For every aligned English sentence of a topic's facts, record where it sits in the
+# scraped English article, so the extension can go straight to the right paragraph
+# instead of testing every sentence against every element of the page:
+#
+#   {
+#     "format": "wikigap-match-v1",
+#     "topic": "Paella",
+#     "anchor_length": 40,
+#     "paragraphs": [{"anchor": "<first 40 normalized chars>", "headers": ["History", ...]}, ...],
+#     "sentences": {"<normalized sentence>": [[paragraph_index, start, end], ...]},
+#     "unmatched": 3
+#   }
+#
+# Sentence keys and anchors use normalize_text (whitespace collapsed, trimmed, lower-cased);
+# content.js applies the same normalization to the page text. start/end are character
+# offsets into the scraped paragraph text (not the normalized one).
+
+MATCH_INDEX_FORMAT = "wikigap-match-v1"
+ANCHOR_LENGTH = 40
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def _normalize_with_offsets(text):
+    """normalize_text(text) plus, for every normalized character, its offset in `text`."""
+    chars, offsets = [], []
+    pending_space = False
+    for i, ch in enumerate(text):
+        if ch.isspace():
+            pending_space = bool(chars)
+            continue
+        if pending_space:
+            chars.append(" ")
+            offsets.append(i - 1)
+            pending_space = False
+        lowered = ch.lower()
+        # Keep offsets 1:1 with characters; the rare multi-char lowercasings stay as they are
+        chars.append(lowered if len(lowered) == 1 else ch)
+        offsets.append(i)
+    return "".join(chars), offsets
+
+
+def build_match_index(topic, paragraph_table, sentences):
+    """
+    paragraph_table: the EN article's table from process_paragraphs_with_headers.
+    sentences: iterable of aligned sentences (duplicates and non-strings are ignored).
+    Returns the index dict described above.
+    """
+    header_columns = sorted(
+        (c for c in paragraph_table.columns if c.startswith("header_")), key=lambda c: int(c.split("_")[1])
+    )
+    paragraphs, normalized, offset_maps = [], [], []
+    for row in paragraph_table.itertuples():
+        text, offsets = _normalize_with_offsets(str(row.paragraph))
+        headers = [getattr(row, c) for c in header_columns]
+        paragraphs.append({
+            "anchor": text[:ANCHOR_LENGTH],
+            "headers": [h for h in headers if isinstance(h, str)],
+        })
+        normalized.append(text)
+        offset_maps.append(offsets)
+
+    # One string for the whole article; "\n" never occurs in a normalized sentence,
+    # so a match can't straddle two paragraphs
+    article = "\n".join(normalized)
+    starts = []
+    position = 0
+    for text in normalized:
+        starts.append(position)
+        position += len(text) + 1
+
+    matches = {}
+    unmatched = 0
+    for sentence in dict.fromkeys(s for s in sentences if isinstance(s, str)):
+        key = normalize_text(sentence)
+        if not key or key in matches:
+            continue
+        hits = []
+        found = article.find(key)
+        while found != -1:
+            p = bisect.bisect_right(starts, found) - 1
+            local = found - starts[p]
+            offsets = offset_maps[p]
+            hits.append([p, offsets[local], offsets[local + len(key) - 1] + 1])
+            found = article.find(key, found + 1)
+        if hits:
+            matches[key] = hits
+        else:
+            unmatched += 1
+
+    return {
+        "format": MATCH_INDEX_FORMAT,
+        "topic": topic,
+        "anchor_length": ANCHOR_LENGTH,
+        "paragraphs": paragraphs,
+        "sentences": matches,
+        "unmatched": unmatched,
+    }
+
+
+def match_index_path(output_json):
+    """json/{topic}.json -> json/{topic}.match.json; sharded json/{topic} -> json/{topic}/match.json"""
+    if output_json.endswith(".json"):
+        return output_json[:-len(".json")] + ".match.json"
+    return os.path.join(output_json, "match.json")
+
+
+def write_match_index(index, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def sentences_from_topic_json(path):
+    """Every tgt_fact_aligned_sentences entry of an already written json/{topic}.json."""
+    with open(path, "r", encoding="utf-8") as f:
+        nested = json.load(f)
+    for person in nested.values():
+        for language in person["languages"].values():
+            for header in language["headers"].values():
+                for entry in header["entries"]:
+                    yield from entry.get("tgt_fact_aligned_sentences") or []
+
+
+def main():
+    """Build the match index for existing topic files: python data_pipeline/match_index.py json/Paella.json ..."""
+    import sys
+    from process_annotations import process_paragraphs_with_headers, step_retrieve_prescraped_en_content_blocks
+
+    for path in sys.argv[1:]:
+        topic = os.path.splitext(os.path.basename(path))[0]
+        paragraph_table = process_paragraphs_with_headers(step_retrieve_prescraped_en_content_blocks(topic))
+        index = build_match_index(topic, paragraph_table, sentences_from_topic_json(path))
+        write_match_index(index, match_index_path(path))
+        print(f"{match_index_path(path)}: {len(index['sentences'])} sentences, {index['unmatched']} unmatched")
+
+
+if __name__ == "__main__":
+    main()
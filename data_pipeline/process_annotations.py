@@ -1,17 +1,38 @@
 import json
 import os
 import sys
-import urllib.parse
-import dill
-import importlib
-import pandas as pd
 import ast
-import requests
-from datetime import datetime
-from deep_translator import GoogleTranslator
-import openai
+import shutil
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import loguru
-from tqdm import tqdm
+
+# pandas/numpy, pyarrow, dill, requests and tqdm are imported by the functions that
+# use them (here and in the modules below), so a CLI subcommand only pays for the
+# libraries its stage needs; see cli().
+from translation_cache import get_translation_cache, translate_unique
+from translation_client import AsyncTranslationClient
+from translation_backends import BACKENDS, BackendConfigError, make_backend
+from wikidata_resolver import get_wikidata_resolver
+from article_store import ARTICLE_STORE_PATH, get_article_store
+from topic_writer import write_topic_json, write_topic_shards
+from topic_bundle import BUNDLE_SUFFIXES, bundle_path, write_topic_bundle
+from match_index import build_match_index, match_index_path, write_match_index
+from corpus_manifest import topic_entry, update_corpus_manifest
+from annotation_catalog import (
+    WATCH_INTERVAL, AnnotationWatcher, annotation_file_name, catalog_topics, latest_annotation_file, latest_annotations,
+    scan_annotations,
+)
+from search_index import (
+    CORPUS_SEARCH_DIR, build_search_index, search_index_path, write_corpus_search_index, write_search_index,
+)
+from fact_dedup import exact_representatives
+from frame_schema import apply_schema, concat_frames, frame_memory_mb
+from intermediate_store import INTERMEDIATE_DIR, extracted_key, intermediate_path, read_extracted, write_extracted
+from title_registry import get_title_registry
+from build_cache import BuildManifest, bytes_digest, file_digest, get_stage_cache, stage_key
+from run_metrics import RUN_REPORT_DIR, StageRecorder, stage, write_run_report
 
 logger = loguru.logger
 
@@ -37,7 +58,7 @@ class BioFilenotFoundError(Exception):
     """Custom exception for missing bio file."""
     pass
 
-# Configure your Azure OpenAI client
+# Configure your Azure OpenAI client, e.g. openai.AzureOpenAI(...)
 client = ""
 
 SRC_LANGUAGE_FILTER = 'en'  # The primary language to skip in final JSON if desired
@@ -95,8 +116,26 @@ def extract_nested_values(column_data):
         new_values.extend(inner_list)
     return new_values
 
+def _rename_aliased_columns(df):
+    renames = {old: new for old, new in COLUMN_ALIASES.items() if old in df.columns and new not in df.columns}
+    return df.rename(columns=renames) if renames else df
+
+
 # Function to process a single JSON file
 def process_json_file(file_path, target_names):
+    import pandas as pd
+    from annotation_reader import read_columnar_annotation, ColumnarLayoutError
+
+    # Also read the older names of the requested columns (see COLUMN_ALIASES)
+    target_names = set(target_names) | {old for old, new in COLUMN_ALIASES.items() if new in target_names}
+
+    # Fast path: the annotation files use a columnar layout, so only the
+    # requested columns are decoded and their list cells come back flattened.
+    try:
+        return apply_schema(_rename_aliased_columns(read_columnar_annotation(file_path, target_names)))
+    except ColumnarLayoutError as e:
+        logger.debug(f"{file_path} is not columnar ({e}), falling back to a full JSON walk")
+
     with open(file_path, "r", encoding="utf-8") as file:
         json_data = json.load(file)
 
@@ -112,7 +151,7 @@ def process_json_file(file_path, target_names):
             extracted_data[key].append(None)
 
     # Convert to DataFrame
-    df_structured = pd.DataFrame(extracted_data)
+    df_structured = _rename_aliased_columns(pd.DataFrame(extracted_data))
 
     # Function to extract only the 'values' from nested objects in specific columns
     df_structured = clean_src_context_nested_values(df_structured)
@@ -122,13 +161,14 @@ def process_json_file(file_path, target_names):
     if 'tgt_fact_aligned_sentences' in df_structured.columns:
         df_structured['tgt_fact_aligned_sentences'] = df_structured['tgt_fact_aligned_sentences'].apply(extract_nested_values)
 
+    # Categorical labels, Arrow-backed text and interned list strings (see frame_schema.py)
+    return apply_schema(df_structured)
 
-    return df_structured
-
-def process_single_json_file(directory_path, filename, target_names, output_csv_path):
+def process_single_json_file(directory_path, filename, target_names, output_path=None, extract_key=None):
     """
     1) process_json_file to get a DataFrame
-    2) Save to CSV for inspection (optional).
+    2) Save it as a typed Parquet intermediate with native list columns
+       (optional, skipped when output_path is None; see intermediate_store.py).
     3) Return the DataFrame.
     """
     file_path = os.path.join(directory_path, filename)
@@ -137,47 +177,57 @@ def process_single_json_file(directory_path, filename, target_names, output_csv_
         return df
 
     df["source_file"] = filename
-    df.to_csv(output_csv_path, index=False, encoding="utf-8-sig")
+    apply_schema(df)
+    if output_path:
+        write_extracted(df, output_path, extract_key)
     return df
 
 def retrieve_title(topic, tgt_lang):
     """
-    Dynamically import en_tgt_title_pairs from packages.scraped_titles_{tgt_lang}
-    and return the target title that matches `topic`.
+    Return the target title that matches `topic`, from the title registry built once
+    out of every data_pipeline/scraped_titles_{tgt_lang}.py module.
     """
-    module_name = f"packages.scraped_titles_{tgt_lang}"
-    mod = importlib.import_module(module_name)  # import packages.scraped_titles_ru, for example
-    en_tgt_title_pairs = mod.en_tgt_title_pairs
+    return get_title_registry().title(topic, tgt_lang)
 
-    for src_topic, tgt_topic_val in en_tgt_title_pairs:
-        if src_topic == topic:
-            return tgt_topic_val
-    return None
+
+def retrieve_titles(topic):
+    """Every language's title for `topic` at once: {tgt_lang: tgt_title}."""
+    return get_title_registry().titles(topic)
 
 # Usage example:
-# Suppose en_tgt_title_pairs = [('apple', 'яблоко'), ('banana', 'банан')]
-# retrieve_title('apple', 'ru', en_tgt_title_pairs)  # returns 'яблоко'
+# Suppose scraped_titles_ru.en_tgt_title_pairs = [('apple', 'яблоко'), ('banana', 'банан')]
+# retrieve_title('apple', 'ru')  # returns 'яблоко'
+# retrieve_titles('apple')       # returns {'ru': 'яблоко', ...}
 
 
 # ---------------------------
 # 3) BIO FILE RETRIEVAL
 # ---------------------------
-def step_retrieve_prescraped_en_content_blocks(en_bio_id, save_dir=BIO_SAVE_DIR):
-    path = os.path.join(save_dir, f"{en_bio_id}_en.pkl")
+def _load_prescraped_blocks(bio_id, lang, save_dir):
+    """
+    Load an article's content blocks, from the indexed article store when it has it,
+    otherwise from the legacy '{bio_id}_{lang}.pkl' file.
+    """
+    store = get_article_store(os.path.join(save_dir, os.path.basename(ARTICLE_STORE_PATH)))
+    if store is not None and (bio_id, lang) in store:
+        return store.load_blocks(bio_id, lang)
+
+    path = os.path.join(save_dir, f"{bio_id}_{lang}.pkl")
     if not os.path.exists(path):
-        raise BioFilenotFoundError(f"Could not find the prescraped bio file for {en_bio_id}")
+        raise BioFilenotFoundError(f"Could not find the prescraped bio file for {bio_id}")
+    import dill
+
     with open(path, 'rb') as f:
         return dill.load(f)
 
 
+def step_retrieve_prescraped_en_content_blocks(en_bio_id, save_dir=BIO_SAVE_DIR):
+    return _load_prescraped_blocks(en_bio_id, "en", save_dir)
+
+
 def step_retrieve_prescraped_tgt_content_blocks(tgt_bio_id, tgt_lang, save_dir=BIO_SAVE_DIR):
-    path = os.path.join(save_dir, f"{tgt_bio_id}_{tgt_lang}.pkl")
-    print(path)
-    if not os.path.exists(path):
-        raise BioFilenotFoundError(f"Could not find the prescraped bio file for {tgt_bio_id}")
     logger.info(f"Retrieving {tgt_bio_id}_{tgt_lang} from {save_dir}")
-    with open(path, 'rb') as f:
-        return dill.load(f)
+    return _load_prescraped_blocks(tgt_bio_id, tgt_lang, save_dir)
 
 
 # ---------------------------
@@ -185,12 +235,16 @@ def step_retrieve_prescraped_tgt_content_blocks(tgt_bio_id, tgt_lang, save_dir=B
 # ---------------------------
 def process_paragraphs_with_headers(data):
     """
-    Convert a list of dicts (with 'header_x' or 'paragraph') into a list of paragraphs,
-    each referencing the most recent headers at various levels.
+    Convert a list of dicts (with 'header_x' or 'paragraph') into a paragraph table,
+    each paragraph referencing the most recent headers at various levels.
+    Returns a DataFrame indexed by `paragraph_index` with a 'paragraph' column and
+    one 'header_<level>' column per header level seen in the article.
     """
-    processed_data = []
+    import pandas as pd
+
+    paragraphs = []
+    paragraph_headers = []
     current_headers = {}  # level -> text
-    paragraph_index = 0
 
     for item in data:
         # Detect a header, e.g., 'header_1'
@@ -204,116 +258,214 @@ def process_paragraphs_with_headers(data):
             current_headers = {k: v for k, v in current_headers.items() if k <= level}
 
         elif "paragraph" in item:
-            paragraph_entry = {
-                "index": paragraph_index,
-                "paragraph": item["paragraph"],
-            }
-            # Include all relevant headers
-            for lvl in sorted(current_headers.keys()):
-                paragraph_entry[f"header_{lvl}"] = current_headers[lvl]
-
-            processed_data.append(paragraph_entry)
-            paragraph_index += 1
+            paragraphs.append(item["paragraph"])
+            paragraph_headers.append(dict(current_headers))
 
-    return processed_data
+    table = pd.DataFrame(
+        {"paragraph": paragraphs},
+        index=pd.RangeIndex(len(paragraphs), name="paragraph_index"),
+    )
+    levels = sorted({lvl for headers in paragraph_headers for lvl in headers})
+    for lvl in levels:
+        table[f"header_{lvl}"] = [headers.get(lvl) for headers in paragraph_headers]
+    return table
 
 
 def get_header_by_paragraph_index(paragraph_idx, data, lvl):
-    for p in data:
-        if p["index"] == paragraph_idx:
-            return p.get(lvl, None)
-    return None
+    """Single lookup into a paragraph table; use attach_headers for whole DataFrames."""
+    if lvl not in data.columns or paragraph_idx not in data.index:
+        return None
+    import pandas as pd
+
+    value = data.at[paragraph_idx, lvl]
+    return None if pd.isna(value) else value
+
+
+def attach_headers(df, paragraph_table, required_levels=("header_1", "header_2")):
+    """
+    Attach every header level of `paragraph_table` to `df` in one join on 'paragraph_index'.
+    Rows whose paragraph index isn't in the table get None; `required_levels` are always present.
+    """
+    header_columns = [c for c in paragraph_table.columns if c.startswith("header_")]
+    for col in required_levels:
+        if col not in header_columns:
+            header_columns.append(col)
+    headers = paragraph_table.reindex(columns=header_columns)
+
+    df = df.drop(columns=[c for c in header_columns if c in df.columns])
+    df = df.join(headers, on="paragraph_index")
+    df[header_columns] = df[header_columns].astype(object).where(df[header_columns].notna(), None)
+    return df
 
 
 # ---------------------------
 # 5) TRANSLATION UTILITIES
 # ---------------------------
-def translate_headers(df, src_lang, tgt_lang):
+# Backends are chosen by name from translation_backends.BACKENDS:
+# "google", "openai", "dictionary" (offline glossary) or "stub" (deterministic, for tests).
+# These are the defaults; main() and the CLI can pick others per run (see translation_config()).
+HEADER_BACKEND = "google"
+HEADER_BACKEND_OPTIONS = {}
+FACT_BACKEND = "openai"
+FACT_MODEL = "gpt-4o-mini"
+FACT_BACKEND_OPTIONS = {"model": FACT_MODEL}
+FACT_DEDUP = True  # Translate facts that only differ in case/whitespace once (see fact_dedup.py)
+
+
+def get_translation_backend(name, options):
+    """Build a configured backend; the openai one uses the module-level `client`."""
+    options = dict(options)
+    if name == "openai":
+        options.setdefault("client", client)
+    return make_backend(name, **options)
+
+
+def translation_config(header_backend=None, fact_backend=None, fact_model=None):
+    """
+    {"header": (backend name, options), "fact": (backend name, options)} from the settings
+    above, with any backend or model given here swapped in (the CLI's --header-backend,
+    --fact-backend and --fact-model). A backend other than the configured one starts
+    without the configured options.
+    """
+    header_name = header_backend or HEADER_BACKEND
+    header_options = dict(HEADER_BACKEND_OPTIONS) if header_name == HEADER_BACKEND else {}
+    fact_name = fact_backend or FACT_BACKEND
+    fact_options = dict(FACT_BACKEND_OPTIONS) if fact_name == FACT_BACKEND else {}
+    if fact_model:
+        fact_options["model"] = fact_model
+    return {"header": (header_name, header_options), "fact": (fact_name, fact_options)}
+
+
+def check_translation_backends(translation):
+    """
+    Build every backend of a translation_config() once and raise BackendConfigError if one
+    can't translate (e.g. openai without a client), before any unit has been started.
+    """
+    for role, (name, options) in translation.items():
+        try:
+            get_translation_backend(name, options).check()
+        except (BackendConfigError, TypeError, ValueError) as e:
+            raise BackendConfigError(f"{role} translation backend {name!r}: {e}") from None
+
+
+def _is_translatable(text):
+    return isinstance(text, str) and text not in ["None", ""]
+
+
+def _record_failures(df, translation_client):
+    """Keep failed items out of the data; remember them on the frame instead."""
+    if translation_client.failures:
+        failures = df.attrs.setdefault("translation_failures", {})
+        failures.update(translation_client.failures)
+
+
+def _translate_texts(texts, src_lang, tgt_lang, backend, name):
+    """
+    Translate each distinct string once through `backend`, reusing earlier runs through
+    the on-disk cache when the backend's output is worth caching. Requests are issued
+    concurrently by the async translation client, one round of `max_in_flight` chunks
+    at a time, and each round is written to the cache before the next one starts, so
+    an interrupted run keeps what it already paid for.
+    Returns ({text: translation}, client) -- failed texts are missing from the dict.
+    """
+    if not backend.remote:
+        # Local engines: one call for everything, nothing to throttle
+        client_options = {"chunk_size": max(1, len(texts))}
+    else:
+        client_options = {"chunk_size": backend.chunk_size} if backend.chunk_size else {}
+    translation_client = AsyncTranslationClient(
+        lambda batch: backend.translate_batch(batch, src_lang, tgt_lang), name=name, **client_options
+    )
+    translations = translate_unique(
+        texts, src_lang, tgt_lang, backend.name, translation_client.translate_batch, model=backend.model,
+        cache=get_translation_cache() if backend.cacheable else None,
+        batch_size=translation_client.chunk_size * translation_client.max_in_flight,
+    )
+    return translations, translation_client
+
+
+def translate_headers(df, src_lang, tgt_lang, backend_config=None):
     """
-    Translate header_1 and header_2 from src_lang to tgt_lang using GoogleTranslator.
+    Translate header_1 and header_2 from src_lang to tgt_lang with the HEADER_BACKEND
+    (or `backend_config`, a (name, options) pair from translation_config()).
+    Each distinct header is translated once per DataFrame.
+    Headers that fail to translate are left as None.
     """
-    translator = GoogleTranslator(source=src_lang, target=tgt_lang)
+    header_columns = [c for c in ("header_1", "header_2") if c in df.columns]
+
+    texts = []
+    for col in header_columns:
+        texts.extend(t for t in df[col] if _is_translatable(t))
 
-    def safe_translate(text):
-        if pd.notna(text) and text not in ["None", None]:
-            return translator.translate(text)
-        return text
+    backend = get_translation_backend(*(backend_config or (HEADER_BACKEND, HEADER_BACKEND_OPTIONS)))
+    translations, translation_client = _translate_texts(texts, src_lang, tgt_lang, backend, "headers")
 
-    # You could vectorize this, but for clarity we do a row-based approach:
-    rows = df.to_dict('records')
-    header_1_translated = []
-    header_2_translated = []
+    for col in ("header_1", "header_2"):
+        if col not in df.columns:
+            df[f"{col}_translated"] = None
+            continue
+        df[f"{col}_translated"] = [translations.get(t) if _is_translatable(t) else t for t in df[col]]
+    _record_failures(df, translation_client)
+    return df
 
-    for row in tqdm(rows, desc="Translating headers"):
-        h1 = safe_translate(row.get("header_1"))
-        h2 = safe_translate(row.get("header_2"))
-        header_1_translated.append(h1)
-        header_2_translated.append(h2)
 
-    df["header_1_translated"] = header_1_translated
-    df["header_2_translated"] = header_2_translated
+def dedup_facts(df):
+    """
+    Add a `fact_representative` column: the fact whose translation each row will reuse.
+    Only exact duplicates (after case/whitespace normalization) share a translation;
+    near-duplicates are left alone (fact_dedup.py reports them per topic).
+    Counts go to df.attrs["fact_clusters"].
+    """
+    if "fact" not in df.columns:
+        return df
+    if not FACT_DEDUP:
+        df["fact_representative"] = df["fact"]
+        return df
+    facts = df["fact"].tolist()
+    representatives = exact_representatives(facts)
+    df["fact_representative"] = [representatives.get(t, t) if _is_translatable(t) else t for t in facts]
+    stats = {
+        "facts": sum(1 for t in facts if t in representatives),
+        "distinct": len(set(representatives.values())),
+    }
+    df.attrs["fact_clusters"] = stats
+    if stats["distinct"] < stats["facts"]:
+        logger.info(f"{stats['facts']} facts -> {stats['distinct']} distinct to translate")
     return df
 
 
-def translate_facts(df, src_lang, tgt_lang):
+def translate_facts(df, src_lang, tgt_lang, backend_config=None):
     """
-    Translate the `fact` column with GPT. If there's no 'fact' column, does nothing.
+    Translate the `fact` column with the FACT_BACKEND (or `backend_config`, as for
+    translate_headers). If there's no 'fact' column, does nothing.
+    Distinct facts are sent several at a time (as a JSON array for the openai backend),
+    with several requests in flight. When dedup_facts has run, only one fact per
+    normalized form is translated and every exact duplicate gets its representative's translation.
+    Facts that fail are left as None in `fact_translated` and listed in
+    df.attrs["translation_failures"].
     """
     if "fact" not in df.columns:
         return df
 
-    def gpt_translate(text):
-        if pd.notna(text) and text not in ["None", None]:
-            try:
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": (
-                                f"Translate the following content: '{text}' "
-                                f"from {src_lang} to {tgt_lang}. "
-                                "Return only the translation."
-                            )
-                        }
-                    ]
-                )
-                return response.choices[0].message.content.strip()
-            except Exception as e:
-                return f"Translation Error: {e}"
-        return text
-
-    rows = df.to_dict('records')
-    fact_translated = []
-
-    for row in tqdm(rows, desc="Translating facts"):
-        translated = gpt_translate(row.get("fact"))
-        # Try to unescape if it looks like a JSON-encoded string
-        if isinstance(translated, str):
-            try:
-                # If translated was something like "\"Galof rice...\""
-                # json.loads() will convert it to a clean string
-                possibly_unescaped = json.loads(translated)
-                if isinstance(possibly_unescaped, str):
-                    translated = possibly_unescaped
-            except json.JSONDecodeError:
-                # Not a JSON-encoded string, so just keep the original
-                pass
-
-        fact_translated.append(translated)
-
-    df["fact_translated"] = fact_translated
+    column = "fact_representative" if "fact_representative" in df.columns else "fact"
+    facts = df[column].tolist()
+    backend = get_translation_backend(*(backend_config or (FACT_BACKEND, FACT_BACKEND_OPTIONS)))
+    translations, translation_client = _translate_texts(
+        [t for t in facts if _is_translatable(t)], src_lang, tgt_lang, backend, "facts"
+    )
+
+    df["fact_translated"] = [translations.get(t) if _is_translatable(t) else t for t in facts]
+    _record_failures(df, translation_client)
     return df
 
 
 # --- Helper utilities for final JSON ---
 def safe_value(value):
     """ Convert NaN to None so JSON doesn't store 'NaN'. """
+    import pandas as pd
+
     return None if pd.isna(value) else value
 
-import ast
-import numpy as np
-import pandas as pd
 
 def parse_as_list(value):
     """
@@ -324,6 +476,8 @@ def parse_as_list(value):
       - If it's a string that looks like a list, parse with ast.literal_eval.
       - Otherwise, make it a single-element list of the stringified value.
     """
+    import numpy as np
+    import pandas as pd
 
     # 1) Handle arrays/Series by converting them into Python lists
     if isinstance(value, (pd.Series, np.ndarray)):
@@ -354,42 +508,114 @@ def parse_as_list(value):
     return [str(value)]
 
 # --- Wikidata lookups (optional) ---
+# All lookups go through a memoized, batched WikidataResolver (see wikidata_resolver.py).
 def get_wikidata_id(article_title, lang='en'):
     """Get the Wikidata QID for a given Wikipedia article title."""
-    url = (
-        f"https://www.wikidata.org/w/api.php?"
-        f"action=wbgetentities&sites={lang}wiki&titles={article_title}"
-        f"&props=info&format=json"
-    )
-    resp = requests.get(url)
-    data = resp.json()
-    entities = data.get("entities", {})
-    if entities:
-        return list(entities.keys())[0]  # e.g. "Q12345"
-    return None
+    return get_wikidata_resolver().resolve([article_title], lang).get(article_title)
 
 def get_interlanguage_links(wikidata_id):
-    url = (
-        f"https://www.wikidata.org/w/api.php?"
-        f"action=wbgetentities&ids={wikidata_id}&props=sitelinks/urls&format=json"
-    )
-    resp = requests.get(url)
-    data = resp.json()
-    sitelinks = data.get("entities", {}).get(wikidata_id, {}).get("sitelinks", {})
-    return {site: info['url'] for site, info in sitelinks.items()}
+    return get_wikidata_resolver().sitelinks(wikidata_id)
 
 def get_tgt_wiki_link(name, src_lang, tgt_lang):
     """Resolve a target-language Wikipedia link from Wikidata."""
-    wikidata_id = get_wikidata_id(name, src_lang)
-    if not wikidata_id:
-        logger.warning(f"No Wikidata ID found for: {name}")
-        return name  # fallback
+    return get_wikidata_resolver().tgt_wiki_links([name], src_lang, [tgt_lang])[name][tgt_lang]
+
+def get_tgt_wiki_links(name, src_lang, tgt_langs):
+    """{tgt_lang: link} for several target languages in one lookup."""
+    return get_wikidata_resolver().tgt_wiki_links([name], src_lang, tgt_langs)[name]
 
-    tgt_lang_wiki = f"{tgt_lang}wiki"
-    interlinks = get_interlanguage_links(wikidata_id)
-    if tgt_lang_wiki in interlinks:
-        return interlinks[tgt_lang_wiki]
-    return name
+
+def prefetch_wiki_links(titles, src_lang=SRC_LANGUAGE_FILTER):
+    """Resolve QIDs and sitelinks for all topics up front, 50 titles per request."""
+    get_wikidata_resolver().resolve(titles, src_lang)
+
+
+def _scalar_column(df, column):
+    """Column as a plain list with NaN/NA turned into None (missing columns -> all None)."""
+    if column not in df.columns:
+        return [None] * len(df)
+    values = df[column].astype(object)
+    return values.where(values.notna(), None).tolist()
+
+
+def _list_column(df, column):
+    """
+    Column as a list of Python lists. Native list cells pass through untouched;
+    only legacy values (stringified lists, arrays, scalars) go through parse_as_list.
+    """
+    if column not in df.columns:
+        return [None] * len(df)
+    return [v if isinstance(v, list) else parse_as_list(v) for v in df[column].tolist()]
+
+
+def iter_nested_groups(df):
+    """
+    Yield (person, language, header_1, entries) for every group of rows, in the order the
+    groups appear in the nested JSON (all headers of a language together, languages of a
+    person together, each in order of first appearance).
+    Skips rows with language == SRC_LANGUAGE_FILTER if desired.
+    Columns are pulled out once and rows are grouped by (person, language, header_1)
+    with a groupby; a group's entries are only built when it is yielded, so a consumer
+    that writes groups as it goes never holds every entry at once.
+    """
+    import pandas as pd
+
+    if df.empty:
+        return
+
+    # Use the first 'person_name' as a fallback reference
+    person = df['person_name'].iloc[0]
+
+    # Possibly skip rows with language == SRC_LANGUAGE_FILTER
+    df = df[df['language'] != SRC_LANGUAGE_FILTER]
+    if df.empty:
+        return
+
+    # Pre-fetch the wiki links for every language in one lookup
+    languages_dict = get_tgt_wiki_links(person, SRC_LANGUAGE_FILTER, list(df['language'].unique()))
+
+    persons = _scalar_column(df, 'person_name')
+    languages = _scalar_column(df, 'language')
+    header_1_vals = [h or "General description" for h in _scalar_column(df, 'header_1')]
+    header_2_vals = _scalar_column(df, 'header_2')
+    header_2_translated = _scalar_column(df, 'header_2_translated')
+    header_1_translated = _scalar_column(df, 'header_1_translated')
+    facts = _scalar_column(df, 'fact')
+    facts_translated = _scalar_column(df, 'fact_translated')
+    aligned_sentences = _scalar_column(df, 'fact_aligned_sentence')
+    src_contexts = _list_column(df, 'src_context')
+    tgt_sentences = _list_column(df, 'tgt_fact_aligned_sentences')
+
+    def entry(pos):
+        return {
+            'header_2': {'original': header_2_vals[pos], 'translated': header_2_translated[pos]},
+            'header_1': {'original': header_1_vals[pos], 'translated': header_1_translated[pos]},
+            'fact': {
+                'original': facts[pos],
+                'translated': facts_translated[pos],
+                'fact_aligned_sentence': aligned_sentences[pos],
+                'wiki_link': languages_dict.get(languages[pos], persons[pos])
+            },
+            'src_context': src_contexts[pos],
+            'tgt_fact_aligned_sentences': tgt_sentences[pos]
+        }
+
+    keys = pd.DataFrame({'person': persons, 'language': languages, 'header_1': header_1_vals})
+    groups = keys.groupby(['person', 'language', 'header_1'], sort=False, dropna=False).indices
+
+    # Nested order: by first appearance of the person, then of the (person, language) pair,
+    # then of the group itself
+    first_seen = {}
+    for pos, (p, lang) in enumerate(zip(persons, languages)):
+        first_seen.setdefault(p, pos)
+        first_seen.setdefault((p, lang), pos)
+
+    def nested_order(item):
+        (p, lang, _), positions = item
+        return first_seen[p], first_seen[(p, lang)], positions[0]
+
+    for (person, language, header_1_val), positions in sorted(groups.items(), key=nested_order):
+        yield person, language, header_1_val, [entry(pos) for pos in positions]
 
 
 def df_to_nested_json(df):
@@ -408,63 +634,12 @@ def df_to_nested_json(df):
         }
       }
     Skips rows with language == SRC_LANGUAGE_FILTER if desired.
+    (main streams iter_nested_groups straight to disk instead; see topic_writer.py.)
     """
-    if df.empty:
-        return {}
-
     nested_dict = {}
-    # Use the first 'person_name' as a fallback reference
-    person = df['person_name'].iloc[0]
-
-    # Collect all languages encountered that are not the source language
-    non_src_langs = df.loc[df['language'] != SRC_LANGUAGE_FILTER, 'language'].unique()
-
-    # Pre-fetch the wiki links for each language
-    # (Use dict comprehension if you want to do it once per person!)
-    languages_dict = {}
-    for lang in non_src_langs:
-        languages_dict[lang] = get_tgt_wiki_link(person, SRC_LANGUAGE_FILTER, lang)
-
-    for _, row in df.iterrows():
-        # Possibly skip rows with language == SRC_LANGUAGE_FILTER
-        if row['language'] == SRC_LANGUAGE_FILTER:
-            continue
-
-        person = row['person_name']
-        language = row['language']
-        tgt_wiki_link = languages_dict.get(language, row['person_name'])
-
-        header_1_val = safe_value(row.get('header_1')) or "General description"
-
-        # Make sure nested dict structure exists
+    for person, language, header_1_val, entries in iter_nested_groups(df):
         nested_dict.setdefault(person, {}).setdefault('languages', {})\
-                   .setdefault(language, {}).setdefault('headers', {})\
-                   .setdefault(header_1_val, {'entries': []})
-
-        src_context = parse_as_list(row.get('src_context'))
-        tgt_sentences = parse_as_list(row.get('tgt_fact_aligned_sentences'))
-
-        entry = {
-            'header_2': {
-                'original': safe_value(row.get('header_2')),
-                'translated': safe_value(row.get('header_2_translated'))
-            },
-            'header_1': {
-                'original': header_1_val,
-                'translated': safe_value(row.get('header_1_translated'))
-            },
-            'fact': {
-                'original': safe_value(row.get('fact')),
-                'translated': safe_value(row.get('fact_translated')),
-                'fact_aligned_sentence': safe_value(row.get('fact_aligned_sentence')),
-                'wiki_link': tgt_wiki_link
-            },
-            'src_context': src_context,
-            'tgt_fact_aligned_sentences': tgt_sentences
-        }
-
-        nested_dict[person]['languages'][language]['headers'][header_1_val]['entries'].append(entry)
-
+                   .setdefault(language, {}).setdefault('headers', {})[header_1_val] = {'entries': entries}
     return nested_dict
 
 
@@ -487,112 +662,621 @@ def weighted_sampling_by_header(df, header_column="header_1", sample_size=15):
 
 
 # ---------------------------
-# 7) MAIN WORKFLOW
+# 7) EXECUTION ENGINE
 # ---------------------------
-def main():
-    """
-    High-level steps:
-      1) For each (en_title, tgt_title) in en_tgt_title_pairs, load & parse JSON -> DF.
-      2) Retrieve paragraph blocks, attach header info.
-      3) Translate, filter, sample.
-      4) Collect all rows, convert to nested JSON, write out.
-    """
-    # Example placeholders
-    TARGET_LANGUAGES = ['ru', 'fr', 'zh']
-    json_directory = "data_pipeline/wikigap_data"
-    output_csv = "wikigap_data_temp.csv"
-    target_names = {
-        'fact',
-        'fact_aligned_sentence',
-        'src_context',
-        'person_name',
-        'tgt_contexts',
-        'tgt_fact_aligned_sentences',
-        'intersection_label',
-        'language',
-        'paragraph_index'
+EXECUTOR_KIND = "process"  # "process", "thread" or "serial"
+MAX_WORKERS = None  # None -> one worker per CPU
+
+TARGET_NAMES = {
+    'fact',
+    'fact_aligned_sentence',
+    'src_context',
+    'person_name',
+    'tgt_contexts',
+    'tgt_fact_aligned_sentences',
+    'intersection_label',
+    'language',
+    'paragraph_index'
+}
+
+# Older annotation files name some columns differently: {old name: name used here}
+COLUMN_ALIASES = {
+    'gpt-4o_intersection_label': 'intersection_label',
+}
+
+
+OUTPUT_COMPACT = False  # No indentation in json/ output
+OUTPUT_SHARDED = False  # json/{topic}/{lang}.json + manifest.json instead of json/{topic}.json
+OUTPUT_MATCH_INDEX = True  # Sentence -> EN paragraph index next to the facts (see match_index.py)
+OUTPUT_SEARCH_INDEX = True  # Inverted index over the facts, per topic and for the corpus (see search_index.py)
+OUTPUT_BUNDLE = True  # Also write the binary fact bundle next to the JSON (see topic_bundle.py)
+OUTPUT_BUNDLE_COMPRESSION = "gzip"  # None, "gzip" or "brotli" (brotli is not readable by the extension)
+OUTPUT_CORPUS_MANIFEST = True  # Keep json/corpus.json (title -> topic files) current (see corpus_manifest.py)
+PIPELINE_VERSION = 2  # Bump when stage logic changes so cached stage outputs are invalidated
+INCREMENTAL = True
+
+# The units a run covers by default: every topic with annotation files (None), or a fixed list
+SELECTED_TOPICS = None
+TARGET_LANGUAGES = ['ru', 'fr', 'zh']
+JSON_DIRECTORY = "data_pipeline/wikigap_data"
+ANNOTATION_DATE = None  # None: each unit's newest annotation file (see annotation_catalog.py)
+
+
+def _article_digest(bio_id, lang, save_dir=BIO_SAVE_DIR):
+    """Content hash of one prescraped article, wherever it is stored."""
+    store = get_article_store(os.path.join(save_dir, os.path.basename(ARTICLE_STORE_PATH)))
+    if store is not None and (bio_id, lang) in store:
+        return bytes_digest(store.raw_bytes(bio_id, lang))
+    return file_digest(os.path.join(save_dir, f"{bio_id}_{lang}.pkl"))
+
+
+def pipeline_config_digest(translation=None):
+    """Hash of the settings that change translated output (`translation` from translation_config())."""
+    translation = translation or translation_config()
+    return stage_key(
+        PIPELINE_VERSION, LANG_CODE_MAPPING_HEADER, LANG_CODE_MAPPING,
+        get_translation_backend(*translation["header"]).fingerprint(),
+        get_translation_backend(*translation["fact"]).fingerprint(),
+        SRC_LANGUAGE_FILTER, FACT_DEDUP,
+    )
+
+
+def unit_build_info(topic, tgt_lang, tgt_title, file_path, target_names, translation=None):
+    """Input hashes of one (topic, tgt_lang) unit and the stage keys derived from them."""
+    inputs = {
+        "annotation": file_digest(file_path),
+        "titles": file_digest(os.path.join(os.path.dirname(os.path.abspath(__file__)), f"scraped_titles_{tgt_lang}.py")),
+        "en_article": _article_digest(topic, "en"),
+        "tgt_article": _article_digest(tgt_title, tgt_lang) if tgt_title else None,
+        "config": pipeline_config_digest(translation),
     }
+    keys = {"extract": stage_key("extract", inputs["annotation"], sorted(target_names), sorted(COLUMN_ALIASES.items()))}
+    keys["attach"] = stage_key("attach", keys["extract"], inputs["titles"], inputs["en_article"], inputs["tgt_article"])
+    keys["translate"] = stage_key("translate", keys["attach"], inputs["config"])
+    return {"topic": topic, "language": tgt_lang, "inputs": inputs, "keys": keys}
 
 
-    selected_topics = ["Paella", "Injera", "Oolong", "Wiener schnitzel", "Peking duck", "Philippine adobo"]
-    for topic in selected_topics:
-        today = '2025-03-24'
-        sample_size = 20  # Example sample size
-        all_dfs = []
-        for tgt_lang in TARGET_LANGUAGES:
-            tgt_title = retrieve_title(topic, tgt_lang)
-            en_title = topic
-            file_name = f"annotation_{today}_{en_title}_{tgt_lang}.json"
-            df = process_single_json_file(json_directory, file_name, target_names, output_csv)
-            if df.empty:
-                logger.warning(f"No data extracted from {file_name}, skipping.")
-                continue
+def _stage_stored(stage_name, keys, extracted_path):
+    """Whether a unit's stage output is already stored under its current key (nothing is loaded)."""
+    if stage_name == "extract":
+        return extracted_path is not None and extracted_key(extracted_path) == keys["extract"]
+    return get_stage_cache().contains(stage_name, keys[stage_name])
 
-            try:
+
+def process_topic_language(topic, tgt_lang, json_directory, target_names, today, intermediate_dir=INTERMEDIATE_DIR,
+                           incremental=INCREMENTAL, stop_after=None, annotation_files=None, translation=None):
+    """
+    One independent (topic, tgt_lang) unit of work:
+    parse the annotation file, attach headers from the prescraped article and translate.
+    The annotation file is the one dated `today`, or the unit's newest one if `today` is None:
+    looked up in `annotation_files` ({(topic, tgt_lang): file name}, from the catalog _main
+    scanned once) or, without it, by listing `json_directory`.
+    The extraction is kept as a Parquet intermediate in `intermediate_dir` (None to skip).
+    Each stage's output is cached under a key built from the content hashes of its inputs;
+    with `incremental`, an unchanged unit is answered from that cache (for the extract
+    stage, the cache is the intermediate itself).
+    With `stop_after` ("extract", "attach" or "translate") the unit only makes sure that
+    stage's output is stored and returns None; an output that is already stored isn't
+    even loaded. This is what the per-stage CLI subcommands run.
+    `translation` picks the backends (see translation_config(); None: the module settings).
+    Returns the translated DataFrame, or None if there is nothing to keep.
+    """
+    translation = translation or translation_config()
+    tgt_title = retrieve_title(topic, tgt_lang)
+    en_title = topic
+    if today is None:
+        if annotation_files is None:
+            file_name = latest_annotation_file(json_directory, en_title, tgt_lang)
+        else:
+            file_name = annotation_files.get((en_title, tgt_lang))
+        if file_name is None:
+            logger.warning(f"No annotation file for {topic} ({tgt_lang}) in {json_directory}, skipping.")
+            return None
+    else:
+        file_name = annotation_file_name(en_title, tgt_lang, today)
+    build = unit_build_info(
+        topic, tgt_lang, tgt_title, os.path.join(json_directory, file_name), target_names, translation
+    )
+    keys = build["keys"]
+    cache = get_stage_cache()
+    extracted_path = intermediate_path(file_name, intermediate_dir) if intermediate_dir else None
+
+    def finish(df_out):
+        if stop_after is not None or df_out is None or df_out.empty:
+            return None
+        df_out.attrs["build"] = build
+        return df_out
+
+    if incremental and stop_after is not None:
+        if _stage_stored(stop_after, keys, extracted_path):
+            logger.info(f"{topic} ({tgt_lang}) {stop_after} output is up to date")
+            return None
+    elif incremental:
+        df_translated = cache.load("translate", keys["translate"])
+        if df_translated is not None:
+            logger.info(f"{topic} ({tgt_lang}) unchanged, reusing translated rows")
+            return finish(df_translated)
+
+    df_tgt = cache.load("attach", keys["attach"]) if incremental and stop_after != "extract" else None
+    if df_tgt is None:
+        df = None
+        if incremental and extracted_path and extracted_key(extracted_path) == keys["extract"]:
+            with stage("extract_load") as record:
+                df = apply_schema(read_extracted(extracted_path))
+                record["rows_out"] = len(df)
+                record["frame_mb"] = frame_memory_mb(df)
+        if df is None:
+            with stage("json_parse") as record:
+                df = process_single_json_file(json_directory, file_name, target_names, extracted_path, keys["extract"])
+                record["rows_out"] = len(df)
+                record["frame_mb"] = frame_memory_mb(df)
+        if df.empty:
+            logger.warning(f"No data extracted from {file_name}, skipping.")
+            return None
+        if stop_after == "extract":
+            return None
+
+        try:
+            with stage("article_load"):
                 en_blocks = step_retrieve_prescraped_en_content_blocks(en_title)
                 tgt_blocks = step_retrieve_prescraped_tgt_content_blocks(tgt_title, tgt_lang)
-            except BioFilenotFoundError as e:
-                logger.warning(e)
-                continue
+        except BioFilenotFoundError as e:
+            logger.warning(e)
+            return None
 
-            # Convert paragraph blocks to a simpler list with indices
+        # Convert paragraph blocks to paragraph tables indexed by paragraph_index
+        with stage("paragraphs", rows_in=len(en_blocks) + len(tgt_blocks)) as record:
             processed_en_blocks = process_paragraphs_with_headers(en_blocks)
             processed_tgt_blocks = process_paragraphs_with_headers(tgt_blocks)
+            record["rows_out"] = len(processed_en_blocks) + len(processed_tgt_blocks)
 
-            # We only care about non-EN rows in this example
-            df_tgt = df[df["language"] != "en"].copy()
-            if df_tgt.empty:
-                continue
+        # We only care about non-EN rows in this example
+        df_tgt = df[df["language"] != "en"].copy()
 
-            # Attach header_1 and header_2 by paragraph_index
-            df_tgt["header_1"] = df_tgt["paragraph_index"].apply(
-                get_header_by_paragraph_index, args=(processed_tgt_blocks, "header_1")
-            )
-            df_tgt["header_2"] = df_tgt["paragraph_index"].apply(
-                get_header_by_paragraph_index, args=(processed_tgt_blocks, "header_2")
-            )
+        # Attach every header level by paragraph_index
+        with stage("header_join", rows_in=len(df_tgt)) as record:
+            if not df_tgt.empty:
+                df_tgt = apply_schema(attach_headers(df_tgt, processed_tgt_blocks))
+            record["rows_out"] = len(df_tgt)
+            record["frame_mb"] = frame_memory_mb(df_tgt)
+        cache.save("attach", keys["attach"], df_tgt)
 
-            # df_filtered = df_tgt[df_tgt['intersection_label'] == 'no']
-            # # Weighted sampling if desired
-            # df_tgt_sampled = weighted_sampling_by_header(df_filtered, header_column="header_1", sample_size=sample_size)
+    if df_tgt.empty or stop_after == "attach":
+        return None
 
-            # # Convert NaNs to None to avoid translator issues
-            # df_tgt_sampled = df_tgt_sampled.where(pd.notna(df_tgt_sampled), None)
+    df_filtered = df_tgt[df_tgt['intersection_label'] == 'no']
+    df_filtered = df_filtered.where(df_filtered.notna(), None)
+
+    # Translate headers and facts
+    with stage("translate_headers", rows_in=len(df_filtered)) as record:
+        df_translated = translate_headers(df_filtered, LANG_CODE_MAPPING_HEADER[tgt_lang], "en", translation["header"])
+        record["rows_out"] = len(df_translated)
+    with stage("fact_dedup", rows_in=len(df_translated)) as record:
+        df_translated = dedup_facts(df_translated)
+        record["rows_out"] = df_translated.attrs.get("fact_clusters", {}).get("distinct")
+    with stage("translate_facts", rows_in=len(df_translated)) as record:
+        df_translated = apply_schema(
+            translate_facts(df_translated, LANG_CODE_MAPPING[tgt_lang], "English", translation["fact"])
+        )
+        record["rows_out"] = len(df_translated)
+        record["frame_mb"] = frame_memory_mb(df_translated)
 
-            # # Translate headers, facts from RU -> EN
-            # df_tgt_sampled = translate_headers(df_tgt_sampled, LANG_CODE_MAPPING_HEADER[tgt_lang], "en")
-            # df_tgt_sampled = translate_facts(df_tgt_sampled, LANG_CODE_MAPPING[tgt_lang], "English")
+    # Units with failed translations are not cached so the next run retries them
+    if not df_translated.attrs.get("translation_failures"):
+        cache.save("translate", keys["translate"], df_translated)
+    return finish(df_translated)
 
-            # if not df_tgt_sampled.empty:
-            #     all_dfs.append(df_tgt_sampled)
-            df_filtered = df_tgt[df_tgt['intersection_label'] == 'no']
-            df_filtered = df_filtered.where(pd.notna(df_filtered), None)
 
-            # Translate headers and facts
-            df_translated = translate_headers(df_filtered, LANG_CODE_MAPPING_HEADER[tgt_lang], "en")
-            df_translated = translate_facts(df_translated, LANG_CODE_MAPPING[tgt_lang], "English")
+def write_topic_match_index(topic, df, path):
+    """
+    Index every aligned sentence of the topic's facts against the scraped English article
+    so the extension can jump straight to the matching paragraph.
+    Returns the number of indexed sentences (0 if the article isn't available).
+    """
+    try:
+        en_blocks = step_retrieve_prescraped_en_content_blocks(topic)
+    except BioFilenotFoundError as e:
+        logger.warning(f"No match index for {topic}: {e}")
+        return 0
+    sentences = [s for cell in _list_column(df, 'tgt_fact_aligned_sentences') for s in (cell or [])]
+    index = build_match_index(topic, process_paragraphs_with_headers(en_blocks), sentences)
+    write_match_index(index, path)
+    if index["unmatched"]:
+        logger.info(f"{topic}: {index['unmatched']} aligned sentences not found verbatim in the EN article")
+    return len(index["sentences"])
+
+
+def _run_unit(topic, tgt_lang, unit_kwargs):
+    """
+    Pool entry point. Exceptions are caught here so one failing unit
+    never takes down the pool or the other languages of the same topic.
+    """
+    recorder = StageRecorder(topic, tgt_lang)
+    with recorder.bound():
+        try:
+            with stage("unit") as record:
+                df = process_topic_language(topic, tgt_lang, **unit_kwargs)
+                record["rows_out"] = 0 if df is None else len(df)
+            return topic, tgt_lang, df, None, recorder.records
+        except Exception:
+            return topic, tgt_lang, None, traceback.format_exc(), recorder.records
 
-            if not df_translated.empty:
-                all_dfs.append(df_translated)
 
-        # Combine everything into one DataFrame
+def run_units(units, unit_kwargs, executor_kind=EXECUTOR_KIND, max_workers=MAX_WORKERS):
+    """
+    Run independent (topic, tgt_lang) units on a process/thread pool (or serially).
+    Returns ({topic: [df, ...]}, [(topic, tgt_lang, traceback), ...], [stage record, ...]).
+    The per-topic lists follow the order of `units`, whatever order the pool finishes in.
+    """
+    results = {}
+    failures = []
+    records = []
+
+    def collect(outcome):
+        topic, tgt_lang, df, error, unit_records = outcome
+        records.extend(unit_records)
+        if error is not None:
+            logger.error(f"Unit ({topic}, {tgt_lang}) failed:\n{error}")
+            failures.append((topic, tgt_lang, error))
+        elif df is not None:
+            results.setdefault(topic, {})[tgt_lang] = df
+
+    if executor_kind == "serial" or max_workers == 1 or len(units) == 1:
+        for topic, tgt_lang in units:
+            collect(_run_unit(topic, tgt_lang, unit_kwargs))
+    else:
+        from tqdm import tqdm
+
+        pool_cls = ProcessPoolExecutor if executor_kind == "process" else ThreadPoolExecutor
+        with pool_cls(max_workers=max_workers) as pool:
+            futures = [pool.submit(_run_unit, topic, tgt_lang, unit_kwargs) for topic, tgt_lang in units]
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Processing units"):
+                collect(future.result())
+
+    # Restore submission order within each topic so merged frames are deterministic
+    ordered = {}
+    for topic, tgt_lang in units:
+        df = results.get(topic, {}).get(tgt_lang)
+        if df is not None:
+            ordered.setdefault(topic, []).append(df)
+    return ordered, failures, records
+
+
+# ---------------------------
+# 8) MAIN WORKFLOW
+# ---------------------------
+def remove_topic_outputs(output):
+    """
+    Delete a topic's output (json/{topic}.json, or its shard directory) and the match,
+    search and bundle files next to it. Returns the removed paths.
+    """
+    paths = [output, match_index_path(output), search_index_path(output)]
+    paths += [bundle_path(output, compression) for compression in BUNDLE_SUFFIXES]
+    removed = []
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        else:
+            continue
+        removed.append(path)
+    return removed
+
+
+def nest_topics(dfs_by_topic, topics, force=False, retired=()):
+    """
+    Merge the translated units of each topic, convert them to nested JSON and write
+    json/{topic}.json (or its shards) plus the match and search indexes. A topic whose unit keys and
+    output settings match the build manifest, and whose files exist, is left alone
+    unless `force`. Every topic with data also gets its entry in the corpus manifest.
+    Topics in `retired` have no annotation files left: the outputs this pipeline wrote
+    for them are removed, along with their corpus manifest entry and build records.
+    Returns the stage records.
+    """
+    manifest = BuildManifest()
+    corpus_entries = {}
+    written = []
+    removed = []
+
+    # One batched Wikidata round trip for every topic instead of 2 requests per (topic, language)
+    recorder = StageRecorder()
+    with recorder.stage("wikidata") as record:
+        prefetched = [topic for topic in topics if topic in dfs_by_topic]
+        record["rows_in"] = len(prefetched)
+        prefetch_wiki_links(prefetched)
+
+    for topic in topics:
+        all_dfs = dfs_by_topic.get(topic)
+        if not all_dfs and topic in retired:
+            previous = manifest.topic(topic)
+            if previous is None:
+                logger.warning(f"{topic} has no annotation files left, but its outputs (if any) "
+                               f"were not written by this pipeline; leaving them alone")
+                continue
+            paths = remove_topic_outputs(previous["output"])
+            manifest.remove_topic(topic)
+            removed.append(topic)
+            logger.warning(f"{topic} has no annotation files left; removed {paths}")
+            continue
         if not all_dfs:
-            logger.warning("No data to combine. Exiting.")
-            return
-
-        df_merged = pd.concat(all_dfs, ignore_index=True)
-        df_merged = df_merged.where(pd.notna(df_merged), None)
-        print(df_merged)
-        # Convert to nested JSON
-        nested_json = df_to_nested_json(df_merged)
-
-        # Save final JSON
-        output_json = f"json/{topic}.json"
-        with open(output_json, "w", encoding="utf-8") as f:
-            json.dump(nested_json, f, indent=4, ensure_ascii=False)
+            logger.warning(f"No data to combine for {topic}, skipping.")
+            continue
+
+        output_json = f"json/{topic}" if OUTPUT_SHARDED else f"json/{topic}.json"
+        builds = [df.attrs["build"] for df in all_dfs]
+        for build in builds:
+            manifest.record_unit(topic, build["language"], build["inputs"], build["keys"])
+        # The links the nest step will write (already prefetched above). A title Wikidata
+        # couldn't resolve falls back to itself, so a later lookup that does resolve it
+        # changes the key and the topic is rebuilt instead of keeping the fallback links.
+        person = all_dfs[0]["person_name"].iloc[0]
+        link_languages = list(dict.fromkeys(
+            lang for df in all_dfs for lang in df["language"].unique() if lang != SRC_LANGUAGE_FILTER
+        ))
+        wiki_links = get_tgt_wiki_links(person, SRC_LANGUAGE_FILTER, link_languages)
+        nest_key = stage_key(
+            "nest", [build["keys"]["translate"] for build in builds], wiki_links, OUTPUT_COMPACT, OUTPUT_SHARDED,
+            OUTPUT_MATCH_INDEX, OUTPUT_SEARCH_INDEX, OUTPUT_BUNDLE and OUTPUT_BUNDLE_COMPRESSION,
+        )
+
+        # One unit per language, and every unit row becomes one entry of the output
+        facts = {build["language"]: len(df) for build, df in zip(builds, all_dfs)}
+
+        previous = manifest.topic(topic)
+        match_path = match_index_path(output_json) if OUTPUT_MATCH_INDEX else None
+        search_path = search_index_path(output_json) if OUTPUT_SEARCH_INDEX else None
+        bundle = bundle_path(output_json, OUTPUT_BUNDLE_COMPRESSION) if OUTPUT_BUNDLE else None
+        outputs = [path for path in (output_json, match_path, search_path, bundle) if path]
+        if not force and previous and previous["key"] == nest_key and all(os.path.exists(p) for p in outputs):
+            logger.info(f"{topic}: inputs unchanged, keeping {output_json}")
+            corpus_entries[topic] = topic_entry(person, output_json, facts, match_path, bundle, search_path)
+            continue
+
+        # Combine everything into one DataFrame, keeping the compact column dtypes
+        recorder.topic = topic
+        with recorder.stage("merge", rows_in=sum(len(df) for df in all_dfs)) as record:
+            df_merged = concat_frames(all_dfs)
+            df_merged = df_merged.where(df_merged.notna(), None)
+            record["rows_out"] = len(df_merged)
+            record["frame_mb"] = frame_memory_mb(df_merged)
+
+        # Nest once (this is where the Wikidata links are looked up); every output below
+        # is written from the same groups
+        with recorder.stage("nest", rows_in=len(df_merged)) as record:
+            groups = list(iter_nested_groups(df_merged))
+            record["rows_out"] = len(groups)
+        with recorder.stage("write", rows_in=len(df_merged)) as record:
+            if OUTPUT_SHARDED:
+                manifest_dict = write_topic_shards(groups, output_json, topic, compact=OUTPUT_COMPACT)
+                record["rows_out"] = sum(shard["entries"] for shard in manifest_dict["languages"].values())
+            else:
+                record["rows_out"] = write_topic_json(groups, output_json, compact=OUTPUT_COMPACT)
+        if match_path:
+            with recorder.stage("match_index", rows_in=len(df_merged)) as record:
+                record["rows_out"] = write_topic_match_index(topic, df_merged, match_path)
+        if search_path:
+            with recorder.stage("search_index", rows_in=len(df_merged)) as record:
+                index = build_search_index(topic, groups)
+                record["rows_out"] = write_search_index(index, search_path)
+        if bundle:
+            with recorder.stage("bundle", rows_in=len(df_merged)) as record:
+                record["rows_out"] = write_topic_bundle(groups, bundle, compression=OUTPUT_BUNDLE_COMPRESSION)
+        manifest.record_topic(topic, nest_key, output_json)
+        corpus_entries[topic] = topic_entry(person, output_json, facts, match_path, bundle, search_path)
+        written.append(topic)
         print(f"JSON file saved successfully: {output_json}")
 
+    manifest.save()
+    if OUTPUT_CORPUS_MANIFEST and (corpus_entries or removed):
+        corpus = update_corpus_manifest(corpus_entries, removed=removed)
+        # The corpus search index merges every topic's index, so rebuild it whenever one changed
+        if OUTPUT_SEARCH_INDEX and (written or removed or not os.path.exists(os.path.join(CORPUS_SEARCH_DIR, "meta.json"))):
+            recorder.topic = None
+            index_paths = {
+                topic: os.path.join("json", entry["search"])
+                for topic, entry in corpus["topics"].items() if entry.get("search")
+            }
+            with recorder.stage("corpus_search", rows_in=len(index_paths)) as record:
+                record["rows_out"] = write_corpus_search_index(index_paths)
+    return recorder.records
+
+
+def main(executor_kind=EXECUTOR_KIND, max_workers=MAX_WORKERS, force=False, report_dir=RUN_REPORT_DIR,
+         profile_path=None, topics=SELECTED_TOPICS, languages=TARGET_LANGUAGES, date=ANNOTATION_DATE,
+         stop_after=None, reuse_units=False, header_backend=None, fact_backend=None, fact_model=None):
+    """
+    High-level steps:
+      1) For each (topic, tgt_lang) unit, load & parse JSON -> DF (in parallel).
+      2) Retrieve paragraph blocks, attach header info.
+      3) Translate, filter, sample.
+      4) Merge the units of each topic, convert to nested JSON, write out.
+    `topics` None means every topic with annotation files, and `date` None each
+    unit's newest annotation file (see annotation_catalog.py).
+    Stages whose input hashes haven't changed since the last run are reused
+    (see build_cache.py); `force` rebuilds everything, or only the topic files
+    with `reuse_units`. `stop_after` ("extract", "attach" or "translate") builds
+    the units up to that stage and writes no topic files.
+    `header_backend`, `fact_backend` and `fact_model` override HEADER_BACKEND, FACT_BACKEND
+    and FACT_MODEL; a run that translates checks both backends before starting any unit.
+    Per-stage timings, memory, row counts and cache/network figures go to a run
+    report in `report_dir` (None to skip). `profile_path` additionally dumps a
+    cProfile of the main process; run serially to include the unit stages.
+    """
+    profiler = None
+    if profile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        translation = translation_config(header_backend, fact_backend, fact_model)
+        records = _main(executor_kind, max_workers, force, topics, languages, date, stop_after, reuse_units, translation)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            logger.info(f"cProfile written to {profile_path}")
+
+    if report_dir:
+        extra = {
+            "executor_kind": executor_kind, "max_workers": max_workers, "force": force, "stop_after": stop_after,
+            "backends": {role: name for role, (name, _) in translation.items()},
+        }
+        json_path, csv_path = write_run_report(records, report_dir, extra=extra)
+        logger.info(f"Run report written to {json_path} and {csv_path}")
+    return records
+
+
+def _main(executor_kind, max_workers, force, topics, languages, date, stop_after=None, reuse_units=False,
+          translation=None):
+    translation = translation or translation_config()
+    if stop_after in (None, "translate"):
+        # Fail here, once, rather than in every unit after it has spent time on the other backend
+        check_translation_backends(translation)
+    catalog = scan_annotations(JSON_DIRECTORY)
+    present = catalog_topics(catalog)
+    # Topics whose annotation files are all gone: the requested ones, or by default every
+    # topic this pipeline has built before
+    candidates = BuildManifest().topics() if topics is None else topics
+    retired = [topic for topic in candidates if topic not in present]
+    topics = present if topics is None else topics
+    units = [(topic, tgt_lang) for topic in topics for tgt_lang in languages]
+    annotation_files = None
+    if date is None:
+        # Only the units that have an annotation file; each one reads its newest
+        latest = latest_annotations(catalog)
+        missing = [unit for unit in units if unit not in latest]
+        if missing:
+            logger.info(f"No annotation files for {missing}")
+        units = [unit for unit in units if unit in latest]
+        annotation_files = {unit: latest[unit][1] for unit in units}
+    unit_kwargs = {
+        "json_directory": JSON_DIRECTORY,
+        "target_names": TARGET_NAMES,
+        "today": date,
+        "intermediate_dir": INTERMEDIATE_DIR,
+        "incremental": reuse_units or not force,
+        "stop_after": stop_after,
+        "annotation_files": annotation_files,
+        "translation": translation,
+    }
+
+    dfs_by_topic, failures, records = run_units(units, unit_kwargs, executor_kind, max_workers)
+    if failures:
+        logger.warning(f"{len(failures)} of {len(units)} units failed: {[(t, l) for t, l, _ in failures]}")
+    if stop_after is not None:
+        return records
+    nested_topics = topics + [topic for topic in retired if topic not in topics]
+    return records + nest_topics(dfs_by_topic, nested_topics, force, retired)
+
+
+def watch(interval=WATCH_INTERVAL, topics=SELECTED_TOPICS, languages=TARGET_LANGUAGES, force=False, **main_kwargs):
+    """
+    Keep json/ current with the annotation directory: one run to catch up, then, whenever
+    annotation files appear, change or disappear, a run over the topics they belong to.
+    The other units of those topics come straight from the stage cache, so only the
+    affected (topic, lang) units are processed again. Runs until interrupted.
+    """
+    watcher = AnnotationWatcher(JSON_DIRECTORY, interval)
+    # Baseline first, so files arriving during the catch-up run are picked up afterwards
+    watcher.poll()
+    main(topics=topics, languages=languages, force=force, **main_kwargs)
+    logger.info(f"Watching {JSON_DIRECTORY} for annotation changes every {interval}s")
+    try:
+        for units in watcher.watch():
+            affected = sorted(
+                (topic, tgt_lang) for topic, tgt_lang in units
+                if tgt_lang in languages and (topics is None or topic in topics)
+            )
+            if not affected:
+                continue
+            logger.info(f"Annotation files changed for {affected}")
+            try:
+                main(topics=list(dict.fromkeys(topic for topic, _ in affected)), languages=languages, **main_kwargs)
+            except Exception:
+                # Keep watching: a bad file shouldn't take the daemon down
+                logger.error(f"Processing {affected} failed:\n{traceback.format_exc()}")
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+
+
+# ---------------------------
+# 9) COMMAND LINE
+# ---------------------------
+# python data_pipeline/process_annotations.py [command] [--topic T]... [--lang L]... [options]
+#
+#   extract         annotation JSON -> Parquet intermediate, per unit
+#   attach-headers  section headers from the prescraped articles, per unit
+#   translate       translated headers and facts, per unit
+#   nest            each topic's translated units -> json/ (+ match index)
+#   all             everything (the default)
+#   watch           `all`, then again for every topic whose annotation files change
+#
+# Topics default to every topic with annotation files, and each unit reads its newest
+# annotation file unless --date picks one.
+# A stage builds whatever it depends on that isn't stored yet, and a unit whose output is
+# already current is skipped without loading it, so short per-topic jobs that find nothing
+# to do never import pandas. `nest --force` rewrites the topic files from the stored units;
+# `all --force` rebuilds every stage. The commands that translate take --header-backend,
+# --fact-backend and --fact-model in place of the settings in section 5.
+CLI_COMMANDS = {
+    "extract": ("extract", "Parse annotation files into Parquet intermediates"),
+    "attach-headers": ("attach", "Attach section headers from the prescraped articles"),
+    "translate": ("translate", "Translate headers and facts"),
+    "nest": (None, "Write each topic's nested JSON and match index from the translated units"),
+    "all": (None, "Run every stage"),
+    "watch": (None, "Run every stage, then keep reprocessing units whose annotation files change"),
+}
+
+
+def cli(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog="process_annotations.py", description="WikiGap annotation pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, (last_stage, help_text) in CLI_COMMANDS.items():
+        command = commands.add_parser(name, help=help_text, description=help_text)
+        command.add_argument("--topic", action="append", dest="topics",
+                             help="English topic title (repeatable; default: every topic with annotation files)")
+        command.add_argument("--lang", action="append", dest="languages", choices=TARGET_LANGUAGES,
+                             help="Target language (repeatable; default: all)")
+        command.add_argument("--date", default=ANNOTATION_DATE,
+                             help="Date in the annotation file names (default: each unit's newest)")
+        command.add_argument("--force", action="store_true", help="Rebuild even if the outputs are current")
+        command.add_argument("--executor", choices=["process", "thread", "serial"], default=EXECUTOR_KIND)
+        command.add_argument("--workers", type=int, default=MAX_WORKERS)
+        command.add_argument("--report-dir", default=RUN_REPORT_DIR, help="Run report directory ('' to skip)")
+        command.add_argument("--profile", metavar="PATH", help="Dump a cProfile of the main process")
+        if last_stage not in ("extract", "attach"):
+            command.add_argument("--header-backend", choices=sorted(BACKENDS),
+                                 help=f"Translation backend for section headers (default: {HEADER_BACKEND})")
+            command.add_argument("--fact-backend", choices=sorted(BACKENDS),
+                                 help=f"Translation backend for facts (default: {FACT_BACKEND})")
+            command.add_argument("--fact-model", help=f"Model of the openai fact backend (default: {FACT_MODEL})")
+        if name == "watch":
+            command.add_argument("--interval", type=float, default=WATCH_INTERVAL,
+                                 help="Seconds between polls of the annotation directory")
+    args = parser.parse_args(argv or ["all"])
+
+    backends = {
+        option: getattr(args, option, None) for option in ("header_backend", "fact_backend", "fact_model")
+    }
+    if args.command == "watch":
+        watch(
+            interval=args.interval, topics=args.topics or SELECTED_TOPICS, languages=args.languages or TARGET_LANGUAGES,
+            force=args.force, executor_kind=args.executor, max_workers=args.workers,
+            report_dir=args.report_dir or None, date=args.date, **backends,
+        )
+        return
+
+    stop_after = CLI_COMMANDS[args.command][0]
+    main(
+        executor_kind=args.executor, max_workers=args.workers, force=args.force,
+        report_dir=args.report_dir or None, profile_path=args.profile,
+        topics=args.topics or SELECTED_TOPICS, languages=args.languages or TARGET_LANGUAGES, date=args.date,
+        stop_after=stop_after, reuse_units=args.command == "nest", **backends,
+    )
+
 
 # Pythonic entry point
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
@@ -0,0 +1,175 @@
+import os
+import csv
+import json
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# ---------------------------
+# Stage instrumentation
+# ---------------------------
+# Every pipeline stage runs inside `with stage("name", rows_in=...) as record:`.
+# The stage records wall time, CPU time, peak and current RSS, rows in/out and the
+# deltas of the thread's event counters (network calls, cache hits/misses) while it ran.
+# Peak RSS only ever grows, so stages that produce a DataFrame also set
+# record["frame_mb"] (see frame_schema.frame_memory_mb) to show what each one holds.
+# Components bump counters with count("translation_requests") etc.
+#
+# A StageRecorder is bound to the current thread for the duration of a
+# (topic, lang) unit, so stages don't need the recorder passed around.
+# CPU time is process-wide: with the thread executor it includes the other
+# units' threads, so compare CPU figures from serial or process-pool runs.
+
+RUN_REPORT_DIR = "data_pipeline/run_reports"
+
+COUNTER_NAMES = [
+    "translation_requests",
+    "translation_cache_hits",
+    "translation_cache_misses",
+    "wikidata_requests",
+    "stage_cache_hits",
+    "stage_cache_misses",
+]
+
+_local = threading.local()
+
+
+def _counters():
+    if not hasattr(_local, "counters"):
+        _local.counters = Counter()
+    return _local.counters
+
+
+def count(name, n=1):
+    """Increment one of this thread's event counters."""
+    _counters()[name] += n
+
+
+def peak_rss_mb():
+    """Peak resident set size so far; None where the resource module doesn't exist (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+
+
+def rss_mb():
+    """Current resident set size; None where /proc/self/statm isn't available."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+class StageRecorder:
+    """Collects stage records for one (topic, lang) unit, or for topic-level work when lang is None."""
+
+    def __init__(self, topic=None, language=None):
+        self.topic = topic
+        self.language = language
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        counters_before = Counter(_counters())
+        record = {
+            "topic": self.topic,
+            "language": self.language,
+            "stage": name,
+            "rows_in": rows_in,
+            "rows_out": None,
+            "frame_mb": None,
+        }
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall_start, 6)
+            record["cpu_s"] = round(time.process_time() - cpu_start, 6)
+            record["peak_rss_mb"] = peak_rss_mb()
+            record["rss_mb"] = rss_mb()
+            delta = _counters() - counters_before
+            for counter in COUNTER_NAMES:
+                record[counter] = delta.get(counter, 0)
+            self.records.append(record)
+
+    @contextmanager
+    def bound(self):
+        """Make this the recorder used by module-level stage() calls in the current thread."""
+        previous = getattr(_local, "recorder", None)
+        _local.recorder = self
+        try:
+            yield self
+        finally:
+            _local.recorder = previous
+
+
+def stage(name, rows_in=None):
+    """Record a stage on the current thread's recorder (a throwaway one if none is bound)."""
+    recorder = getattr(_local, "recorder", None) or StageRecorder()
+    return recorder.stage(name, rows_in)
+
+
+# ---------------------------
+# Run report
+# ---------------------------
+def _rate(hits, misses):
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def summarize(records):
+    """Per-stage totals plus overall network and cache figures."""
+    stages = {}
+    for record in records:
+        totals = stages.setdefault(
+            record["stage"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": None, "max_frame_mb": None},
+        )
+        totals["count"] += 1
+        totals["wall_s"] = round(totals["wall_s"] + record["wall_s"], 6)
+        totals["cpu_s"] = round(totals["cpu_s"] + record["cpu_s"], 6)
+        if record.get("peak_rss_mb") is not None:
+            totals["peak_rss_mb"] = max(totals["peak_rss_mb"] or 0.0, record["peak_rss_mb"])
+        if record.get("frame_mb") is not None:
+            totals["max_frame_mb"] = max(totals["max_frame_mb"] or 0.0, record["frame_mb"])
+
+    counters = Counter()
+    for record in records:
+        for counter in COUNTER_NAMES:
+            counters[counter] += record.get(counter, 0)
+
+    return {
+        "stages": dict(sorted(stages.items(), key=lambda item: -item[1]["wall_s"])),
+        "counters": dict(counters),
+        "network_calls": counters["translation_requests"] + counters["wikidata_requests"],
+        "translation_cache_hit_rate": _rate(counters["translation_cache_hits"], counters["translation_cache_misses"]),
+        "stage_cache_hit_rate": _rate(counters["stage_cache_hits"], counters["stage_cache_misses"]),
+    }
+
+
+def write_run_report(records, report_dir=RUN_REPORT_DIR, run_id=None, extra=None):
+    """Write run_<id>.json (records + summary) and run_<id>.csv (one row per stage record)."""
+    run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+    os.makedirs(report_dir, exist_ok=True)
+    json_path = os.path.join(report_dir, f"run_{run_id}.json")
+    csv_path = os.path.join(report_dir, f"run_{run_id}.csv")
+
+    report = {"run_id": run_id, "summary": summarize(records), "records": records}
+    report.update(extra or {})
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    fields = [
+        "topic", "language", "stage", "wall_s", "cpu_s", "peak_rss_mb", "rss_mb", "frame_mb", "rows_in", "rows_out",
+    ] + COUNTER_NAMES
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(records)
+    return json_path, csv_path
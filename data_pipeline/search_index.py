@@ -0,0 +1,352 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import zlib
+import bisect
+import unicodedata
+from collections import Counter
+
+# ---------------------------
+# Fact search index
+# ---------------------------
+# An inverted index over each topic's facts (fact.original, fact.translated and the
+# header_1 / header_2 texts, so a section or subsection name finds its facts), written next to the topic JSON so searching never scans the facts:
+#
+#   json/{topic}.search.json   (json/{topic}/search.json for sharded output)
+#   {
+#     "format": "wikigap-search-v1",
+#     "topic": "Paella",
+#     "facts": ["fr1", "fr2", ..., "ru1", ...],   # fact ids, as content.js numbers its cards
+#     "lengths": [23, 31, ...],                   # tokens per fact
+#     "terms": {"saffron": [0, 2, 7, 1], ...}     # flat [fact number, term count, ...]
+#   }
+#
+# Fact ids are the language code plus the 1-based position of the entry within that
+# language in file order. Terms are tokenize() output: words lower-cased with accents
+# stripped, and for CJK text (which has no spaces) every character and character pair.
+# content.js applies the same tokenization to the search box.
+#
+# For searching across topics, write_corpus_search_index() merges the per-topic indexes
+# into json/corpus-search/: meta.json (topics, fact ids, lengths) plus SEARCH_SHARDS
+# term files, split by the term's first character, so a query only reads the shards
+# its terms live in (a prefix query still needs just one shard per term).
+# TopicSearchIndex and CorpusSearchIndex rank matches with BM25.
+
+SEARCH_INDEX_FORMAT = "wikigap-search-v1"
+CORPUS_SEARCH_DIR = "json/corpus-search"
+SEARCH_SHARDS = 64
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK_RUN = re.compile(f"([{_CJK}]+)")
+_WORD = re.compile(r"\w+")
+_COMBINING_MARKS = re.compile("[\u0300-\u036f]")
+
+
+def normalize_search_text(text):
+    """Lower-case, accents stripped: 'Crème' -> 'creme'. Mirrors normalizeSearchText in content.js."""
+    return _COMBINING_MARKS.sub("", unicodedata.normalize("NFKD", text)).lower()
+
+
+def _cjk_terms(run, query=False):
+    """Characters and character pairs of a CJK run; a query only needs the pairs."""
+    bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+    if query:
+        return bigrams or [run]
+    return list(run) + bigrams
+
+
+def tokenize(text, query=False):
+    terms = []
+    for word in _WORD.findall(normalize_search_text(text)):
+        for i, piece in enumerate(_CJK_RUN.split(word)):
+            if not piece:
+                continue
+            # split() with a capturing group puts the CJK runs at odd positions
+            terms.extend(_cjk_terms(piece, query) if i % 2 else [piece])
+    return terms
+
+
+def search_index_path(output_json):
+    """json/{topic}.json -> json/{topic}.search.json; sharded json/{topic} -> json/{topic}/search.json"""
+    if output_json.endswith(".json"):
+        return output_json[:-len(".json")] + ".search.json"
+    return os.path.join(output_json, "search.json")
+
+
+def _fact_text(entry):
+    texts = []
+    for field in ("fact", "header_1", "header_2"):
+        for key in ("original", "translated"):
+            value = (entry.get(field) or {}).get(key)
+            if isinstance(value, str):
+                texts.append(value)
+    return " ".join(texts)
+
+
+def build_search_index(topic, groups):
+    """Index (person, language, header_1, entries) groups in nested order."""
+    facts, lengths, terms = [], [], {}
+    per_language = Counter()
+    for _, language, _, entries in groups:
+        for entry in entries:
+            per_language[language] += 1
+            fact_number = len(facts)
+            facts.append(f"{language}{per_language[language]}")
+            counts = Counter(tokenize(_fact_text(entry)))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                terms.setdefault(term, []).extend((fact_number, count))
+    return {
+        "format": SEARCH_INDEX_FORMAT,
+        "topic": topic,
+        "facts": facts,
+        "lengths": lengths,
+        "terms": dict(sorted(terms.items())),
+    }
+
+
+def _write_json(data, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def write_search_index(index, path):
+    _write_json(index, path)
+    return len(index["facts"])
+
+
+def _fact_language(fact_id):
+    return fact_id.rstrip("0123456789")
+
+
+# ---------------------------
+# Querying
+# ---------------------------
+class _BM25Index:
+    """Subclasses provide postings(term) -> {doc: count}, terms_with_prefix(prefix), length(doc)."""
+
+    doc_count = 0
+    avg_length = 1.0
+
+    def _token_postings(self, term, prefix):
+        if not prefix:
+            return self.postings(term)
+        merged = {}
+        for expanded in self.terms_with_prefix(term):
+            for doc, count in self.postings(expanded).items():
+                merged[doc] = merged.get(doc, 0) + count
+        return merged
+
+    def rank(self, query, prefix=True):
+        """
+        [(doc, score), ...] best first for docs containing every query term. With prefix=True
+        the last term also matches longer words ('saff' finds 'saffron'), for search-as-you-type.
+        """
+        tokens = tokenize(query, query=True)
+        if not tokens:
+            return []
+        last = tokens[-1]
+        token_postings = [
+            self._token_postings(term, prefix and term == last and not _CJK_RUN.match(term))
+            for term in dict.fromkeys(tokens)
+        ]
+        token_postings.sort(key=len)
+        docs = set(token_postings[0])
+        for postings in token_postings[1:]:
+            docs.intersection_update(postings)
+            if not docs:
+                return []
+
+        scores = dict.fromkeys(docs, 0.0)
+        for postings in token_postings:
+            idf = math.log(1 + (self.doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc in docs:
+                count = postings[doc]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.length(doc) / self.avg_length)
+                scores[doc] += idf * count * (BM25_K1 + 1) / (count + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+class TopicSearchIndex(_BM25Index):
+    def __init__(self, index):
+        self.index = index
+        self.terms = index["terms"]
+        self.sorted_terms = sorted(self.terms)
+        self.doc_count = len(index["facts"])
+        self.avg_length = (sum(index["lengths"]) / self.doc_count) if self.doc_count else 1.0
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def postings(self, term):
+        flat = self.terms.get(term, ())
+        return dict(zip(flat[0::2], flat[1::2]))
+
+    def terms_with_prefix(self, prefix):
+        start = bisect.bisect_left(self.sorted_terms, prefix)
+        end = bisect.bisect_left(self.sorted_terms, prefix + "\U0010ffff")
+        return self.sorted_terms[start:end]
+
+    def length(self, doc):
+        return self.index["lengths"][doc]
+
+    def search(self, query, limit=20, languages=None, prefix=True):
+        """[(fact_id, score), ...] best first."""
+        facts = self.index["facts"]
+        results = [(facts[doc], round(score, 4)) for doc, score in self.rank(query, prefix)]
+        if languages:
+            results = [result for result in results if _fact_language(result[0]) in languages]
+        return results[:limit]
+
+
+def _shard_number(term, shards=SEARCH_SHARDS):
+    return zlib.crc32(term[:1].encode("utf-8")) % shards
+
+
+def write_corpus_search_index(index_paths, directory=CORPUS_SEARCH_DIR, shards=SEARCH_SHARDS):
+    """
+    Merge per-topic indexes ({topic: path}) into the sharded corpus index.
+    Returns the number of facts indexed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    meta = {"format": SEARCH_INDEX_FORMAT, "shards": shards, "topics": []}
+    shard_terms = [{} for _ in range(shards)]
+    for topic_number, (topic, path) in enumerate(sorted(index_paths.items())):
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        meta["topics"].append({"topic": topic, "facts": index["facts"], "lengths": index["lengths"]})
+        for term, flat in index["terms"].items():
+            postings = shard_terms[_shard_number(term, shards)].setdefault(term, [])
+            for i in range(0, len(flat), 2):
+                postings.extend((topic_number, flat[i], flat[i + 1]))
+
+    for number, terms in enumerate(shard_terms):
+        _write_json(dict(sorted(terms.items())), os.path.join(directory, f"terms-{number:02d}.json"))
+    _write_json(meta, os.path.join(directory, "meta.json"))
+    return sum(len(topic["facts"]) for topic in meta["topics"])
+
+
+class CorpusSearchIndex(_BM25Index):
+    """Query the sharded corpus index; term shards are read on first use and kept."""
+
+    def __init__(self, directory=CORPUS_SEARCH_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.topics = self.meta["topics"]
+        self.doc_count = sum(len(topic["facts"]) for topic in self.topics)
+        total_length = sum(sum(topic["lengths"]) for topic in self.topics)
+        self.avg_length = (total_length / self.doc_count) if self.doc_count else 1.0
+        self._shards = {}
+
+    def _shard(self, term):
+        number = _shard_number(term, self.meta["shards"])
+        if number not in self._shards:
+            with open(os.path.join(self.directory, f"terms-{number:02d}.json"), "r", encoding="utf-8") as f:
+                terms = json.load(f)
+            self._shards[number] = (terms, sorted(terms))
+        return self._shards[number]
+
+    def postings(self, term):
+        flat = self._shard(term)[0].get(term, ())
+        return {(flat[i], flat[i + 1]): flat[i + 2] for i in range(0, len(flat), 3)}
+
+    def terms_with_prefix(self, prefix):
+        sorted_terms = self._shard(prefix)[1]
+        start = bisect.bisect_left(sorted_terms, prefix)
+        end = bisect.bisect_left(sorted_terms, prefix + "\U0010ffff")
+        return sorted_terms[start:end]
+
+    def length(self, doc):
+        topic_number, fact_number = doc
+        return self.topics[topic_number]["lengths"][fact_number]
+
+    def search(self, query, limit=20, topics=None, languages=None, prefix=True):
+        """[(topic, fact_id, score), ...] best first."""
+        results = []
+        for (topic_number, fact_number), score in self.rank(query, prefix):
+            topic = self.topics[topic_number]
+            fact_id = topic["facts"][fact_number]
+            if topics and topic["topic"] not in topics:
+                continue
+            if languages and _fact_language(fact_id) not in languages:
+                continue
+            results.append((topic["topic"], fact_id, round(score, 4)))
+            if len(results) == limit:
+                break
+        return results
+
+
+def main():
+    """
+    python data_pipeline/search_index.py build [--json-dir json]
+    python data_pipeline/search_index.py query "saffron rice" [--topic Paella] [--lang fr] [--limit 20]
+    build (re)indexes every topic in json/corpus.json and writes the corpus index;
+    query searches the corpus index, or one topic's index with --topic.
+    """
+    args = sys.argv[1:]
+    if not args or args[0] not in ("build", "query"):
+        print(main.__doc__)
+        sys.exit(1)
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    json_dir = option("--json-dir", "json")
+    if args[0] == "build":
+        from corpus_manifest import load_corpus_manifest
+
+        corpus = load_corpus_manifest(os.path.join(json_dir, "corpus.json"))
+        index_paths = {}
+        for topic, entry in corpus["topics"].items():
+            nested = {}
+            paths = entry["shards"].values() if "shards" in entry else [entry["file"]]
+            for path in paths:
+                with open(os.path.join(json_dir, path), "r", encoding="utf-8") as f:
+                    for person, data in json.load(f).items():
+                        nested.setdefault(person, {"languages": {}})["languages"].update(data["languages"])
+            groups = (
+                (person, language, header, header_data["entries"])
+                for person, data in nested.items()
+                for language, language_data in data["languages"].items()
+                for header, header_data in language_data["headers"].items()
+            )
+            output = os.path.join(json_dir, entry["file"] if "file" in entry else topic)
+            index_paths[topic] = search_index_path(output)
+            count = write_search_index(build_search_index(topic, groups), index_paths[topic])
+            print(f"{index_paths[topic]}: {count} facts")
+        count = write_corpus_search_index(index_paths, os.path.join(json_dir, "corpus-search"))
+        print(f"{os.path.join(json_dir, 'corpus-search')}: {count} facts from {len(index_paths)} topics")
+        return
+
+    query = args[1]
+    topic = option("--topic")
+    languages = [option("--lang")] if "--lang" in args else None
+    limit = int(option("--limit", 20))
+    start = time.perf_counter()
+    if topic:
+        path = search_index_path(os.path.join(json_dir, f"{topic}.json"))
+        if not os.path.exists(path):
+            path = search_index_path(os.path.join(json_dir, topic))
+        results = [(topic,) + result for result in TopicSearchIndex.load(path).search(query, limit, languages)]
+    else:
+        results = CorpusSearchIndex(os.path.join(json_dir, "corpus-search")).search(
+            query, limit, languages=languages
+        )
+    elapsed = time.perf_counter() - start
+    for result_topic, fact_id, score in results:
+        print(f"{score:8.3f}  {result_topic}  {fact_id}")
+    print(f"{len(results)} results in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
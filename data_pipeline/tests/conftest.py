@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+
+import pytest
+
+# The pipeline modules import each other by bare name, as when run from data_pipeline/
+PIPELINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_DIR = os.path.join(PIPELINE_DIR, "tests", "fixtures")
+sys.path.insert(0, PIPELINE_DIR)
+
+WIKIDATA_SNAPSHOT = os.path.join(FIXTURE_DIR, "wikidata_snapshot.json")
+
+
+class FixtureResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} (fixture)", response=self)
+
+    def json(self):
+        return self.payload
+
+
+class FixtureWikidataSession:
+    """
+    Answers wbgetentities requests from the snapshot fixture, the way the API does:
+    one entity per found title (with its sitelinks), a "missing" entity per other title.
+    Every request's params are kept in `requests`.
+    """
+
+    def __init__(self, snapshot_path=WIKIDATA_SNAPSHOT):
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        self.titles = snapshot["titles"]
+        self.sitelinks = snapshot["sitelinks"]
+        self.requests = []
+
+    def _entity(self, qid, site=None, title=None):
+        links = {s: {"site": s, "url": url} for s, url in self.sitelinks.get(qid, {}).items()}
+        if site in links:
+            links[site]["title"] = title
+        return {"id": qid, "sitelinks": links}
+
+    def get(self, url, params, timeout):
+        self.requests.append(dict(params))
+        entities = {}
+        if "ids" in params:
+            for qid in params["ids"].split("|"):
+                entities[qid] = self._entity(qid)
+        else:
+            site = params["sites"]
+            for i, title in enumerate(params["titles"].split("|")):
+                qid = self.titles.get(site, {}).get(title)
+                if qid:
+                    entities[qid] = self._entity(qid, site, title)
+                else:
+                    entities[str(-1 - i)] = {"site": site, "title": title, "missing": ""}
+        return FixtureResponse({"entities": entities, "success": 1})
+
+
+@pytest.fixture
+def wikidata_session():
+    return FixtureWikidataSession()
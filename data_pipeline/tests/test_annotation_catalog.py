@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from annotation_catalog import (
+    AnnotationWatcher, annotation_file_name, catalog_topics, latest_annotation_file, latest_annotations,
+    parse_annotation_file_name, scan_annotations,
+)
+
+
+@pytest.mark.parametrize("file_name, expected", [
+    ("annotation_2025-03-24_Paella_fr.json", ("Paella", "fr", "2025-03-24")),
+    ("annotation_2025-03-24_Peking duck_ru.json", ("Peking duck", "ru", "2025-03-24")),
+    # Only the last underscore separates the language, so topics may contain underscores
+    ("annotation_2025-03-24_Crème_brûlée_fr.json", ("Crème_brûlée", "fr", "2025-03-24")),
+    ("annotation_2025-03-24_Oolong_zh-TW.json", ("Oolong", "zh-TW", "2025-03-24")),
+    ("annotation_2025-03-24_Injera_amh.json", ("Injera", "amh", "2025-03-24")),
+])
+def test_parse_annotation_file_name(file_name, expected):
+    assert parse_annotation_file_name(file_name) == expected
+    topic, lang, date = expected
+    assert annotation_file_name(topic, lang, date) == file_name
+
+
+@pytest.mark.parametrize("file_name", [
+    "annotation_2025-3-24_Paella_fr.json",
+    "annotation_2025-03-24_Paella.json",
+    "annotation_2025-03-24_Paella_FR.json",
+    "annotation_2025-03-24_Paella_fr.json.tmp",
+    "annotation_2025-03-24__fr.json",
+    "Paella.json",
+    "notes_2025-03-24_Paella_fr.json",
+])
+def test_other_file_names_are_not_annotations(file_name):
+    assert parse_annotation_file_name(file_name) is None
+
+
+def touch(directory, file_name, content="{}", mtime=None):
+    path = os.path.join(directory, file_name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return path
+
+
+def test_latest_annotation_per_unit(tmp_path):
+    for file_name in [
+        "annotation_2025-03-16_Oolong_fr.json", "annotation_2025-03-24_Oolong_fr.json",
+        "annotation_2025-03-20_Oolong_ru.json", "annotation_2025-03-24_Paella_fr.json", "README.md",
+    ]:
+        touch(tmp_path, file_name)
+
+    catalog = scan_annotations(str(tmp_path))
+
+    assert catalog[("Oolong", "fr")] == {
+        "2025-03-16": "annotation_2025-03-16_Oolong_fr.json", "2025-03-24": "annotation_2025-03-24_Oolong_fr.json",
+    }
+    assert latest_annotations(catalog)[("Oolong", "fr")] == ("2025-03-24", "annotation_2025-03-24_Oolong_fr.json")
+    assert latest_annotation_file(str(tmp_path), "Oolong", "ru") == "annotation_2025-03-20_Oolong_ru.json"
+    assert latest_annotation_file(str(tmp_path), "Oolong", "zh") is None
+    assert catalog_topics(catalog) == ["Oolong", "Paella"]
+    assert scan_annotations(str(tmp_path / "missing")) == {}
+
+
+def test_watcher_reports_a_new_file_after_one_stable_poll(tmp_path):
+    touch(tmp_path, "annotation_2025-03-24_Paella_fr.json")
+    watcher = AnnotationWatcher(str(tmp_path))
+    # The first poll is the baseline: files already there are not news
+    assert watcher.poll() == set()
+
+    touch(tmp_path, "annotation_2025-03-24_Paella_ru.json", '{"columns": [')
+    assert watcher.poll() == set()
+    # Still being written: the size changed since the last poll
+    touch(tmp_path, "annotation_2025-03-24_Paella_ru.json", '{"columns": []}')
+    assert watcher.poll() == set()
+    assert watcher.poll() == {("Paella", "ru")}
+    assert watcher.poll() == set()
+
+    touch(tmp_path, "notes.txt")
+    assert watcher.poll() == set()
+    assert watcher.poll() == set()
+
+
+def test_watcher_reports_a_rewritten_file_again(tmp_path):
+    path = touch(tmp_path, "annotation_2025-03-24_Paella_fr.json", mtime=1_000_000_000_000_000_000)
+    watcher = AnnotationWatcher(str(tmp_path))
+    watcher.poll()
+
+    # Same size, new mtime
+    touch(tmp_path, os.path.basename(path), mtime=1_000_000_001_000_000_000)
+    assert watcher.poll() == set()
+    assert watcher.poll() == {("Paella", "fr")}
+
+    touch(tmp_path, os.path.basename(path), mtime=1_000_000_002_000_000_000)
+    assert watcher.poll() == set()
+    assert watcher.poll() == {("Paella", "fr")}
+
+
+def test_watcher_reports_deleted_files(tmp_path):
+    path = touch(tmp_path, "annotation_2025-03-24_Paella_fr.json")
+    watcher = AnnotationWatcher(str(tmp_path))
+    watcher.poll()
+
+    os.remove(path)
+    assert watcher.poll() == set()
+    assert watcher.poll() == {("Paella", "fr")}
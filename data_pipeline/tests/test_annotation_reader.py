@@ -0,0 +1,114 @@
+import os
+import json
+
+import pandas as pd
+import pytest
+
+import annotation_reader
+from conftest import PIPELINE_DIR
+from process_annotations import TARGET_NAMES, process_json_file
+
+ANNOTATIONS = {
+    "current": "annotation_2025-03-24_Paella_fr.json",
+    # Written before the rename: the label column is gpt-4o_intersection_label (see COLUMN_ALIASES)
+    "aliased": "annotation_2025-03-16_Oolong_fr.json",
+}
+
+
+def list_cell(values, datatype="Utf8"):
+    return {"name": "", "datatype": datatype, "bit_settings": "", "values": values}
+
+
+def column(name, datatype, values, values_first=False):
+    fields = [("name", name), ("datatype", datatype), ("bit_settings", ""), ("values", values)]
+    if values_first:
+        fields = fields[3:] + fields[:3]
+    return dict(fields)
+
+
+def columns(values_first=False, label="intersection_label", rows=2, paragraphs=(3, 12)):
+    facts = ["Une \"paella\" [riz] {safran}", "Ligne\nsuivante \\ 😀 梨山"][:rows]
+    return [
+        column("fact", "Utf8", facts, values_first),
+        # Not requested: brackets and quotes inside it must not throw the scan off
+        column("notes", "Utf8", ['"]}{[', "\\\"["][:rows], values_first),
+        column("person_name", "Utf8", ["Paella"] * rows, values_first),
+        column("fact_aligned_sentence", "Utf8", [None, "Phrase."][:rows], values_first),
+        column("src_context", {"List": "Utf8"}, [list_cell(["a", "b"]), None][:rows], values_first),
+        column("tgt_contexts", {"List": {"List": "Utf8"}}, [
+            list_cell([list_cell(["c"]), list_cell(["d", "e"])], {"List": "Utf8"}),
+            list_cell([], {"List": "Utf8"}),
+        ][:rows], values_first),
+        column("tgt_fact_aligned_sentences", {"List": {"List": "Utf8"}}, [
+            list_cell([list_cell(["f"])], {"List": "Utf8"}),
+            None,
+        ][:rows], values_first),
+        column("tgt_fact_indices", {"List": "Float64"}, [list_cell([1.0, 2.5], "Float64"), None][:rows], values_first),
+        column("paragraph_index", "Int64", list(paragraphs)[:rows], values_first),
+        column(label, "Utf8", ["no", "yes"][:rows], values_first),
+        column("language", "Utf8", ["en"] * rows, values_first),
+    ]
+
+
+LAYOUTS = {
+    "pretty": lambda: json.dumps({"columns": columns()}, indent=2, ensure_ascii=False),
+    "compact": lambda: json.dumps({"columns": columns()}, separators=(",", ":")),
+    "values before name": lambda: json.dumps({"columns": columns(values_first=True)}),
+    "other top-level keys": lambda: json.dumps({"schema": {"columns": [1, 2]}, "columns": columns(), "n": 2}),
+    "aliased label": lambda: json.dumps({"columns": columns(label="gpt-4o_intersection_label")}),
+    "null paragraph index": lambda: json.dumps({"columns": columns(paragraphs=(3, None))}),
+    "single row": lambda: json.dumps({"columns": columns(rows=1)}),
+    "ragged columns": lambda: json.dumps({"columns": columns()[:2] + columns(rows=1)[2:]}),
+    "no columns requested": lambda: json.dumps({"columns": [column("notes", "Utf8", ["x"])]}),
+}
+
+
+def read_both(path, monkeypatch):
+    """(columnar reader frame, frame from the old json.load + extract_values walk)."""
+    new = process_json_file(path, TARGET_NAMES)
+
+    def not_columnar(*args, **kwargs):
+        raise annotation_reader.ColumnarLayoutError("forced fallback")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(annotation_reader, "read_columnar_annotation", not_columnar)
+        old = process_json_file(path, TARGET_NAMES)
+    return new, old
+
+
+@pytest.mark.parametrize("name", ANNOTATIONS)
+def test_annotation_files_match_the_json_walk(name, monkeypatch):
+    new, old = read_both(os.path.join(PIPELINE_DIR, "wikigap_data", ANNOTATIONS[name]), monkeypatch)
+
+    assert len(new) > 0
+    assert "intersection_label" in new.columns
+    assert "gpt-4o_intersection_label" not in new.columns
+    pd.testing.assert_frame_equal(new, old)
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_layouts_match_the_json_walk(layout, tmp_path, monkeypatch):
+    path = tmp_path / "annotation.json"
+    path.write_text(LAYOUTS[layout](), encoding="utf-8")
+
+    new, old = read_both(str(path), monkeypatch)
+
+    pd.testing.assert_frame_equal(new, old)
+    assert "notes" not in new.columns
+
+
+def test_aliased_label_is_renamed(tmp_path, monkeypatch):
+    path = tmp_path / "annotation.json"
+    path.write_text(LAYOUTS["aliased label"](), encoding="utf-8")
+
+    new, _ = read_both(str(path), monkeypatch)
+
+    assert new["intersection_label"].tolist() == ["no", "yes"]
+    assert new["tgt_contexts"].tolist() == [["c", "d", "e"], []]
+
+
+def test_other_layouts_are_rejected(tmp_path):
+    path = tmp_path / "annotation.json"
+    path.write_text(json.dumps([{"name": "fact", "values": ["x"]}]), encoding="utf-8")
+    with pytest.raises(annotation_reader.ColumnarLayoutError):
+        annotation_reader.read_columnar_annotation(str(path), {"fact"})
@@ -0,0 +1,91 @@
+import os
+import glob
+
+import pytest
+
+import article_store
+import process_annotations
+from article_store import ArticleNotFoundError, ArticleStore, migrate_pickles, write_article_store
+from conftest import PIPELINE_DIR
+
+dill = pytest.importorskip("dill")
+
+WIKI_FOOD = os.path.join(PIPELINE_DIR, "wiki_food")
+STORE_PATH = os.path.join(WIKI_FOOD, os.path.basename(article_store.ARTICLE_STORE_PATH))
+PICKLES = sorted(glob.glob(os.path.join(WIKI_FOOD, "*.pkl")))
+
+
+def pickle_key(path):
+    title, _, lang = os.path.basename(path)[:-len(".pkl")].rpartition("_")
+    return title, lang
+
+
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return dill.load(f)
+
+
+@pytest.fixture
+def store():
+    opened = ArticleStore(STORE_PATH)
+    yield opened
+    opened.close()
+
+
+def test_store_holds_exactly_the_pickled_articles(store):
+    assert PICKLES
+    assert sorted(store.keys()) == sorted(pickle_key(path) for path in PICKLES)
+
+
+@pytest.mark.parametrize("path", PICKLES, ids=os.path.basename)
+def test_store_matches_the_pickle(store, path):
+    assert store.load_blocks(*pickle_key(path)) == load_pickle(path)
+
+
+def test_store_is_rebuilt_byte_for_byte_from_the_pickles(tmp_path, store):
+    rebuilt_path = str(tmp_path / "articles.wgstore")
+    assert migrate_pickles(WIKI_FOOD, rebuilt_path) == len(PICKLES)
+
+    rebuilt = ArticleStore(rebuilt_path)
+    try:
+        for key in store.keys():
+            assert rebuilt.raw_bytes(*key) == store.raw_bytes(*key)
+    finally:
+        rebuilt.close()
+
+
+def test_pipeline_reads_the_same_blocks_with_and_without_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(article_store, "_STORES", {})
+    path = next(p for p in PICKLES if pickle_key(p) == ("Paella", "fr"))
+    pickles_only = tmp_path / "pickles_only"
+    pickles_only.mkdir()
+    (pickles_only / os.path.basename(path)).write_bytes(open(path, "rb").read())
+
+    from_store = process_annotations.step_retrieve_prescraped_tgt_content_blocks("Paella", "fr", WIKI_FOOD)
+    from_pickle = process_annotations.step_retrieve_prescraped_tgt_content_blocks("Paella", "fr", str(pickles_only))
+
+    assert from_store == from_pickle == load_pickle(path)
+    with pytest.raises(process_annotations.BioFilenotFoundError):
+        process_annotations.step_retrieve_prescraped_en_content_blocks("Paella", str(pickles_only))
+
+
+def test_round_trip(tmp_path):
+    blocks = [
+        {"header_1": "Histoire"},
+        {"paragraph": "La paella est un plat de riz 🥘."},
+        {"header_2": "北京烤鸭"},
+        {"paragraph": ""},
+        {"header_3": "Ынджера"},
+    ]
+    path = str(tmp_path / "articles.wgstore")
+    assert write_article_store({("Paella", "fr"): blocks, ("Empty", "fr"): []}, path) == 2
+
+    store = ArticleStore(path)
+    try:
+        assert store.load_blocks("Paella", "fr") == blocks
+        assert store.load_blocks("Empty", "fr") == []
+        assert ("Paella", "ru") not in store
+        with pytest.raises(ArticleNotFoundError):
+            store.load_blocks("Paella", "ru")
+    finally:
+        store.close()
@@ -0,0 +1,46 @@
+import pandas as pd
+
+import process_annotations
+from fact_dedup import cluster_facts, exact_representatives
+from translation_backends import StubBackend
+
+BUILT_1920 = "L'église a été construite en 1920 et restaurée plus tard par la ville."
+BUILT_1929 = "L'église a été construite en 1929 et restaurée plus tard par la ville."
+IS_SPICY = "La paella valencienne est traditionnellement épicée et servie chaude."
+IS_NOT_SPICY = "La paella valencienne n'est pas traditionnellement épicée et servie chaude."
+
+
+def translate(monkeypatch, facts):
+    calls = []
+
+    class RecordingStub(StubBackend):
+        def translate_batch(self, texts, src_lang, tgt_lang):
+            calls.extend(texts)
+            return super().translate_batch(texts, src_lang, tgt_lang)
+
+    monkeypatch.setattr(process_annotations, "get_translation_backend", lambda name, options: RecordingStub())
+    df = process_annotations.dedup_facts(pd.DataFrame({"fact": facts}))
+    df = process_annotations.translate_facts(df, "French", "English")
+    return df["fact_translated"].tolist(), calls
+
+
+def test_near_duplicates_keep_their_own_translation(monkeypatch):
+    facts = [BUILT_1920, BUILT_1929, IS_SPICY, IS_NOT_SPICY]
+    # They are near-duplicates as far as the report goes ...
+    clusters, _ = cluster_facts(facts, threshold=0.5)
+    assert sorted(map(sorted, clusters)) == sorted([sorted([BUILT_1920, BUILT_1929]), sorted([IS_SPICY, IS_NOT_SPICY])])
+
+    # ... but every one of them is translated from its own text
+    translations, calls = translate(monkeypatch, facts)
+    assert translations == [f"[fr->en] {fact}" for fact in facts]
+    assert sorted(calls) == sorted(facts)
+
+
+def test_exact_duplicates_share_one_translation(monkeypatch):
+    spaced = "  l'église a été construite en 1920   et restaurée plus tard par la ville. "
+    facts = [BUILT_1920, spaced, BUILT_1920.upper(), BUILT_1929]
+    assert set(exact_representatives(facts).values()) == {BUILT_1920, BUILT_1929}
+
+    translations, calls = translate(monkeypatch, facts)
+    assert translations == [f"[fr->en] {BUILT_1920}"] * 3 + [f"[fr->en] {BUILT_1929}"]
+    assert calls == [BUILT_1920, BUILT_1929]
@@ -0,0 +1,219 @@
+import os
+import json
+import shutil
+
+import pytest
+
+import article_store
+import build_cache
+import process_annotations
+import translation_cache
+import wikidata_resolver
+from conftest import PIPELINE_DIR, WIKIDATA_SNAPSHOT
+from translation_stub_server import start_stub_server
+
+TOPIC = "Paella"
+ANNOTATION = "annotation_2025-03-24_Paella_fr.json"
+FR_LINK = "https://fr.wikipedia.org/wiki/Paella"
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """
+    A scratch copy of the inputs one (Paella, fr) unit needs, laid out like the repo root,
+    with Wikidata answered offline from the fixture snapshot.
+    """
+    data_dir = tmp_path / "data_pipeline"
+    (data_dir / "wikigap_data").mkdir(parents=True)
+    shutil.copy(os.path.join(PIPELINE_DIR, "wikigap_data", ANNOTATION), data_dir / "wikigap_data")
+    shutil.copytree(os.path.join(PIPELINE_DIR, "wiki_food"), data_dir / "wiki_food",
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    shutil.copy(os.path.join(PIPELINE_DIR, "translation_glossary.json"), data_dir)
+    (tmp_path / "json").mkdir()
+    monkeypatch.chdir(tmp_path)
+
+    # Per-path connection pools would otherwise hand this test another test's files
+    monkeypatch.setattr(translation_cache, "_CACHES", {})
+    monkeypatch.setattr(build_cache, "_STAGE_CACHES", {})
+    monkeypatch.setattr(article_store, "_STORES", {})
+
+    resolver = wikidata_resolver.WikidataResolver(
+        cache_path=None, snapshot_path=WIKIDATA_SNAPSHOT, offline=True
+    )
+    monkeypatch.setattr(process_annotations, "get_wikidata_resolver", lambda *args, **kwargs: resolver)
+    return tmp_path
+
+
+def use_backends(monkeypatch, header_backend, fact_backend, fact_options=None):
+    monkeypatch.setattr(process_annotations, "HEADER_BACKEND", header_backend)
+    monkeypatch.setattr(process_annotations, "HEADER_BACKEND_OPTIONS", {})
+    monkeypatch.setattr(process_annotations, "FACT_BACKEND", fact_backend)
+    monkeypatch.setattr(process_annotations, "FACT_BACKEND_OPTIONS", fact_options or {})
+
+
+def run_pipeline(workspace):
+    records = process_annotations.main(
+        executor_kind="serial", topics=[TOPIC], languages=["fr"], force=True,
+        report_dir=str(workspace / "run_reports"),
+    )
+    with open(workspace / "json" / f"{TOPIC}.json", "r", encoding="utf-8") as f:
+        nested = json.load(f)
+    entries = [
+        entry
+        for header in nested[TOPIC]["languages"]["fr"]["headers"].values()
+        for entry in header["entries"]
+    ]
+    return records, entries
+
+
+def test_stub_backend(workspace, monkeypatch):
+    use_backends(monkeypatch, "stub", "stub")
+
+    records, entries = run_pipeline(workspace)
+
+    assert entries
+    for entry in entries:
+        assert entry["fact"]["translated"] == f"[fr->en] {entry['fact']['original']}"
+        assert entry["fact"]["wiki_link"] == FR_LINK
+        if entry["header_1"]["original"] != "General description":
+            assert entry["header_1"]["translated"] == f"[fr->en] {entry['header_1']['original']}"
+    stages = {record["stage"] for record in records}
+    assert {"json_parse", "translate_facts", "nest", "write", "bundle", "search_index"} <= stages
+    corpus = json.loads((workspace / "json" / "corpus.json").read_text(encoding="utf-8"))
+    assert corpus["topics"][TOPIC]["file"] == f"{TOPIC}.json"
+
+
+def test_dictionary_backend(workspace, monkeypatch):
+    use_backends(monkeypatch, "dictionary", "dictionary")
+    with open(workspace / "data_pipeline" / "translation_glossary.json", "r", encoding="utf-8") as f:
+        glossary = json.load(f)["fr->en"]
+
+    _, entries = run_pipeline(workspace)
+
+    assert any(entry["fact"]["original"] in glossary for entry in entries)
+    assert any(entry["fact"]["original"] not in glossary for entry in entries)
+    for entry in entries:
+        # Glossary hits are translated; misses are failures, never the source text
+        assert entry["fact"]["translated"] == glossary.get(entry["fact"]["original"])
+
+
+def test_dictionary_misses_are_recorded_as_failures(workspace, monkeypatch):
+    import pandas as pd
+
+    use_backends(monkeypatch, "dictionary", "dictionary")
+    with open(workspace / "data_pipeline" / "translation_glossary.json", "r", encoding="utf-8") as f:
+        known = next(iter(json.load(f)["fr->en"].items()))
+    df = pd.DataFrame({"fact": [known[0], "Une phrase absente du glossaire."]})
+
+    df = process_annotations.translate_facts(df, "French", "English")
+
+    assert df["fact_translated"][0] == known[1]
+    assert pd.isna(df["fact_translated"][1])
+    assert list(df.attrs["translation_failures"]) == ["Une phrase absente du glossaire."]
+
+
+def test_openai_backend_against_the_stub_server(workspace, monkeypatch):
+    openai = pytest.importorskip("openai")
+    # Every third request is throttled, so the async client's Retry-After path runs too
+    server, base_url = start_stub_server(throttle_every=3, retry_after=0)
+    try:
+        client = openai.OpenAI(base_url=base_url, api_key="stub", max_retries=0)
+        monkeypatch.setattr(process_annotations, "client", client)
+        use_backends(monkeypatch, "stub", "openai", {"model": "stub-model"})
+
+        _, entries = run_pipeline(workspace)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert entries
+    for entry in entries:
+        # The stub echoes only the source text, never the prompt around it
+        assert entry["fact"]["translated"] == f"[English] {entry['fact']['original']}"
+
+
+def test_unconfigured_backend_fails_before_any_unit(workspace, monkeypatch):
+    # The defaults without a client: no header is translated before the fact backend is found unusable
+    use_backends(monkeypatch, "stub", "openai", {"model": "gpt-4o-mini"})
+    monkeypatch.setattr(process_annotations, "client", "")
+    started = []
+
+    def run_unit(topic, tgt_lang, unit_kwargs):
+        started.append((topic, tgt_lang))
+        return topic, tgt_lang, None, None, []
+
+    monkeypatch.setattr(process_annotations, "_run_unit", run_unit)
+
+    with pytest.raises(process_annotations.BackendConfigError, match="fact translation backend 'openai'"):
+        process_annotations.main(executor_kind="serial", topics=[TOPIC], languages=["fr"], report_dir=None)
+    assert started == []
+
+    # Stages that don't translate don't need the backends
+    process_annotations.main(executor_kind="serial", topics=[TOPIC], languages=["fr"], report_dir=None,
+                             stop_after="extract")
+    assert len(started) == 1
+
+
+def test_cli_picks_the_backends(workspace, monkeypatch):
+    use_backends(monkeypatch, "google", "openai", {"model": "gpt-4o-mini"})
+    monkeypatch.setattr(process_annotations, "client", "")
+
+    process_annotations.cli([
+        "all", "--topic", TOPIC, "--lang", "fr", "--executor", "serial", "--report-dir", "",
+        "--header-backend", "stub", "--fact-backend", "stub",
+    ])
+
+    nested = json.loads((workspace / "json" / f"{TOPIC}.json").read_text(encoding="utf-8"))
+    entries = [entry for header in nested[TOPIC]["languages"]["fr"]["headers"].values() for entry in header["entries"]]
+    assert entries
+    assert all(entry["fact"]["translated"] == f"[fr->en] {entry['fact']['original']}" for entry in entries)
+
+
+def test_topic_without_annotation_files_loses_its_outputs(workspace, monkeypatch):
+    use_backends(monkeypatch, "stub", "stub")
+    run_pipeline(workspace)
+    json_dir = workspace / "json"
+    outputs = [f"{TOPIC}.json", f"{TOPIC}.match.json", f"{TOPIC}.search.json", f"{TOPIC}.wgb.gz"]
+    assert all((json_dir / name).exists() for name in outputs)
+    # A topic file copied in by hand: not this pipeline's to remove
+    (json_dir / "Injera.json").write_text("{}", encoding="utf-8")
+
+    os.remove(workspace / "data_pipeline" / "wikigap_data" / ANNOTATION)
+    process_annotations.main(executor_kind="serial", languages=["fr"], report_dir=None)
+
+    assert not any((json_dir / name).exists() for name in outputs)
+    assert (json_dir / "Injera.json").exists()
+    corpus = json.loads((json_dir / "corpus.json").read_text(encoding="utf-8"))
+    assert TOPIC not in corpus["topics"]
+    meta = json.loads((json_dir / "corpus-search" / "meta.json").read_text(encoding="utf-8"))
+    assert meta["topics"] == []
+    assert build_cache.BuildManifest().topic(TOPIC) is None
+
+    # Asking for the topic by name, or for one with nothing at all, only warns
+    process_annotations.main(executor_kind="serial", topics=[TOPIC, "Injera"], languages=["fr"], report_dir=None)
+    assert (json_dir / "Injera.json").exists()
+
+
+def test_topic_is_rebuilt_once_its_wikidata_link_resolves(workspace, monkeypatch):
+    use_backends(monkeypatch, "stub", "stub")
+    empty_snapshot = workspace / "empty_snapshot.json"
+    empty_snapshot.write_text('{"titles": {}, "sitelinks": {}}', encoding="utf-8")
+    unresolved = wikidata_resolver.WikidataResolver(cache_path=None, snapshot_path=str(empty_snapshot), offline=True)
+    monkeypatch.setattr(process_annotations, "get_wikidata_resolver", lambda *args, **kwargs: unresolved)
+
+    def nest(**kwargs):
+        process_annotations.main(executor_kind="serial", topics=[TOPIC], languages=["fr"], report_dir=None, **kwargs)
+        nested = json.loads((workspace / "json" / f"{TOPIC}.json").read_text(encoding="utf-8"))
+        return {
+            entry["fact"]["wiki_link"]
+            for header in nested[TOPIC]["languages"]["fr"]["headers"].values()
+            for entry in header["entries"]
+        }
+
+    # No entity for the title: the link falls back to the title itself
+    assert nest(force=True) == {TOPIC}
+    assert nest() == {TOPIC}
+
+    resolver = wikidata_resolver.WikidataResolver(cache_path=None, snapshot_path=WIKIDATA_SNAPSHOT, offline=True)
+    monkeypatch.setattr(process_annotations, "get_wikidata_resolver", lambda *args, **kwargs: resolver)
+    assert nest() == {FR_LINK}
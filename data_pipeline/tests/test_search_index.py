@@ -0,0 +1,122 @@
+import os
+import glob
+import json
+from collections import Counter
+
+import pytest
+
+from search_index import (
+    CorpusSearchIndex, TopicSearchIndex, _fact_text, build_search_index, tokenize, write_corpus_search_index,
+    write_search_index,
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SEARCH_INDEXES = sorted(glob.glob(os.path.join(REPO_ROOT, "json", "*.search.json")))
+
+
+def entry(translated, original="", header_1="Histoire", header_2=None):
+    return {
+        "header_2": {"original": header_2, "translated": header_2},
+        "header_1": {"original": header_1, "translated": header_1},
+        "fact": {"original": original, "translated": translated},
+    }
+
+
+GROUPS = [
+    ("Paella", "fr", "Histoire", [
+        entry("Paella is a rice dish from Valencia."),
+        entry("Saffron gives paella its colour, and saffron is expensive."),
+        entry("The dish is cooked in a wide, shallow pan called a paellera."),
+    ]),
+    ("Paella", "fr", "Recette", [
+        entry("Rabbit and snails are traditional ingredients.", header_1="Recette", header_2="Paella valencienne"),
+    ]),
+    ("Paella", "ru", "История", [
+        entry("Saffron rice was brought to Spain by the Moors.", "Шафрановый рис принесли в Испанию мавры."),
+    ]),
+    ("Paella", "zh", "历史", [entry("Paella is popular in Spain.", "西班牙海鲜饭很受欢迎", "历史")]),
+]
+
+
+def test_tokenize_latin():
+    assert tokenize("Crème brûlée, l'été à 180°C!") == ["creme", "brulee", "l", "ete", "a", "180", "c"]
+
+
+def test_tokenize_cyrillic():
+    # Lower-cased; NFKD also takes the breve off й, as it does in content.js
+    assert tokenize("Щи и Йогурт, ЁЛКА") == ["щи", "и", "иогурт", "елка"]
+
+
+def test_tokenize_cjk():
+    assert tokenize("北京烤鸭") == ["北", "京", "烤", "鸭", "北京", "京烤", "烤鸭"]
+    # Queries only need the pairs; a lone character stays as is
+    assert tokenize("北京烤鸭", query=True) == ["北京", "京烤", "烤鸭"]
+    assert tokenize("鸭", query=True) == ["鸭"]
+    # Mixed runs are split at the script boundary; kana counts as CJK
+    assert tokenize("Paella西班牙") == ["paella", "西", "班", "牙", "西班", "班牙"]
+    assert tokenize("すし", query=True) == ["すし"]
+
+
+def test_ranking():
+    index = TopicSearchIndex(build_search_index("Paella", GROUPS))
+
+    # Every term must match; the fact that says "saffron" twice in about as many words ranks first
+    assert [fact_id for fact_id, _ in index.search("saffron")] == ["fr2", "ru1"]
+    assert [fact_id for fact_id, _ in index.search("saffron rice")] == ["ru1"]
+    assert index.search("saffron snails") == []
+    # The last term is a prefix while typing, earlier ones are whole words
+    assert [fact_id for fact_id, _ in index.search("paelle")] == ["fr3"]
+    assert index.search("saff rice") == []
+    assert index.search("paelle", prefix=False) == []
+    # Original text, header_1 and header_2 are indexed too
+    assert [fact_id for fact_id, _ in index.search("мавры")] == ["ru1"]
+    assert [fact_id for fact_id, _ in index.search("海鲜")] == ["zh1"]
+    assert [fact_id for fact_id, _ in index.search("valencienne")] == ["fr4"]
+    assert [fact_id for fact_id, _ in index.search("recette")] == ["fr4"]
+    assert [fact_id for fact_id, _ in index.search("saffron", languages=["ru"])] == ["ru1"]
+    assert index.search("") == []
+
+
+def test_corpus_index_searches_across_topics(tmp_path):
+    other = [("Oolong", "zh", "历史", [entry("Oolong is a traditional Chinese tea.", "乌龙茶", "历史")])]
+    paths = {}
+    for topic, groups in (("Paella", GROUPS), ("Oolong", other)):
+        paths[topic] = str(tmp_path / f"{topic}.search.json")
+        write_search_index(build_search_index(topic, groups), paths[topic])
+    assert write_corpus_search_index(paths, str(tmp_path / "corpus-search"), shards=4) == 7
+
+    corpus = CorpusSearchIndex(str(tmp_path / "corpus-search"))
+    assert {(topic, fact_id) for topic, fact_id, _ in corpus.search("traditional")} == {
+        ("Oolong", "zh1"), ("Paella", "fr4")
+    }
+    assert [fact_id for _, fact_id, _ in corpus.search("saffron", topics=["Paella"])] == ["fr2", "ru1"]
+
+
+def content_js_facts(nested):
+    """{fact id: entry} numbered the way parseLanguage() in content.js numbers its fact cards."""
+    facts = {}
+    for person in nested.values():
+        for language, language_data in person["languages"].items():
+            counter = 1
+            for header in language_data["headers"].values():
+                for item in header["entries"]:
+                    facts[f"{language}{counter}"] = item
+                    counter += 1
+    return facts
+
+
+@pytest.mark.parametrize("path", SEARCH_INDEXES, ids=os.path.basename)
+def test_fact_ids_match_content_js(path):
+    with open(path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    with open(path.replace(".search.json", ".json"), "r", encoding="utf-8") as f:
+        facts = content_js_facts(json.load(f))
+
+    assert sorted(index["facts"]) == sorted(facts)
+    postings = {}
+    for term, flat in index["terms"].items():
+        for i in range(0, len(flat), 2):
+            postings.setdefault(flat[i], Counter())[term] = flat[i + 1]
+    for fact_number, fact_id in enumerate(index["facts"]):
+        # The terms filed under each id are exactly those of the card content.js gives that id
+        assert postings.get(fact_number, Counter()) == Counter(tokenize(_fact_text(facts[fact_id])))
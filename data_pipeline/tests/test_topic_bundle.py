@@ -0,0 +1,97 @@
+import os
+import glob
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from topic_bundle import compress_bundle, decode_bundle, encode_bundle, read_topic_bundle, write_topic_bundle
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TOPIC_JSONS = sorted(
+    path for path in glob.glob(os.path.join(REPO_ROOT, "json", "*.json"))
+    if not path.endswith((".match.json", ".search.json", "corpus.json"))
+)
+
+
+def entry(fact, translated, header="Histoire"):
+    return {
+        "header_2": {"original": None, "translated": None},
+        "header_1": {"original": header, "translated": header},
+        "fact": {"original": fact, "translated": translated, "fact_aligned_sentence": "", "wiki_link": ""},
+        "src_context": [],
+        "tgt_fact_aligned_sentences": [fact],
+    }
+
+
+EDGE_CASES = {
+    "single language, empty strings": {
+        "Paella": {"languages": {"fr": {"headers": {"": {"entries": [entry("", "")]}}}}},
+    },
+    "CJK and non-BMP text": {
+        "北京烤鸭": {"languages": {"zh": {"headers": {"历史": {"entries": [
+            entry("北京烤鸭是北京著名菜式 🦆", "Peking duck is a famous Beijing dish 🦆", "历史"),
+            entry("𠀀𠀁 (CJK Extension B)", "\U0001F600 and é́", "历史"),
+        ]}}}}},
+    },
+    "scalars": {
+        "T": {"languages": {}, "numbers": [0, -1, 1, 127, 128, -129, 2 ** 40, 2 ** 53, -(2 ** 53), 2 ** 60 + 1, 1.5, -0.0, 1e300],
+              "flags": [True, False, None], "nested": [[], {}, [[]], {"": ""}]},
+    },
+}
+
+
+@pytest.mark.parametrize("path", TOPIC_JSONS, ids=os.path.basename)
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_topic_round_trip(path, compression):
+    with open(path, "r", encoding="utf-8") as f:
+        nested = json.load(f)
+    assert decode_bundle(compress_bundle(encode_bundle(nested), compression)) == nested
+
+
+@pytest.mark.parametrize("name", EDGE_CASES)
+def test_edge_case_round_trip(name):
+    value = EDGE_CASES[name]
+    decoded = decode_bundle(encode_bundle(value))
+    assert decoded == value
+    # Same types too: ints stay ints, floats stay floats (1 == 1.0 would hide that)
+    assert json.dumps(decoded, sort_keys=True) == json.dumps(value, sort_keys=True)
+
+
+def test_write_topic_bundle_matches_groups(tmp_path):
+    groups = [
+        ("Paella", "fr", "Histoire", [entry("Une phrase.", "A sentence.")]),
+        ("Paella", "fr", "Recette", [entry("Riz.", "Rice.", "Recette"), entry("", None, "Recette")]),
+    ]
+    path = str(tmp_path / "Paella.wgb.gz")
+    assert write_topic_bundle(groups, path, compression="gzip") == 3
+    decoded = read_topic_bundle(path)
+    assert list(decoded["Paella"]["languages"]["fr"]["headers"]) == ["Histoire", "Recette"]
+    assert decoded["Paella"]["languages"]["fr"]["headers"]["Recette"]["entries"] == groups[1][3]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+@pytest.mark.parametrize("name", ["CJK and non-BMP text", "scalars", "topic"])
+def test_extension_decoder_matches(name, tmp_path):
+    if name == "topic":
+        with open(TOPIC_JSONS[0], "r", encoding="utf-8") as f:
+            value = json.load(f)
+    else:
+        value = EDGE_CASES[name]
+    bundle = tmp_path / "bundle.wgb"
+    bundle.write_bytes(encode_bundle(value))
+    source = tmp_path / "source.json"
+    source.write_text(json.dumps(value, ensure_ascii=False), encoding="utf-8")
+    # The extension promises the object JSON.parse gives for the topic JSON, so compare in
+    # JS: integers past 2^53 round the same way on both sides
+    script = (
+        "const fs = require('fs');"
+        f"eval(fs.readFileSync({json.dumps(os.path.join(REPO_ROOT, 'factBundle.js'))}, 'utf8'));"
+        f"const decoded = decodeFactBundle(new Uint8Array(fs.readFileSync({json.dumps(str(bundle))})));"
+        f"const parsed = JSON.parse(fs.readFileSync({json.dumps(str(source))}, 'utf8'));"
+        "process.stdout.write(JSON.stringify([JSON.stringify(decoded), JSON.stringify(parsed)]));"
+    )
+    result = subprocess.run(["node", "-e", script], capture_output=True, check=True)
+    decoded, parsed = json.loads(result.stdout.decode("utf-8"))
+    assert decoded == parsed
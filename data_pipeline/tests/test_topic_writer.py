@@ -0,0 +1,113 @@
+import os
+import glob
+import json
+
+import pytest
+
+from topic_writer import SHARD_FORMAT, SHARD_MANIFEST_NAME, write_topic_json, write_topic_shards
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TOPIC_JSONS = sorted(
+    path for path in glob.glob(os.path.join(REPO_ROOT, "json", "*.json"))
+    if not path.endswith((".match.json", ".search.json", "corpus.json"))
+)
+
+
+def entry(fact, header="Histoire"):
+    return {
+        "header_2": {"original": None, "translated": None},
+        "header_1": {"original": header, "translated": header},
+        "fact": {"original": fact, "translated": fact, "fact_aligned_sentence": "", "wiki_link": ""},
+        "src_context": [],
+        "tgt_fact_aligned_sentences": [fact],
+    }
+
+
+EDGE_CASES = {
+    "empty": {},
+    "one entry": {"Paella": {"languages": {"fr": {"headers": {"Histoire": {"entries": [entry("La paella.")]}}}}}},
+    "empty header, empty entries": {
+        "Paella": {"languages": {"fr": {"headers": {"": {"entries": []}, "Histoire": {"entries": [entry("")]}}}}},
+    },
+    "several people and languages": {
+        "Paella": {"languages": {
+            "fr": {"headers": {"Histoire": {"entries": [entry("a"), entry("b")]}, "Recette": {"entries": [entry("c")]}}},
+            "ru": {"headers": {"История": {"entries": [entry("Паэлья", "История")]}}},
+        }},
+        "北京烤鸭": {"languages": {"zh": {"headers": {"历史": {"entries": [entry("北京烤鸭 🦆", "历史")]}}}}},
+    },
+    "escapes": {
+        "T": {"languages": {"fr": {"headers": {'"quoted"\n\t\\': {"entries": [
+            entry('line one\nline two "quoted" \\   \x00 \U0001F600', '"quoted"\n\t\\'),
+        ]}}}}},
+    },
+}
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def groups_of(nested):
+    """The (person, language, header_1, entries) groups iter_nested_groups would yield."""
+    for person, body in nested.items():
+        for language, headers in body["languages"].items():
+            for header, group in headers["headers"].items():
+                yield person, language, header, group["entries"]
+
+
+def entry_count(nested):
+    return sum(len(entries) for *_, entries in groups_of(nested))
+
+
+CASES = [pytest.param(load(path), id=os.path.basename(path)) for path in TOPIC_JSONS] + [
+    pytest.param(nested, id=name) for name, nested in EDGE_CASES.items()
+]
+
+
+@pytest.mark.parametrize("nested", CASES)
+def test_pretty_matches_json_dump(tmp_path, nested):
+    path = tmp_path / "topic.json"
+    assert write_topic_json(groups_of(nested), str(path)) == entry_count(nested)
+
+    assert read(path) == json.dumps(nested, indent=4, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("nested", CASES)
+def test_compact_matches_json_dump(tmp_path, nested):
+    path = tmp_path / "topic.json"
+    assert write_topic_json(groups_of(nested), str(path), compact=True) == entry_count(nested)
+
+    assert read(path) == json.dumps(nested, separators=(",", ":"), ensure_ascii=False)
+
+
+@pytest.mark.parametrize("nested", CASES)
+def test_sharded_matches_json_dump_per_language(tmp_path, nested):
+    output_dir = tmp_path / "topic"
+    manifest = write_topic_shards(groups_of(nested), str(output_dir), "topic")
+
+    shards = {}
+    for person, body in nested.items():
+        for language, headers in body["languages"].items():
+            shards[language] = (person, {person: {"languages": {language: headers}}})
+    assert manifest == load(output_dir / SHARD_MANIFEST_NAME)
+    assert manifest["format"] == SHARD_FORMAT and manifest["topic"] == "topic"
+    assert list(manifest["languages"]) == list(shards)
+    for language, (person, shard) in shards.items():
+        path = output_dir / f"{language}.json"
+        assert read(path) == json.dumps(shard, separators=(",", ":"), ensure_ascii=False)
+        assert manifest["languages"][language] == {
+            "file": f"{language}.json", "person": person, "entries": entry_count(shard), "bytes": os.path.getsize(path),
+        }
+
+
+def test_shards_need_contiguous_languages(tmp_path):
+    groups = [("T", "fr", "a", [entry("a")]), ("T", "ru", "b", [entry("b")]), ("T", "fr", "c", [entry("c")])]
+    with pytest.raises(ValueError):
+        write_topic_shards(groups, str(tmp_path / "topic"), "topic")
@@ -0,0 +1,120 @@
+import types
+import itertools
+
+import pytest
+
+import process_annotations
+import translation_cache
+from translation_backends import StubBackend
+from translation_cache import TranslationCache, cache_key, get_translation_cache, translate_unique
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A last_used clock that ticks once per call, so LRU order never depends on timer resolution."""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(translation_cache, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def keys_in(cache):
+    return {key for (key,) in cache._conn.execute("SELECT key FROM translations")}
+
+
+def test_cache_key_is_stable():
+    # Keys address rows written by earlier runs: changing them silently empties the cache
+    assert cache_key("Bonjour", "fr", "en", "openai", "gpt-4o-mini") == (
+        "c1de318f08a4ff7f039a82fab24bc7b26c33ece04556074536b1fca063140b3d"
+    )
+    assert cache_key("Bonjour", "fr", "en", "google") == cache_key("Bonjour", "fr", "en", "google", None)
+    variants = {
+        cache_key("Bonjour", "fr", "en", "openai", "gpt-4o-mini"),
+        cache_key("Bonjour", "en", "fr", "openai", "gpt-4o-mini"),
+        cache_key("Bonjour", "fr", "en", "openai", "gpt-4o"),
+        cache_key("Bonjour", "fr", "en", "google", "gpt-4o-mini"),
+        cache_key("bonjour", "fr", "en", "openai", "gpt-4o-mini"),
+    }
+    assert len(variants) == 5
+
+
+def test_least_recently_used_entries_are_trimmed(tmp_path, clock):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite"), max_entries=3, evict_every=1)
+    cache.put_many({"a": "A", "b": "B", "c": "C"})
+    # Reading "a" makes "b" the least recently used
+    assert cache.get_many(["a"]) == {"a": "A"}
+
+    cache.put_many({"d": "D"})
+
+    assert keys_in(cache) == {"a", "c", "d"}
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert cache.get_many(["b", "d"]) == {"d": "D"}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_trims_run_every_evict_every_rows(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = TranslationCache(path, max_entries=2, evict_every=3)
+    # The first put is due: a cache that is already too big is trimmed right away
+    cache.put_many({"a": "A", "b": "B", "c": "C"})
+    assert keys_in(cache) == {"b", "c"}
+
+    # Then it may overshoot by up to evict_every rows before the next trim
+    cache.put_many({"d": "D"})
+    cache.put_many({"e": "E"})
+    assert keys_in(cache) == {"b", "c", "d", "e"}
+    cache.put_many({"f": "F"})
+    assert keys_in(cache) == {"e", "f"}
+
+    # Trims survive the connection: a new one sees the same rows
+    cache.close()
+    assert keys_in(TranslationCache(path, max_entries=2, evict_every=3)) == {"e", "f"}
+
+
+def test_translate_unique_persists_each_batch(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite"))
+    calls = []
+
+    def translate_batch(texts):
+        calls.append(list(texts))
+        if len(calls) == 3:
+            raise RuntimeError("interrupted")
+        return [None if text == "t1" else text.upper() for text in texts]
+
+    texts = ["t0", "t1", "t0", None, " ", "t2", "t3", "t4", "t5"]
+    with pytest.raises(RuntimeError):
+        translate_unique(texts, "fr", "en", "stub", translate_batch, cache=cache, batch_size=2)
+
+    # Duplicates, None and blanks never reach the backend; failures (None) are not cached
+    assert calls == [["t0", "t1"], ["t2", "t3"], ["t4", "t5"]]
+    stored = cache.get_many(cache_key(t, "fr", "en", "stub") for t in ["t0", "t1", "t2", "t3"])
+    assert sorted(stored.values()) == ["T0", "T2", "T3"]
+
+    # The rerun only pays for what the interrupted one did not finish
+    calls.clear()
+    translations = translate_unique(texts, "fr", "en", "stub", lambda batch: [t.upper() for t in batch],
+                                    cache=cache, batch_size=2)
+    assert translations == {"t0": "T0", "t1": "T1", "t2": "T2", "t3": "T3", "t4": "T4", "t5": "T5"}
+
+
+def test_pipeline_translations_reach_the_cache_chunk_by_chunk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(translation_cache, "_CACHES", {})
+
+    class RemoteStub(StubBackend):
+        name = "remote-stub"
+        cacheable = True
+        remote = True
+        chunk_size = 2
+
+        def translate_batch(self, texts, src_lang, tgt_lang):
+            if "fact 17" in texts:
+                raise ValueError("interrupted")
+            return super().translate_batch(texts, src_lang, tgt_lang)
+
+    texts = [f"fact {i}" for i in range(20)]
+    with pytest.raises(ValueError):
+        process_annotations._translate_texts(texts, "French", "English", RemoteStub(), "facts")
+
+    # One round is max_in_flight chunks: the first 16 texts were stored before the failure
+    cache = get_translation_cache()
+    stored = cache.get_many(cache_key(text, "French", "English", "remote-stub") for text in texts)
+    assert len(stored) == 16
@@ -0,0 +1,167 @@
+import time
+import types
+import asyncio
+
+import pandas as pd
+import pytest
+
+import process_annotations
+from translation_backends import StubBackend
+from translation_client import AsyncTranslationClient, TokenBucket
+
+
+class FakeHTTPError(Exception):
+    """Shaped like the openai/httpx/requests errors: a status code and a response with headers."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = types.SimpleNamespace(headers=headers or {})
+
+
+class FakeTransport:
+    """translate_fn that fails with the queued errors first, then upper-cases its input."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        return [text.upper() for text in texts]
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the client's retry delays instead of waiting them out."""
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    return delays
+
+
+def client(transport, **options):
+    options.setdefault("chunk_size", 2)
+    return AsyncTranslationClient(transport, **options)
+
+
+def test_429_waits_for_retry_after(sleeps):
+    transport = FakeTransport(FakeHTTPError(429, {"Retry-After": "7"}))
+    translation_client = client(transport, backoff_base=30)
+
+    assert translation_client.translate_batch(["a", "b"]) == ["A", "B"]
+    assert sleeps == [7.0]
+    assert transport.calls == [["a", "b"], ["a", "b"]]
+    assert translation_client.failures == {}
+
+
+def test_5xx_is_retried_with_backoff(sleeps):
+    transport = FakeTransport(FakeHTTPError(503), FakeHTTPError(500))
+    translation_client = client(transport, backoff_base=1)
+
+    assert translation_client.translate_batch(["a"]) == ["A"]
+    assert translation_client.request_count == 3
+    # Exponential backoff with jitter: half to all of base * 2^(attempt - 1)
+    assert 0.5 <= sleeps[0] <= 1 and 1 <= sleeps[1] <= 2
+    assert translation_client.failures == {}
+
+
+def test_4xx_is_not_retried(sleeps):
+    transport = FakeTransport(FakeHTTPError(400))
+    translation_client = client(transport)
+
+    assert translation_client.translate_batch(["a", "b", "c"]) == [None, None, "C"]
+    assert translation_client.request_count == 2
+    assert sleeps == []
+    assert set(translation_client.failures) == {"a", "b"}
+    assert "400" in translation_client.failures["a"]
+
+
+def test_retries_give_up_after_max_retries(sleeps):
+    transport = FakeTransport(*[FakeHTTPError(502)] * 10)
+    translation_client = client(transport, max_retries=2)
+
+    assert translation_client.translate_batch(["a"]) == [None]
+    assert translation_client.request_count == 3
+    assert len(sleeps) == 2
+    assert list(translation_client.failures) == ["a"]
+
+
+def test_transient_network_errors_are_retried_and_others_raise(sleeps):
+    translation_client = client(FakeTransport(TimeoutError("read timed out")))
+    assert translation_client.translate_batch(["a"]) == ["A"]
+
+    # A bug in the backend is not a translation failure
+    with pytest.raises(KeyError):
+        client(FakeTransport(KeyError("model"))).translate_batch(["a"])
+
+
+def test_misaligned_replies_fall_back_to_one_text_per_request():
+    calls = []
+
+    def translate_fn(texts):
+        calls.append(list(texts))
+        return [text.upper() for text in texts][:1]
+
+    translation_client = client(translate_fn)
+
+    assert translation_client.translate_batch(["a", "b"]) == ["A", "B"]
+    assert calls == [["a", "b"], ["a"], ["b"]]
+
+
+def test_failures_are_recorded_on_the_frame(monkeypatch, sleeps):
+    class RejectingBackend(StubBackend):
+        remote = True
+        chunk_size = 1
+
+        def translate_batch(self, texts, src_lang, tgt_lang):
+            if texts == ["Une phrase refusée."]:
+                raise FakeHTTPError(400)
+            return super().translate_batch(texts, src_lang, tgt_lang)
+
+    monkeypatch.setattr(process_annotations, "get_translation_backend", lambda name, options: RejectingBackend())
+    df = pd.DataFrame({"fact": ["Une phrase.", "Une phrase refusée."]})
+
+    df = process_annotations.translate_facts(df, "French", "English")
+
+    assert df["fact_translated"][0] == "[fr->en] Une phrase."
+    assert pd.isna(df["fact_translated"][1])
+    assert list(df.attrs["translation_failures"]) == ["Une phrase refusée."]
+    assert "400" in df.attrs["translation_failures"]["Une phrase refusée."]
+
+
+def test_token_bucket_spends_the_burst_then_keeps_the_rate():
+    async def acquire_times(bucket, n):
+        start = time.monotonic()
+        times = []
+        for _ in range(n):
+            await bucket.acquire()
+            times.append(time.monotonic() - start)
+        return times
+
+    times = asyncio.run(acquire_times(TokenBucket(rate=20, capacity=2), 5))
+
+    assert times[1] < 0.04
+    # Three more tokens at 20 per second
+    assert times[4] >= 0.14
+
+
+def test_the_rate_budget_carries_across_calls():
+    translation_client = client(FakeTransport(), chunk_size=1, requests_per_second=10, burst=2)
+    start = time.monotonic()
+    translation_client.translate_batch(["a", "b"])
+    burst = time.monotonic() - start
+    translation_client.translate_batch(["c", "d"])
+
+    assert burst < 0.08
+    # The second call has no burst left: two tokens at 10 per second
+    assert time.monotonic() - start >= 0.18
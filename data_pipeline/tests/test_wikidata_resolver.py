@@ -0,0 +1,77 @@
+import threading
+
+from conftest import WIKIDATA_SNAPSHOT
+from wikidata_resolver import MISSING, WIKIDATA_BATCH_SIZE, WikidataResolver, get_wikidata_resolver
+
+TOPICS = ["Injera", "Oolong", "Paella", "Peking duck", "Philippine adobo", "Wiener schnitzel"]
+
+
+def make_resolver(tmp_path, session, **kwargs):
+    kwargs.setdefault("snapshot_path", None)
+    return WikidataResolver(cache_path=str(tmp_path / "wikidata.sqlite"), session=session, **kwargs)
+
+
+def test_titles_are_resolved_in_batches(tmp_path, wikidata_session):
+    unknown = [f"Unknown dish {i}" for i in range(2 * WIKIDATA_BATCH_SIZE)]
+    resolver = make_resolver(tmp_path, wikidata_session)
+
+    qids = resolver.resolve(TOPICS + unknown + ["paella"])
+
+    assert len(wikidata_session.requests) == 3
+    assert all(len(r["titles"].split("|")) <= WIKIDATA_BATCH_SIZE for r in wikidata_session.requests)
+    assert qids["Paella"] == "Q9000003"
+    # Titles are normalized: "paella" is the same article and not requested twice
+    assert qids["paella"] == "Q9000003"
+    assert all(qids[title] is None for title in unknown)
+    # Sitelinks come back with the titles; no follow-up request per QID
+    assert resolver.sitelinks("Q9000003")["frwiki"] == "https://fr.wikipedia.org/wiki/Paella"
+    assert len(wikidata_session.requests) == 3
+
+
+def test_missing_titles_are_cached(tmp_path, wikidata_session):
+    resolver = make_resolver(tmp_path, wikidata_session)
+    assert resolver.resolve(["Unknown dish", "Paella"]) == {"Unknown dish": None, "Paella": "Q9000003"}
+    assert resolver._titles[("enwiki", "Unknown dish")] == MISSING
+
+    # Memoized in the resolver ...
+    resolver.resolve(["Unknown dish"])
+    assert len(wikidata_session.requests) == 1
+
+    # ... and on disk, for the next process
+    fresh = make_resolver(tmp_path, wikidata_session)
+    assert fresh.resolve(["Unknown dish", "Paella"]) == {"Unknown dish": None, "Paella": "Q9000003"}
+    assert len(wikidata_session.requests) == 1
+
+
+def test_offline_mode_answers_from_the_snapshot(tmp_path, wikidata_session):
+    resolver = make_resolver(tmp_path, wikidata_session, snapshot_path=WIKIDATA_SNAPSHOT, offline=True)
+
+    links = resolver.tgt_wiki_links(["Peking duck", "Not an article", "Unknown dish"], "en", ["fr"])
+
+    assert links["Peking duck"]["fr"] == "https://fr.wikipedia.org/wiki/Canard_laqu%C3%A9_de_P%C3%A9kin"
+    # No article: the title itself stands in for the link
+    assert links["Not an article"]["fr"] == "Not an article"
+    assert links["Unknown dish"]["fr"] == "Unknown dish"
+    assert wikidata_session.requests == []
+
+
+def test_snapshot_round_trip(tmp_path, wikidata_session):
+    resolver = make_resolver(tmp_path, wikidata_session)
+    resolver.resolve(TOPICS + ["Unknown dish"])
+    snapshot_path = tmp_path / "snapshot.json"
+    resolver.export_snapshot(str(snapshot_path))
+
+    offline = make_resolver(tmp_path, None, snapshot_path=str(snapshot_path), offline=True)
+    assert offline.resolve(TOPICS + ["Unknown dish"]) == resolver.resolve(TOPICS + ["Unknown dish"])
+
+
+def test_each_thread_gets_its_own_resolver(tmp_path, monkeypatch):
+    monkeypatch.setattr("wikidata_resolver._RESOLVERS", {})
+    monkeypatch.chdir(tmp_path)
+    resolvers = []
+    thread = threading.Thread(target=lambda: resolvers.append(get_wikidata_resolver(offline=False)))
+    thread.start()
+    thread.join()
+
+    assert get_wikidata_resolver(offline=False) is get_wikidata_resolver(offline=False)
+    assert get_wikidata_resolver(offline=False) is not resolvers[0]
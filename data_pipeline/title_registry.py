@@ -0,0 +1,83 @@
+import os
+import glob
+import json
+import importlib.util
+from functools import lru_cache
+
+# ---------------------------
+# English <-> target-language title registry
+# ---------------------------
+# Built once per process from every data_pipeline/scraped_titles_{lang}.py
+# module (their `en_tgt_title_pairs` lists), or from a JSON data file of the
+# form {"fr": [["Paella", "Paella"], ...], ...}. Lookups are dict hits.
+
+TITLE_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+TITLE_MODULE_PATTERN = "scraped_titles_*.py"
+
+
+class TitleRegistry:
+    """(en_title, lang) -> tgt_title, with the reverse index and per-topic bulk lookups."""
+
+    def __init__(self, pairs_by_lang):
+        self._forward = {}
+        self._reverse = {}
+        self._by_topic = {}
+        for lang, pairs in pairs_by_lang.items():
+            for en_title, tgt_title in pairs:
+                # Keep the first mapping if a module lists a topic twice, like the old linear scan did
+                if (en_title, lang) in self._forward:
+                    continue
+                self._forward[(en_title, lang)] = tgt_title
+                self._reverse.setdefault((tgt_title, lang), en_title)
+                self._by_topic.setdefault(en_title, {})[lang] = tgt_title
+        self.languages = sorted(pairs_by_lang)
+
+    def __len__(self):
+        return len(self._forward)
+
+    def title(self, en_title, lang):
+        """Target-language title for an English topic, or None."""
+        return self._forward.get((en_title, lang))
+
+    def en_title(self, tgt_title, lang):
+        """English topic for a target-language title, or None."""
+        return self._reverse.get((tgt_title, lang))
+
+    def titles(self, en_title):
+        """Every known target-language title of a topic: {lang: tgt_title}."""
+        return dict(self._by_topic.get(en_title, {}))
+
+    def topics(self):
+        return list(self._by_topic)
+
+    def to_json(self, path):
+        pairs_by_lang = {lang: [] for lang in self.languages}
+        for (en_title, lang), tgt_title in self._forward.items():
+            pairs_by_lang[lang].append([en_title, tgt_title])
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(pairs_by_lang, f, ensure_ascii=False, indent=1)
+
+
+def load_title_modules(directory=TITLE_MODULE_DIR, pattern=TITLE_MODULE_PATTERN):
+    """Read `en_tgt_title_pairs` from every scraped_titles_{lang}.py in directory."""
+    pairs_by_lang = {}
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        lang = os.path.basename(path)[len("scraped_titles_"):-len(".py")]
+        spec = importlib.util.spec_from_file_location(f"scraped_titles_{lang}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        pairs_by_lang[lang] = list(module.en_tgt_title_pairs)
+    return pairs_by_lang
+
+
+def load_title_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return {lang: [tuple(pair) for pair in pairs] for lang, pairs in json.load(f).items()}
+
+
+@lru_cache(maxsize=None)
+def get_title_registry(source=TITLE_MODULE_DIR):
+    """Build (once) the registry from a directory of title modules or a JSON data file."""
+    if os.path.isfile(source):
+        return TitleRegistry(load_title_file(source))
+    return TitleRegistry(load_title_modules(source))
@@ -0,0 +1,277 @@
+import os
+import sys
+import gzip
+import json
+import time
+import struct
+from collections import Counter
+
+# ---------------------------
+# Fact bundles
+# ---------------------------
+# A compact binary form of a nested topic JSON. The same few strings (wiki links,
+# headers, context sentences) and the same entry keys repeat in every entry, so the
+# bundle stores each distinct string once and refers to it by index:
+#
+#   magic      b"WGB1"
+#   strings    varint count, then per string: varint UTF-8 byte length + bytes
+#   shapes     varint count, then per shape: varint key count + key string indices
+#              (a shape is the key list of a dict; all entries share a handful)
+#   root       one value, encoded as
+#                0 null | 1 false | 2 true | 3 int (zigzag varint) | 4 float (f64 LE)
+#                5 list: varint length, values
+#                6 dict: varint shape index, one value per key
+#                7 + i: strings[i]
+#
+# Strings and shapes are numbered by descending use, so the common ones take one byte.
+# decode_bundle() returns exactly the dict json.load() gives for the original file;
+# factBundle.js is the extension's decoder. Compressed variants are the same bytes
+# in a gzip (stdlib) or brotli (needs the `brotli` package) container:
+#
+#   json/{topic}.wgb, json/{topic}.wgb.gz, json/{topic}.wgb.br
+#
+# Chrome's DecompressionStream has no brotli, so the extension reads .wgb / .wgb.gz.
+
+BUNDLE_MAGIC = b"WGB1"
+BUNDLE_SUFFIXES = {None: ".wgb", "gzip": ".wgb.gz", "brotli": ".wgb.br"}
+
+_NULL, _FALSE, _TRUE, _INT, _FLOAT, _LIST, _DICT, _STRING = range(8)
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def bundle_path(output_json, compression=None):
+    """json/{topic}.json -> json/{topic}.wgb[.gz|.br]; sharded json/{topic} -> json/{topic}/bundle.wgb[...]"""
+    suffix = BUNDLE_SUFFIXES[compression]
+    if output_json.endswith(".json"):
+        return output_json[:-len(".json")] + suffix
+    return os.path.join(output_json, "bundle" + suffix)
+
+
+def _write_varint(out, n):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _count(value, strings, shapes):
+    if isinstance(value, str):
+        strings[value] += 1
+    elif isinstance(value, list):
+        for item in value:
+            _count(item, strings, shapes)
+    elif isinstance(value, dict):
+        keys = tuple(value)
+        shapes[keys] += 1
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"Bundle dict keys must be strings, got {key!r}")
+            _count(item, strings, shapes)
+        if shapes[keys] == 1:
+            # Count a shape's keys once, not once per dict using it
+            strings.update(keys)
+
+
+def _encode(value, out, string_ids, shape_ids):
+    if value is None:
+        out.append(_NULL)
+    elif value is True or value is False:
+        out.append(_TRUE if value else _FALSE)
+    elif isinstance(value, str):
+        _write_varint(out, _STRING + string_ids[value])
+    elif isinstance(value, int):
+        out.append(_INT)
+        _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += struct.pack("<d", value)
+    elif isinstance(value, list):
+        out.append(_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _encode(item, out, string_ids, shape_ids)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        _write_varint(out, shape_ids[tuple(value)])
+        for item in value.values():
+            _encode(item, out, string_ids, shape_ids)
+    else:
+        raise TypeError(f"Cannot bundle a {type(value).__name__}: {value!r}")
+
+
+def encode_bundle(nested):
+    """Uncompressed bundle bytes for a JSON-compatible value (normally a nested topic dict)."""
+    strings, shapes = Counter(), Counter()
+    _count(nested, strings, shapes)
+    # most_common sorts by count and keeps first-seen order among ties, so output is stable
+    string_ids = {s: i for i, (s, _) in enumerate(strings.most_common())}
+    shape_ids = {keys: i for i, (keys, _) in enumerate(shapes.most_common())}
+
+    out = bytearray(BUNDLE_MAGIC)
+    _write_varint(out, len(string_ids))
+    for s in string_ids:
+        data = s.encode("utf-8")
+        _write_varint(out, len(data))
+        out += data
+    _write_varint(out, len(shape_ids))
+    for keys in shape_ids:
+        _write_varint(out, len(keys))
+        for key in keys:
+            _write_varint(out, string_ids[key])
+    _encode(nested, out, string_ids, shape_ids)
+    return bytes(out)
+
+
+def compress_bundle(data, compression=None):
+    if compression is None:
+        return data
+    if compression == "gzip":
+        # mtime=0 so unchanged input gives byte-identical output
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if compression == "brotli":
+        import brotli
+        return brotli.compress(data, quality=11)
+    raise ValueError(f"Unknown bundle compression {compression!r}; choose from {sorted(filter(None, BUNDLE_SUFFIXES))}")
+
+
+def _decompress(data):
+    if data[:len(BUNDLE_MAGIC)] == BUNDLE_MAGIC:
+        return data
+    if data[:len(_GZIP_MAGIC)] == _GZIP_MAGIC:
+        return gzip.decompress(data)
+    # Brotli streams have no magic number; anything else is tried as brotli
+    import brotli
+    return brotli.decompress(data)
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = len(BUNDLE_MAGIC)
+
+    def varint(self):
+        data, pos = self.data, self.pos
+        n = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            n |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                self.pos = pos
+                return n
+            shift += 7
+
+
+def decode_bundle(data):
+    """Bundle bytes (plain, gzip or brotli) -> the original value."""
+    data = _decompress(data)
+    if data[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+        raise ValueError("Not a fact bundle")
+    reader = _Reader(data)
+    strings = []
+    for _ in range(reader.varint()):
+        length = reader.varint()
+        strings.append(data[reader.pos:reader.pos + length].decode("utf-8"))
+        reader.pos += length
+    shapes = []
+    for _ in range(reader.varint()):
+        shapes.append([strings[reader.varint()] for _ in range(reader.varint())])
+
+    def value():
+        tag = reader.varint()
+        if tag >= _STRING:
+            return strings[tag - _STRING]
+        if tag == _DICT:
+            keys = shapes[reader.varint()]
+            return {key: value() for key in keys}
+        if tag == _LIST:
+            return [value() for _ in range(reader.varint())]
+        if tag == _NULL:
+            return None
+        if tag == _INT:
+            n = reader.varint()
+            return n >> 1 if not n & 1 else -((n + 1) >> 1)
+        if tag == _FLOAT:
+            reader.pos += 8
+            return struct.unpack_from("<d", data, reader.pos - 8)[0]
+        return tag == _TRUE
+
+    return value()
+
+
+def write_topic_bundle(groups, path, compression=None):
+    """
+    Collect (person, language, header_1, entries) groups into the nested topic dict
+    and write it as a bundle. Returns the number of entries written.
+    """
+    nested, entry_count = {}, 0
+    for person, language, header, entries in groups:
+        nested.setdefault(person, {}).setdefault("languages", {})\
+              .setdefault(language, {}).setdefault("headers", {})[header] = {"entries": entries}
+        entry_count += len(entries)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compress_bundle(encode_bundle(nested), compression))
+    os.replace(tmp_path, path)
+    return entry_count
+
+
+def read_topic_bundle(path):
+    with open(path, "rb") as f:
+        return decode_bundle(f.read())
+
+
+def _parse_seconds(parse, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """
+    python data_pipeline/topic_bundle.py encode json/Paella.json ... [--compression gzip|brotli]
+    python data_pipeline/topic_bundle.py stats json/Paella.json ...
+    encode writes the bundle next to each topic JSON; stats compares size and parse time
+    of the JSON with every bundle variant (checking each decodes to the same data).
+    """
+    args = sys.argv[1:]
+    if not args or args[0] not in ("encode", "stats"):
+        print(main.__doc__)
+        sys.exit(1)
+    compression = None
+    if "--compression" in args:
+        i = args.index("--compression")
+        compression = args[i + 1]
+        args = args[:i] + args[i + 2:]
+
+    for json_path in args[1:]:
+        with open(json_path, "rb") as f:
+            raw_json = f.read()
+        nested = json.loads(raw_json)
+        if args[0] == "encode":
+            path = bundle_path(json_path, compression)
+            with open(path, "wb") as f:
+                f.write(compress_bundle(encode_bundle(nested), compression))
+            print(f"{path}: {os.path.getsize(path)} bytes (JSON {len(raw_json)})")
+            continue
+
+        json_s = _parse_seconds(lambda: json.loads(raw_json))
+        print(f"{json_path}: JSON {len(raw_json)} bytes, parse {json_s * 1000:.2f} ms")
+        bundle = encode_bundle(nested)
+        for variant in BUNDLE_SUFFIXES:
+            try:
+                data = compress_bundle(bundle, variant)
+            except ImportError:
+                print(f"  {variant}: not available (pip install brotli)")
+                continue
+            assert decode_bundle(data) == nested, f"{variant} bundle does not round-trip"
+            seconds = _parse_seconds(lambda: decode_bundle(data))
+            print(f"  {BUNDLE_SUFFIXES[variant]:8} {len(data):7} bytes ({len(raw_json) / len(data):5.1f}x smaller), "
+                  f"decode {seconds * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import os
+import json
+import itertools
+
+# ---------------------------
+# Streaming topic JSON writer
+# ---------------------------
+# Writes the nested {person: {languages: {lang: {headers: {header: {entries: [...]}}}}}}
+# structure group by group, so the whole topic never has to sit in memory as one
+# dict or one big string. Groups must arrive in nested order, i.e. all groups
+# of a (person, language) pair together, as iter_nested_groups yields them.
+#
+#   pretty  -> byte-identical to json.dump(nested, f, indent=4, ensure_ascii=False)
+#   compact -> no indentation, no spaces after separators
+#   sharded -> one compact file per language plus a small manifest.json:
+#                json/{topic}/manifest.json
+#                json/{topic}/{lang}.json
+
+SHARD_MANIFEST_NAME = "manifest.json"
+SHARD_FORMAT = "wikigap-shards-v1"
+
+
+class _NestedJsonWriter:
+    def __init__(self, f, indent=None):
+        self.f = f
+        self.indent = indent
+        self.key_sep = ": " if indent is not None else ":"
+        self.person = None
+        self.language = None
+        self.first_header = True
+        self.entry_count = 0
+
+    def _pad(self, depth):
+        return "\n" + " " * (self.indent * depth) if self.indent is not None else ""
+
+    def _key(self, depth, key):
+        return self._pad(depth) + json.dumps(key, ensure_ascii=False) + self.key_sep
+
+    def _encode(self, value, depth):
+        if self.indent is None:
+            return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        # JSON escapes newlines inside strings, so every raw newline is structural
+        text = json.dumps(value, ensure_ascii=False, indent=self.indent)
+        return text.replace("\n", "\n" + " " * (self.indent * depth))
+
+    def _close_language(self):
+        self.f.write(self._pad(4) + "}" + self._pad(3) + "}")
+
+    def _close_person(self):
+        self._close_language()
+        self.f.write(self._pad(2) + "}" + self._pad(1) + "}")
+
+    def begin(self):
+        self.f.write("{")
+
+    def write_group(self, person, language, header, entries):
+        if person != self.person:
+            if self.person is not None:
+                self._close_person()
+                self.f.write(",")
+            self.f.write(self._key(1, person) + "{" + self._key(2, "languages") + "{")
+            self.person, self.language = person, None
+
+        if language != self.language:
+            if self.language is not None:
+                self._close_language()
+                self.f.write(",")
+            self.f.write(self._key(3, language) + "{" + self._key(4, "headers") + "{")
+            self.language = language
+            self.first_header = True
+
+        if not self.first_header:
+            self.f.write(",")
+        self.first_header = False
+        self.f.write(self._key(5, header) + "{" + self._key(6, "entries") + "[")
+        for i, entry in enumerate(entries):
+            self.f.write(("," if i else "") + self._pad(7) + self._encode(entry, 7))
+        self.f.write((self._pad(6) if entries else "") + "]" + self._pad(5) + "}")
+        self.entry_count += len(entries)
+
+    def end(self):
+        if self.person is not None:
+            self._close_person()
+            self.f.write(self._pad(0))
+        self.f.write("}")
+
+
+def write_topic_json(groups, output_path, compact=False):
+    """
+    Stream (person, language, header_1, entries) groups into one topic file.
+    Returns the number of entries written.
+    """
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        writer = _NestedJsonWriter(f, indent=None if compact else 4)
+        writer.begin()
+        for person, language, header, entries in groups:
+            writer.write_group(person, language, header, entries)
+        writer.end()
+    os.replace(tmp_path, output_path)
+    return writer.entry_count
+
+
+def write_topic_shards(groups, output_dir, topic, compact=True):
+    """
+    Stream groups into one file per language under output_dir, then write a
+    manifest listing the shards. Each shard has the same nested layout as the
+    single-file output, restricted to its language.
+    Returns the manifest dict.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"format": SHARD_FORMAT, "topic": topic, "languages": {}}
+
+    for (person, language), run in itertools.groupby(groups, key=lambda group: (group[0], group[1])):
+        if language in manifest["languages"]:
+            raise ValueError(f"Groups for {language} are not contiguous; cannot shard {topic}")
+        filename = f"{language}.json"
+        path = os.path.join(output_dir, filename)
+        entries = write_topic_json(run, path, compact=compact)
+        manifest["languages"][language] = {
+            "file": filename,
+            "person": person,
+            "entries": entries,
+            "bytes": os.path.getsize(path),
+        }
+
+    manifest_path = os.path.join(output_dir, SHARD_MANIFEST_NAME)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=None if compact else 4)
+    return manifest
@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import hashlib
+
+import loguru
+
+logger = loguru.logger
+
+# ---------------------------
+# Translation backends
+# ---------------------------
+# Every backend translates a batch of strings in one call:
+#
+#   backend.translate_batch(texts, src_lang, tgt_lang) -> [translation or None, ...]
+#
+# and may return None instead of a list when a reply can't be lined up with the
+# inputs (the async client then retries the texts one by one). Backends are picked
+# by name from BACKENDS, so process_annotations only needs a config string:
+#
+#   google      deep_translator's GoogleTranslator, one request per text
+#   openai      chat-completions model, a JSON array of texts per request
+#   dictionary  offline glossary lookups (see build_glossary), no network at all
+#   stub        deterministic "[src->tgt] text" output, for tests and benchmarks
+#
+# Language arguments are whatever the caller uses (codes like "zh-TW" for headers,
+# names like "Chinese" for facts); backends that need ISO codes use language_code().
+
+GLOSSARY_PATH = "data_pipeline/translation_glossary.json"
+
+_LANGUAGE_NAMES = {"english": "en", "french": "fr", "russian": "ru", "chinese": "zh"}
+
+
+def language_code(lang):
+    """'French' -> 'fr', 'zh-TW' -> 'zh', 'ru' -> 'ru'."""
+    lang = lang.strip().lower()
+    return _LANGUAGE_NAMES.get(lang, lang.split("-")[0])
+
+
+def _unescape_translation(translated):
+    """Try to unescape if it looks like a JSON-encoded string."""
+    if isinstance(translated, str):
+        try:
+            # If translated was something like "\"Galof rice...\""
+            # json.loads() will convert it to a clean string
+            possibly_unescaped = json.loads(translated)
+            if isinstance(possibly_unescaped, str):
+                translated = possibly_unescaped
+        except json.JSONDecodeError:
+            # Not a JSON-encoded string, so just keep the original
+            pass
+    return translated
+
+
+def _normalize(text):
+    return " ".join(text.split()).casefold()
+
+
+class BackendConfigError(RuntimeError):
+    """Raised when a translation backend can't translate anything as configured."""
+    pass
+
+
+class TranslationBackend:
+    """
+    name       -- label used in translation cache keys
+    model      -- model/engine version, also part of the cache key
+    chunk_size -- texts per translate_batch call (None: the client's default)
+    cacheable  -- whether results belong in the on-disk translation cache
+    remote     -- False for local engines: no rate limiting, the whole batch in one call
+    """
+
+    name = "base"
+    model = ""
+    chunk_size = None
+    cacheable = True
+    remote = True
+
+    def translate_batch(self, texts, src_lang, tgt_lang):
+        raise NotImplementedError
+
+    def check(self):
+        """Raise BackendConfigError if this backend can't work as configured (no network calls)."""
+        pass
+
+    def fingerprint(self):
+        """Identifies everything that changes this backend's output (for build keys)."""
+        return f"{self.name}:{self.model}"
+
+
+class GoogleBackend(TranslationBackend):
+    name = "google"
+    # GoogleTranslator has no real multi-item endpoint, so each text is its own request
+    chunk_size = 1
+
+    def check(self):
+        try:
+            import deep_translator  # noqa: F401
+        except ImportError:
+            raise BackendConfigError("The google translation backend needs the deep_translator package") from None
+
+    def translate_batch(self, texts, src_lang, tgt_lang):
+        from deep_translator import GoogleTranslator
+
+        translator = GoogleTranslator(source=src_lang, target=tgt_lang)
+        return [translator.translate(text) for text in texts]
+
+
+class OpenAIChatBackend(TranslationBackend):
+    name = "openai"
+
+    def __init__(self, client=None, model="gpt-4o-mini"):
+        self.client = client
+        self.model = model
+
+    def check(self):
+        if not self.client:
+            raise BackendConfigError("The openai translation backend needs a configured client")
+
+    def translate_batch(self, texts, src_lang, tgt_lang):
+        """
+        One request for the whole chunk. Exceptions propagate so the client can retry;
+        a reply that doesn't line up returns None so the client falls back to single texts.
+        """
+        self.check()
+        if len(texts) == 1:
+            content = (
+                f"Translate the following content: '{texts[0]}' "
+                f"from {src_lang} to {tgt_lang}. "
+                "Return only the translation."
+            )
+        else:
+            content = (
+                f"Translate each string of the following JSON array from {src_lang} to {tgt_lang}. "
+                "Return only a JSON array of the translations, in the same order.\n"
+                + json.dumps(texts, ensure_ascii=False)
+            )
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": content}]
+        )
+        reply = response.choices[0].message.content.strip()
+        if len(texts) == 1:
+            return [_unescape_translation(reply)]
+
+        reply = reply.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+        try:
+            parsed = json.loads(reply)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(parsed, list):
+            return None
+        return [_unescape_translation(str(t).strip()) for t in parsed]
+
+
+class DictionaryBackend(TranslationBackend):
+    """
+    Offline glossary engine: {"fr->en": {"source text": "translation", ...}, ...}.
+    Lookups try the exact text, then a whitespace/case-normalized form. Misses count as
+    failures (fallback="none", the default), so they end up in translation_failures rather
+    than in the output; fallback="source" returns the source text unchanged instead, which
+    is only fit for previews. The shipped glossary holds strings from already published
+    output, not a general vocabulary, so expect most new texts to miss.
+    """
+
+    name = "dictionary"
+    cacheable = False
+    remote = False
+
+    def __init__(self, path=GLOSSARY_PATH, fallback="none"):
+        self.path = path
+        self.fallback = fallback
+        self.glossary = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.glossary = json.load(f)
+        else:
+            logger.warning(f"No glossary at {path}; every dictionary lookup will miss")
+        self._normalized = {
+            pair: {_normalize(k): v for k, v in entries.items()} for pair, entries in self.glossary.items()
+        }
+
+    def translate_batch(self, texts, src_lang, tgt_lang):
+        pair = f"{language_code(src_lang)}->{language_code(tgt_lang)}"
+        entries = self.glossary.get(pair, {})
+        normalized = self._normalized.get(pair, {})
+        translations = []
+        for text in texts:
+            translated = entries.get(text) or normalized.get(_normalize(text))
+            if translated is None and self.fallback == "source":
+                translated = text
+            translations.append(translated)
+        return translations
+
+    def fingerprint(self):
+        if not os.path.exists(self.path):
+            return f"{self.name}:missing:{self.fallback}"
+        with open(self.path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        return f"{self.name}:{digest}:{self.fallback}"
+
+
+class StubBackend(TranslationBackend):
+    """Deterministic, instant and offline: '[fr->en] text'."""
+
+    name = "stub"
+    cacheable = False
+    remote = False
+
+    def translate_batch(self, texts, src_lang, tgt_lang):
+        return [f"[{language_code(src_lang)}->{language_code(tgt_lang)}] {text}" for text in texts]
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "openai": OpenAIChatBackend,
+    "dictionary": DictionaryBackend,
+    "stub": StubBackend,
+}
+
+
+def make_backend(name, **options):
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown translation backend {name!r}; choose from {sorted(BACKENDS)}") from None
+    return backend_cls(**options)
+
+
+# ---------------------------
+# Glossary from published output
+# ---------------------------
+def build_glossary(topic_json_paths, tgt_lang="en"):
+    """
+    Collect original -> translated pairs (facts and headers) from nested topic JSON files,
+    so the dictionary backend reproduces already published translations offline.
+    """
+    glossary = {}
+    for path in topic_json_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            nested = json.load(f)
+        for person in nested.values():
+            for lang, language_data in person.get("languages", {}).items():
+                entries = glossary.setdefault(f"{language_code(lang)}->{tgt_lang}", {})
+                for header in language_data.get("headers", {}).values():
+                    for entry in header.get("entries", []):
+                        for field in ("fact", "header_1", "header_2"):
+                            original = (entry.get(field) or {}).get("original")
+                            translated = (entry.get(field) or {}).get("translated")
+                            if isinstance(original, str) and isinstance(translated, str):
+                                entries.setdefault(original, translated)
+    return {pair: dict(sorted(entries.items())) for pair, entries in sorted(glossary.items())}
+
+
+def main():
+    """python data_pipeline/translation_backends.py build-glossary json/Paella.json ... [--out PATH]"""
+    args = sys.argv[1:]
+    if not args or args[0] != "build-glossary":
+        print(main.__doc__)
+        sys.exit(1)
+    out_path = GLOSSARY_PATH
+    if "--out" in args:
+        i = args.index("--out")
+        out_path = args[i + 1]
+        args = args[:i] + args[i + 2:]
+    glossary = build_glossary(args[1:])
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(glossary, f, ensure_ascii=False, indent=1)
+    print(f"{out_path}: " + ", ".join(f"{pair} {len(entries)}" for pair, entries in glossary.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+import time
+import sqlite3
+import threading
+import hashlib
+
+import loguru
+
+from run_metrics import count
+
+logger = loguru.logger
+
+# ---------------------------
+# Persistent translation cache
+# ---------------------------
+# Translations are stored in a single SQLite file keyed by a hash of
+# (text, src, tgt, backend, model). SQLite in WAL mode lets several pipeline
+# workers read and write the same cache concurrently; a busy timeout handles
+# writer contention. Entries carry a last-used timestamp so the cache can be
+# trimmed back to `max_entries` in least-recently-used order. Counting the table
+# is a full scan, so the trim only runs once every `evict_every` inserted rows;
+# between trims the cache may overshoot by that much.
+
+TRANSLATION_CACHE_PATH = "data_pipeline/.cache/translations.sqlite"
+TRANSLATION_CACHE_MAX_ENTRIES = 500_000
+TRANSLATION_CACHE_EVICT_EVERY = 1000  # Inserted rows between LRU trims
+TRANSLATION_BATCH_SIZE = 50
+
+
+def cache_key(text, src_lang, tgt_lang, backend, model=""):
+    """Content address for one translation request."""
+    payload = "\x1f".join([backend, model or "", src_lang, tgt_lang, text])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """On-disk, process-safe, LRU-trimmed translation cache."""
+
+    def __init__(self, path=TRANSLATION_CACHE_PATH, max_entries=TRANSLATION_CACHE_MAX_ENTRIES,
+                 evict_every=TRANSLATION_CACHE_EVICT_EVERY):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        # Start due, so a cache that is already over the limit is trimmed on the first put
+        self._inserted_since_evict = evict_every
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " translation TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON translations(last_used)")
+
+    def get_many(self, keys):
+        """Return {key: translation} for the keys present in the cache, refreshing their LRU stamp."""
+        found = {}
+        keys = list(keys)
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, translation FROM translations WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            found.update(rows)
+
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE translations SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        count("translation_cache_hits", len(found))
+        count("translation_cache_misses", len(keys) - len(found))
+        return found
+
+    def put_many(self, items):
+        """Store {key: translation}; every `evict_every` rows, trim the cache back to max_entries."""
+        if not items:
+            return
+        now = time.time()
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, translation, last_used) VALUES (?, ?, ?)",
+                [(key, value, now) for key, value in items.items()],
+            )
+            self._inserted_since_evict += len(items)
+            if self._inserted_since_evict >= self.evict_every:
+                self._evict()
+
+    def _evict(self):
+        self._inserted_since_evict = 0
+        (rows,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        overflow = rows - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+_CACHES = {}
+
+
+def get_translation_cache(path=TRANSLATION_CACHE_PATH):
+    """
+    One cache connection per (process, thread, path). SQLite connections must not
+    cross a fork or be shared between threads, so pool workers each open their own.
+    """
+    key = (os.getpid(), threading.get_ident(), path)
+    if key not in _CACHES:
+        _CACHES[key] = TranslationCache(path)
+    return _CACHES[key]
+
+
+# ---------------------------
+# Batching layer
+# ---------------------------
+def translate_unique(texts, src_lang, tgt_lang, backend, translate_batch, model="",
+                     cache=None, batch_size=TRANSLATION_BATCH_SIZE):
+    """
+    Translate every distinct string in `texts` at most once.
+    - Duplicates (and None) are collapsed before anything is looked up.
+    - Cached translations are reused.
+    - Remaining strings go to `translate_batch(list_of_texts) -> list_of_translations`
+      in chunks of `batch_size` (all at once if None, for backends that chunk themselves).
+      Items translated as None count as failed: they are left out of the result and
+      never written to the cache.
+    Returns {text: translation}.
+    """
+    unique = list(dict.fromkeys(t for t in texts if isinstance(t, str) and t.strip()))
+    if not unique:
+        return {}
+
+    keys = {text: cache_key(text, src_lang, tgt_lang, backend, model) for text in unique}
+    cached = cache.get_many(keys.values()) if cache is not None else {}
+    translations = {text: cached[key] for text, key in keys.items() if key in cached}
+
+    pending = [text for text in unique if text not in translations]
+    if pending:
+        logger.info(
+            f"{backend}: {len(translations)} cached, translating {len(pending)} of "
+            f"{len(unique)} unique strings ({src_lang} -> {tgt_lang})"
+        )
+    step = batch_size or max(len(pending), 1)
+    for i in range(0, len(pending), step):
+        chunk = pending[i:i + step]
+        results = translate_batch(chunk)
+        fresh = {}
+        for text, translated in zip(chunk, results):
+            if translated is None:
+                continue
+            translations[text] = translated
+            fresh[keys[text]] = translated
+        if cache is not None:
+            cache.put_many(fresh)
+
+    return translations
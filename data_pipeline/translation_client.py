@@ -0,0 +1,215 @@
+import time
+import random
+import asyncio
+import inspect
+
+import loguru
+
+from run_metrics import count
+
+logger = loguru.logger
+
+# ---------------------------
+# Async translation client
+# ---------------------------
+# Wraps a translation callable (sync or async) so many requests can be in
+# flight at once while staying polite to the remote endpoint:
+#   - at most `max_in_flight` concurrent requests (semaphore)
+#   - at most `requests_per_second` sustained, `burst` at once (token bucket)
+#   - retries with exponential backoff + jitter, honoring Retry-After
+# Only transient errors are retried (timeouts, dropped connections, 429, 5xx);
+# any other HTTP error fails its texts at once. Items that fail are reported in
+# `failures` and come back as None; they are never replaced by an error string.
+# Errors without an HTTP status that aren't transient either (a missing client,
+# a bug in a backend) propagate, so a misconfigured run stops instead of
+# quietly failing every text.
+
+MAX_IN_FLIGHT = 8
+REQUESTS_PER_SECOND = 5.0
+BURST = 10
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+CHUNK_SIZE = 20
+
+# Timeout / connection error classes of openai, httpx, requests, urllib and deep_translator,
+# matched by name so none of those libraries has to be importable here
+_TRANSIENT_ERROR_NAMES = {
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+    "TimeoutException", "TransportError", "NetworkError",
+    "Timeout", "ReadTimeout", "ConnectTimeout", "ConnectionError",
+    "URLError", "TooManyRequests",
+}
+
+
+class TokenBucket:
+    """Simple asyncio token bucket: `rate` tokens per second, up to `capacity` banked."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retry_after_seconds(error):
+    """
+    Extract a Retry-After delay (in seconds) from an exception, if it carries one.
+    Works with openai/httpx/requests errors that expose `.response.headers`.
+    """
+    explicit = getattr(error, "retry_after", None)
+    if explicit is not None:
+        try:
+            return float(explicit)
+        except (TypeError, ValueError):
+            pass
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        # HTTP-date form
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def http_status(error):
+    """HTTP status code carried by an exception (`.status_code`, `.status` or `.response`), if any."""
+    for holder in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "status"):
+            status = getattr(holder, attr, None)
+            if isinstance(status, int):
+                return status
+    return None
+
+
+def is_transient_error(error):
+    """True for errors worth retrying: timeouts, connection failures, 429 and 5xx replies."""
+    status = http_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class AsyncTranslationClient:
+    """
+    Concurrent, rate-limited, retrying front end for a batch translation callable.
+
+    `translate_fn(list_of_texts) -> list_of_translations` may be a plain function
+    (run in a worker thread) or a coroutine function. If it returns something that
+    doesn't line up with its input (e.g. None, or a list of the wrong length),
+    the chunk is retried one text at a time.
+    """
+
+    def __init__(self, translate_fn, max_in_flight=MAX_IN_FLIGHT, requests_per_second=REQUESTS_PER_SECOND,
+                 burst=BURST, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 chunk_size=CHUNK_SIZE, name="translation"):
+        self.translate_fn = translate_fn
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.chunk_size = chunk_size
+        self.name = name
+        self.failures = {}  # text -> last error message
+        self.request_count = 0
+        self._bucket_state = None  # (tokens, updated) left by the previous translate_batch call
+
+    async def _invoke(self, texts):
+        if inspect.iscoroutinefunction(self.translate_fn):
+            return await self.translate_fn(texts)
+        return await asyncio.to_thread(self.translate_fn, texts)
+
+    async def _call_with_retry(self, texts, semaphore, bucket):
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            async with semaphore:
+                self.request_count += 1
+                count("translation_requests")
+                try:
+                    return await self._invoke(texts)
+                except Exception as e:
+                    error = e
+            attempt += 1
+            if attempt > self.max_retries or not is_transient_error(error):
+                raise error
+            delay = retry_after_seconds(error)
+            if delay is None:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                delay *= 0.5 + random.random() / 2
+            logger.debug(f"{self.name}: retry {attempt}/{self.max_retries} in {delay:.1f}s after {error!r}")
+            await asyncio.sleep(delay)
+
+    async def _translate_chunk(self, chunk, semaphore, bucket):
+        try:
+            result = await self._call_with_retry(chunk, semaphore, bucket)
+        except Exception as e:
+            if http_status(e) is None and not is_transient_error(e):
+                raise
+            # Retries are exhausted or the request was rejected: don't hammer the endpoint per text
+            for text in chunk:
+                self.failures[text] = repr(e)
+            return [None] * len(chunk)
+
+        if isinstance(result, list) and len(result) == len(chunk):
+            for text, translated in zip(chunk, result):
+                if translated is None:
+                    self.failures[text] = "No translation returned"
+            return result
+        if len(chunk) == 1:
+            self.failures[chunk[0]] = f"Unusable reply: {result!r}"
+            return [None]
+
+        # The batched reply didn't line up with its input: fall back to one text per request
+        singles = await asyncio.gather(*(self._translate_chunk([text], semaphore, bucket) for text in chunk))
+        return [single[0] for single in singles]
+
+    async def translate_batch_async(self, texts):
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        bucket = TokenBucket(self.requests_per_second, self.burst)
+        if self._bucket_state is not None:
+            # Successive calls share one rate budget: a new batch doesn't start with a fresh burst
+            bucket.tokens, bucket.updated = self._bucket_state
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        try:
+            results = await asyncio.gather(*(self._translate_chunk(chunk, semaphore, bucket) for chunk in chunks))
+        finally:
+            self._bucket_state = (bucket.tokens, bucket.updated)
+        return [translated for chunk_result in results for translated in chunk_result]
+
+    def translate_batch(self, texts):
+        """Synchronous entry point: translate `texts`, returning None for items that failed."""
+        texts = list(texts)
+        if not texts:
+            return []
+        translations = asyncio.run(self.translate_batch_async(texts))
+        failed = sum(t is None for t in translations)
+        if failed:
+            logger.warning(f"{self.name}: {failed} of {len(texts)} items failed (see failures)")
+        return translations
@@ -0,0 +1,123 @@
+import re
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------------------
+# Local stub translation endpoint
+# ---------------------------
+# A tiny OpenAI-compatible /chat/completions server for exercising the async
+# translation client without touching the real endpoint. It "translates" by
+# tagging the text with the target language, and can be told to answer every
+# N-th request with 429 + Retry-After to exercise the retry path.
+#
+#   python data_pipeline/translation_stub_server.py --port 8765 --throttle-every 5
+#
+# then point the pipeline at it:
+#   client = openai.OpenAI(base_url="http://127.0.0.1:8765", api_key="stub")
+
+
+# The two prompt shapes OpenAIChatBackend sends (see translation_backends.py)
+_SINGLE_PROMPT = re.compile(
+    r"^Translate the following content: '(?P<text>.*)' from (?P<src>.+?) to (?P<tgt>.+?)\. "
+    r"Return only the translation\.$",
+    re.DOTALL,
+)
+_BATCH_PROMPT = re.compile(
+    r"^Translate each string of the following JSON array from (?P<src>.+?) to (?P<tgt>.+?)\. "
+    r"Return only a JSON array of the translations, in the same order\.\n(?P<texts>\[.*\])$",
+    re.DOTALL,
+)
+
+
+def stub_translate(text, tgt_lang):
+    return f"[{tgt_lang}] {text}"
+
+
+def parse_prompt(prompt):
+    """
+    Source text(s) and target language of a translation prompt: (text, tgt) for a
+    single-text prompt, ([texts], tgt) for a batched one, (None, None) otherwise.
+    Only the source text is echoed back, never the instructions around it.
+    """
+    match = _SINGLE_PROMPT.match(prompt)
+    if match:
+        return match["text"], match["tgt"]
+    match = _BATCH_PROMPT.match(prompt)
+    if match:
+        try:
+            texts = json.loads(match["texts"])
+        except json.JSONDecodeError:
+            return None, None
+        if isinstance(texts, list):
+            return texts, match["tgt"]
+    return None, None
+
+
+def make_handler(throttle_every=0, retry_after=1):
+    state = {"count": 0, "lock": threading.Lock()}
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload, headers=None):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            with state["lock"]:
+                state["count"] += 1
+                count = state["count"]
+            if throttle_every and count % throttle_every == 0:
+                self._send(429, {"error": {"message": "Rate limited (stub)"}}, {"Retry-After": str(retry_after)})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            prompt = request.get("messages", [{}])[-1].get("content", "")
+
+            texts, tgt_lang = parse_prompt(prompt)
+            if texts is None:
+                self._send(400, {"error": {"message": "Unrecognized translation prompt (stub)"}})
+                return
+            if isinstance(texts, list):
+                content = json.dumps([stub_translate(t, tgt_lang) for t in texts], ensure_ascii=False)
+            else:
+                content = stub_translate(texts, tgt_lang)
+
+            self._send(200, {
+                "id": f"stub-{count}",
+                "object": "chat.completion",
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+            })
+
+    return StubHandler
+
+
+def start_stub_server(port=0, throttle_every=0, retry_after=1):
+    """Start the stub in a background thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(throttle_every, retry_after))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub for the translation endpoint")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every N-th request with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.throttle_every, args.retry_after))
+    print(f"Stub translation server listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+
+import loguru
+
+from run_metrics import count
+
+logger = loguru.logger
+
+# ---------------------------
+# Wikidata resolution
+# ---------------------------
+# Resolves Wikipedia titles to Wikidata QIDs and their interlanguage sitelinks.
+#   - one pooled requests.Session, with timeouts
+#   - wbgetentities called with up to 50 titles per request, asking for
+#     sitelinks/urls directly so QID + sitelinks come back in the same call
+#   - results memoized on disk (SQLite, shared by processes)
+#   - offline mode: answer only from a prebuilt snapshot file, never the network
+#     (build one where the network is available: python data_pipeline/wikidata_resolver.py export)
+#   - requests is only imported once a lookup actually has to go to the network
+#
+# Snapshot format (see export_snapshot):
+#   {"titles": {"enwiki": {"Paella": "Q5337", ...}},
+#    "sitelinks": {"Q5337": {"frwiki": "https://fr.wikipedia.org/wiki/Paella", ...}}}
+
+WIKIDATA_API_URL = "https://www.wikidata.org/w/api.php"
+WIKIDATA_CACHE_PATH = "data_pipeline/.cache/wikidata.sqlite"
+WIKIDATA_SNAPSHOT_PATH = "data_pipeline/wikidata_snapshot.json"
+WIKIDATA_OFFLINE = False
+WIKIDATA_BATCH_SIZE = 50  # wbgetentities limit for anonymous clients
+WIKIDATA_TIMEOUT = (5, 30)  # (connect, read) seconds
+USER_AGENT = "WikiGap-data-pipeline/1.0 (https://github.com/aw814/WikiGap)"
+
+MISSING = ""  # memoized "no entity for this title"
+
+
+def normalize_title(title):
+    """MediaWiki title normalization: underscores are spaces and the first letter is uppercase."""
+    title = title.replace("_", " ").strip()
+    return title[:1].upper() + title[1:]
+
+
+class WikidataResolver:
+    """Memoized, batched title -> QID -> sitelinks resolver."""
+
+    def __init__(self, cache_path=WIKIDATA_CACHE_PATH, snapshot_path=WIKIDATA_SNAPSHOT_PATH,
+                 offline=WIKIDATA_OFFLINE, api_url=WIKIDATA_API_URL, session=None):
+        self.api_url = api_url
+        self.offline = offline
+        self.request_count = 0
+        self._session = session
+        self._titles = {}     # (site, normalized title) -> qid or MISSING
+        self._sitelinks = {}  # qid -> {site: url}
+
+        if snapshot_path and os.path.exists(snapshot_path):
+            self._load_snapshot(snapshot_path)
+        elif offline:
+            logger.warning(f"Wikidata offline mode without a snapshot at {snapshot_path}: no links will resolve")
+
+        self._conn = None
+        if cache_path and not offline:
+            directory = os.path.dirname(cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(cache_path, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS titles (site TEXT, title TEXT, qid TEXT, PRIMARY KEY (site, title))")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sitelinks (qid TEXT PRIMARY KEY, links TEXT)")
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+            self._session.headers["User-Agent"] = USER_AGENT
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=3)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+        return self._session
+
+    # --- memo layers ---
+    def _load_snapshot(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        for site, titles in snapshot.get("titles", {}).items():
+            for title, qid in titles.items():
+                self._titles[(site, normalize_title(title))] = qid or MISSING
+        self._sitelinks.update(snapshot.get("sitelinks", {}))
+
+    def _lookup_disk(self, site, titles):
+        if self._conn is None:
+            return
+        for title in titles:
+            row = self._conn.execute("SELECT qid FROM titles WHERE site = ? AND title = ?", (site, title)).fetchone()
+            if row is None:
+                continue
+            qid = row[0]
+            self._titles[(site, title)] = qid
+            if qid and qid not in self._sitelinks:
+                links = self._conn.execute("SELECT links FROM sitelinks WHERE qid = ?", (qid,)).fetchone()
+                if links is not None:
+                    self._sitelinks[qid] = json.loads(links[0])
+
+    def _store(self, site, resolved, sitelinks):
+        self._titles.update({(site, title): qid for title, qid in resolved.items()})
+        self._sitelinks.update(sitelinks)
+        if self._conn is None:
+            return
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO titles (site, title, qid) VALUES (?, ?, ?)",
+                [(site, title, qid) for title, qid in resolved.items()],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sitelinks (qid, links) VALUES (?, ?)",
+                [(qid, json.dumps(links, ensure_ascii=False)) for qid, links in sitelinks.items()],
+            )
+
+    # --- network ---
+    def _fetch(self, site, titles):
+        """One wbgetentities call for up to WIKIDATA_BATCH_SIZE titles of the same site."""
+        params = {
+            "action": "wbgetentities",
+            "sites": site,
+            "titles": "|".join(titles),
+            "props": "sitelinks/urls",
+            "format": "json",
+        }
+        for attempt in range(3):
+            self.request_count += 1
+            count("wikidata_requests")
+            resp = self.session.get(self.api_url, params=params, timeout=WIKIDATA_TIMEOUT)
+            if resp.status_code == 429 or resp.status_code >= 500:
+                time.sleep(float(resp.headers.get("Retry-After", 2 ** attempt)))
+                continue
+            resp.raise_for_status()
+            break
+        else:
+            resp.raise_for_status()
+        data = resp.json()
+
+        resolved = {title: MISSING for title in titles}
+        sitelinks = {}
+        for qid, entity in data.get("entities", {}).items():
+            if "missing" in entity or not qid.startswith("Q"):
+                continue
+            links = entity.get("sitelinks", {})
+            sitelinks[qid] = {s: info["url"] for s, info in links.items() if "url" in info}
+            own = links.get(site, {}).get("title")
+            if own is not None and normalize_title(own) in resolved:
+                resolved[normalize_title(own)] = qid
+        return resolved, sitelinks
+
+    def resolve(self, titles, lang="en"):
+        """
+        Resolve many titles of one language edition at once.
+        Returns {title: qid or None}; sitelinks for every found QID are memoized too.
+        """
+        site = f"{lang}wiki"
+        wanted = {title: normalize_title(title) for title in titles if title}
+        pending = [t for t in dict.fromkeys(wanted.values()) if (site, t) not in self._titles]
+        self._lookup_disk(site, pending)
+        pending = [t for t in pending if (site, t) not in self._titles]
+
+        if pending and self.offline:
+            logger.warning(f"Wikidata offline: {len(pending)} {site} titles not in snapshot")
+        elif pending:
+            import requests
+
+            for i in range(0, len(pending), WIKIDATA_BATCH_SIZE):
+                chunk = pending[i:i + WIKIDATA_BATCH_SIZE]
+                try:
+                    resolved, sitelinks = self._fetch(site, chunk)
+                except (requests.RequestException, ValueError) as e:
+                    logger.warning(f"Wikidata lookup failed for {len(chunk)} {site} titles: {e}")
+                    continue
+                self._store(site, resolved, sitelinks)
+
+        return {title: self._titles.get((site, norm)) or None for title, norm in wanted.items()}
+
+    def sitelinks(self, qid):
+        """Return {site: url} for a QID (memoized; fetched if only the QID is known)."""
+        if qid in self._sitelinks:
+            return self._sitelinks[qid]
+        if self.offline:
+            return {}
+        import requests
+
+        self.request_count += 1
+        count("wikidata_requests")
+        try:
+            resp = self.session.get(
+                self.api_url,
+                params={"action": "wbgetentities", "ids": qid, "props": "sitelinks/urls", "format": "json"},
+                timeout=WIKIDATA_TIMEOUT,
+            )
+            resp.raise_for_status()
+            links = resp.json().get("entities", {}).get(qid, {}).get("sitelinks", {})
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Wikidata sitelinks lookup failed for {qid}: {e}")
+            return {}
+        links = {site: info["url"] for site, info in links.items() if "url" in info}
+        self._store("", {}, {qid: links})
+        return links
+
+    def tgt_wiki_links(self, titles, src_lang, tgt_langs):
+        """
+        Bulk version of get_tgt_wiki_link: {title: {tgt_lang: url}} for every title,
+        falling back to the title itself when there is no target-language article.
+        """
+        qids = self.resolve(titles, src_lang)
+        links = {}
+        for title, qid in qids.items():
+            if not qid:
+                logger.warning(f"No Wikidata ID found for: {title}")
+            sitelinks = self.sitelinks(qid) if qid else {}
+            links[title] = {lang: sitelinks.get(f"{lang}wiki", title) for lang in tgt_langs}
+        return links
+
+    def export_snapshot(self, path=WIKIDATA_SNAPSHOT_PATH):
+        """Write everything resolved so far as an offline snapshot."""
+        titles = {}
+        for (site, title), qid in self._titles.items():
+            titles.setdefault(site, {})[title] = qid or None
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"titles": titles, "sitelinks": self._sitelinks}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+
+_RESOLVERS = {}
+
+
+def get_wikidata_resolver(offline=None):
+    """
+    One resolver per (process, thread, mode). SQLite connections must not cross a fork
+    or be shared between threads, so every worker thread gets its own.
+    """
+    offline = WIKIDATA_OFFLINE if offline is None else offline
+    key = (os.getpid(), threading.get_ident(), offline)
+    if key not in _RESOLVERS:
+        _RESOLVERS[key] = WikidataResolver(offline=offline)
+    return _RESOLVERS[key]
+
+
+def main():
+    """
+    python data_pipeline/wikidata_resolver.py export [title ...] [--lang en] [--output PATH]
+    Resolves the titles (default: every topic in the annotation directory) online and
+    writes them, with their sitelinks, as the snapshot offline mode reads.
+    """
+    args = sys.argv[1:]
+    if not args or args[0] != "export":
+        print(main.__doc__)
+        sys.exit(1)
+    options = {"--lang": "en", "--output": WIKIDATA_SNAPSHOT_PATH}
+    titles = []
+    rest = iter(args[1:])
+    for arg in rest:
+        if arg in options:
+            options[arg] = next(rest)
+        else:
+            titles.append(arg)
+    if not titles:
+        from annotation_catalog import catalog_topics, scan_annotations
+        titles = catalog_topics(scan_annotations("data_pipeline/wikigap_data"))
+
+    resolver = WikidataResolver(offline=False)
+    qids = resolver.resolve(titles, options["--lang"])
+    resolver.export_snapshot(options["--output"])
+    found = sum(1 for qid in qids.values() if qid)
+    print(f"{options['--output']}: {found} of {len(titles)} titles resolved, {resolver.request_count} requests")
+
+
+if __name__ == "__main__":
+    main()
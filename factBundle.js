@@ -0,0 +1,102 @@
+// WikiGap - Fact bundle decoder
+// Reads the binary topic bundles written by data_pipeline/topic_bundle.py (json/{topic}.wgb,
+// or .wgb.gz) back into the same object JSON.parse gives for json/{topic}.json.
+
+const FACT_BUNDLE_MAGIC = [0x57, 0x47, 0x42, 0x31]; // "WGB1"
+const BUNDLE_TAG = { NULL: 0, FALSE: 1, TRUE: 2, INT: 3, FLOAT: 4, LIST: 5, DICT: 6, STRING: 7 };
+
+function decodeFactBundle(bytes) {
+  if (!FACT_BUNDLE_MAGIC.every((byte, i) => bytes[i] === byte)) {
+    throw new Error('Not a fact bundle');
+  }
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const utf8 = new TextDecoder();
+  let pos = FACT_BUNDLE_MAGIC.length;
+
+  function varint() {
+    let byte = bytes[pos++];
+    if (byte < 0x80) return byte;
+    let n = byte & 0x7f;
+    let scale = 0x80;
+    do {
+      byte = bytes[pos++];
+      n += (byte & 0x7f) * scale; // multiply, not shift: stays exact past 32 bits
+      scale *= 0x80;
+    } while (byte >= 0x80);
+    return n;
+  }
+
+  function zigzag() {
+    const start = pos;
+    const n = varint();
+    if (n <= Number.MAX_SAFE_INTEGER) return n % 2 === 0 ? n / 2 : -(n + 1) / 2;
+    // Past 2^53 the sum above has rounded away the sign bit: re-read it exactly and
+    // round once, to the same Number JSON.parse gives for that integer
+    pos = start;
+    let big = 0n;
+    let shift = 0n;
+    let byte;
+    do {
+      byte = bytes[pos++];
+      big |= BigInt(byte & 0x7f) << shift;
+      shift += 7n;
+    } while (byte >= 0x80);
+    return Number(big & 1n ? -((big + 1n) >> 1n) : big >> 1n);
+  }
+
+  const strings = new Array(varint());
+  for (let i = 0; i < strings.length; i++) {
+    const length = varint();
+    strings[i] = utf8.decode(bytes.subarray(pos, pos + length));
+    pos += length;
+  }
+  const shapes = new Array(varint());
+  for (let i = 0; i < shapes.length; i++) {
+    const keys = new Array(varint());
+    for (let k = 0; k < keys.length; k++) keys[k] = strings[varint()];
+    shapes[i] = keys;
+  }
+
+  function value() {
+    const tag = varint();
+    if (tag >= BUNDLE_TAG.STRING) return strings[tag - BUNDLE_TAG.STRING];
+    switch (tag) {
+      case BUNDLE_TAG.DICT: {
+        const keys = shapes[varint()];
+        const obj = {};
+        for (let k = 0; k < keys.length; k++) obj[keys[k]] = value();
+        return obj;
+      }
+      case BUNDLE_TAG.LIST: {
+        const list = new Array(varint());
+        for (let i = 0; i < list.length; i++) list[i] = value();
+        return list;
+      }
+      case BUNDLE_TAG.NULL: return null;
+      case BUNDLE_TAG.FALSE: return false;
+      case BUNDLE_TAG.TRUE: return true;
+      case BUNDLE_TAG.INT: return zigzag();
+      case BUNDLE_TAG.FLOAT:
+        pos += 8;
+        return view.getFloat64(pos - 8, true);
+      default:
+        throw new Error('Corrupt fact bundle: tag ' + tag);
+    }
+  }
+
+  return value();
+}
+
+// Fetch a bundle (plain or gzip; brotli is not supported by DecompressionStream) and decode it
+async function fetchFactBundle(url) {
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error('Failed to fetch bundle ' + url);
+  }
+  let bytes = new Uint8Array(await response.arrayBuffer());
+  if (bytes[0] === 0x1f && bytes[1] === 0x8b) {
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+    bytes = new Uint8Array(await new Response(stream).arrayBuffer());
+  }
+  return decodeFactBundle(bytes);
+}
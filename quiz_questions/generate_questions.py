@@ -1,16 +1,35 @@
+import re
 import json
-import glob
 import os
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import openai
- 
+
 URL_ENDPOINT = ""
 
 client = ""
+
+MODEL = "gpt-4o"
+TEMPERATURE = 0.7
+MAX_TOKENS = 1000
+MAX_WORKERS = 4
+CORPUS_MANIFEST = "json/corpus.json"  # Lists every topic output (see data_pipeline/corpus_manifest.py)
+OUTPUT_DIR = "./quiz_questions"
+CACHE_DIR = "./quiz_questions/.cache"
+QUIZ_LANGUAGES = ['ru', 'fr', 'zh']
+
+SYSTEM_PROMPT = "You are an assistant generating quiz questions from provided facts."
+PROMPT_TEMPLATE = "Given the provided facts about {topic} sourced from Russian (ru), French (fr), and Chinese (zh) Wikipedia articles, perform the following tasks:\n\n1. Select 13 facts that highlight significant, interesting, and culturally relevant aspects of {topic}. Each language (ru, fr, zh) should contribute at least one selected fact.\n\n2. Create 10 multiple-choice quiz questions based on these selected facts. Questions should test readers' knowledge acquisition and deepen their cultural understanding, emphasizing meaningful and culturally insightful aspects rather than trivial or overly technical details (e.g., pronunciation guides in IPA should be avoided).\n\n- Questions must be written clearly and concisely in English.\n- Provide exactly four answer options (A, B, C, D) for each question.\n- Ensure the correct answer is explicitly inferable from the provided translated facts.\n\nFormat your output exactly as shown in the example below:\n\n**Question:** Which type of oolong tea is known for having the weakest degree of fermentation?\nOptions:\nA. Da Hong Pao\nB. Wen Shan Bao Zhong\nC. Tie Guan Yin\nD. Dong Ding Oolong\n\nAnswer: B. Wen Shan Bao Zhong"
+
+
 def extract_facts(filename, topic):
     with open(filename, 'r', encoding='utf-8') as file:
         data = json.load(file)
 
     results = {}
+    if topic not in data:
+        return results
     languages = data[topic]["languages"]
 
     for lang, lang_content in languages.items():
@@ -31,54 +50,184 @@ def extract_facts(filename, topic):
 
     return results
 
-def generate_quiz_questions(topic, facts_by_language):
-    prompt = f"Given the provided facts about {topic} sourced from Russian (ru), French (fr), and Chinese (zh) Wikipedia articles, perform the following tasks:\n\n1. Select 13 facts that highlight significant, interesting, and culturally relevant aspects of {topic}. Each language (ru, fr, zh) should contribute at least one selected fact.\n\n2. Create 10 multiple-choice quiz questions based on these selected facts. Questions should test readers' knowledge acquisition and deepen their cultural understanding, emphasizing meaningful and culturally insightful aspects rather than trivial or overly technical details (e.g., pronunciation guides in IPA should be avoided).\n\n- Questions must be written clearly and concisely in English.\n- Provide exactly four answer options (A, B, C, D) for each question.\n- Ensure the correct answer is explicitly inferable from the provided translated facts.\n\nFormat your output exactly as shown in the example below:\n\n**Question:** Which type of oolong tea is known for having the weakest degree of fermentation?\nOptions:\nA. Da Hong Pao\nB. Wen Shan Bao Zhong\nC. Tie Guan Yin\nD. Dong Ding Oolong\n\nAnswer: B. Wen Shan Bao Zhong"
 
-    for lang in ['ru', 'fr', 'zh']:
+def corpus_topics(manifest_path=CORPUS_MANIFEST):
+    """
+    {topic: (key, [topic JSON paths])} for every topic in the corpus manifest: one path,
+    or one per language shard. Copies, match/search indexes and the manifest itself are
+    never picked up, since only real topic outputs are listed there.
+    """
+    json_dir = os.path.dirname(manifest_path)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    topics = {}
+    for topic, entry in manifest["topics"].items():
+        files = [entry["file"]] if entry.get("file") else list(entry.get("shards", {}).values())
+        topics[topic] = (entry.get("key", topic), [os.path.join(json_dir, file) for file in files])
+    return topics
+
+
+def build_prompt(topic, facts_by_language):
+    parts = [PROMPT_TEMPLATE.format(topic=topic)]
+    for lang in QUIZ_LANGUAGES:
         facts = facts_by_language.get(lang, [])
-        prompt += f"\n{lang} Facts:\n"
-        for idx, fact in enumerate(facts, 1):
-            prompt += f"{idx}. Translated Fact: {fact['translated']}\n"
-            # prompt += f"Source Context: {fact['src_context']}\n"
+        parts.append(f"\n{lang} Facts:\n")
+        parts.extend(f"{idx}. Translated Fact: {fact['translated']}\n" for idx, fact in enumerate(facts, 1))
+    return "".join(parts)
+
+
+def quiz_cache_key(topic, facts_by_language, model=MODEL, temperature=TEMPERATURE):
+    """Hash of everything that determines the model's answer."""
+    facts = {lang: [fact['translated'] for fact in facts_by_language.get(lang, [])] for lang in QUIZ_LANGUAGES}
+    payload = json.dumps(
+        {
+            "topic": topic,
+            "facts": facts,
+            "system": SYSTEM_PROMPT,
+            "template": PROMPT_TEMPLATE,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": MAX_TOKENS,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def generate_quiz_questions(topic, facts_by_language, model=MODEL, temperature=TEMPERATURE):
+    prompt = build_prompt(topic, facts_by_language)
 
     response = client.chat.completions.create(
-        model="gpt-4o",
+        model=model,
         messages=[
-            {"role": "system", "content": "You are an assistant generating quiz questions from provided facts."},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
-        temperature=0.7,
-        max_tokens=1000
+        temperature=temperature,
+        max_tokens=MAX_TOKENS
     )
-    print(prompt)
-    print("\n\n")
-    print(response.choices[0].message.content.strip())
     return response.choices[0].message.content.strip()
 
-def main():
-    folder_path = 'data_pipeline/wikigap_data/json/'
-    json_files = glob.glob(os.path.join(folder_path, 'Paella.json'))
 
-    all_topics_facts = {}
+def cached_quiz_questions(topic, facts_by_language, model=MODEL, temperature=TEMPERATURE, cache_dir=CACHE_DIR):
+    """Return (raw_quiz_text, from_cache); only calls the model when the inputs changed."""
+    key = quiz_cache_key(topic, facts_by_language, model, temperature)
+    cache_path = os.path.join(cache_dir, f"{key}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)["response"], True
+
+    text = generate_quiz_questions(topic, facts_by_language, model, temperature)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"topic": topic, "model": model, "temperature": temperature, "response": text}, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    return text, False
+
+
+# ---------------------------
+# Parsing the model's free text
+# ---------------------------
+_QUESTION = re.compile(r"^(?:\d+[.)]\s*)?Question:?\s*(.+)$|^\d+[.)]\s*(.+)$", re.IGNORECASE)
+_OPTION = re.compile(r"^\(?([A-D])[.)]\s+(.+)$", re.IGNORECASE)
+_ANSWER = re.compile(r"^Answer:?\s*\(?([A-D])[.)]?\s*(.*)$", re.IGNORECASE)
+
+
+def parse_quiz(text):
+    """
+    Turn the model's quiz text into
+      [{"question": str, "options": {"A": str, ...}, "answer": "B", "answer_text": str}, ...]
+    Tolerates the formatting variations seen in practice (numbering, bullets, bold markers,
+    lower-case option letters).
+    """
+    questions = []
+    current = None
+    for raw_line in text.splitlines():
+        line = raw_line.replace("**", "").strip().lstrip("-•").strip()
+        if not line or re.match(r"^Options:?$", line, re.IGNORECASE):
+            continue
+
+        answer = _ANSWER.match(line)
+        if answer and current is not None:
+            letter = answer.group(1).upper()
+            current["answer"] = letter
+            current["answer_text"] = answer.group(2).strip() or current["options"].get(letter, "")
+            continue
+
+        option = _OPTION.match(line)
+        if option and current is not None and "answer" not in current:
+            current["options"][option.group(1).upper()] = option.group(2).strip()
+            continue
+
+        question = _QUESTION.match(line)
+        if question:
+            current = {"question": (question.group(1) or question.group(2)).strip(), "options": {}}
+            questions.append(current)
+
+    return [q for q in questions if q["options"]]
+
+
+def process_topic(topic, key, file_paths, model=MODEL, temperature=TEMPERATURE):
+    facts_by_language = {}
+    for file_path in file_paths:
+        facts_by_language.update(extract_facts(file_path, key))
+    if not facts_by_language:
+        return topic, facts_by_language, None, False
+
+    raw, from_cache = cached_quiz_questions(topic, facts_by_language, model, temperature)
+    quiz = {
+        "topic": topic,
+        "model": model,
+        "temperature": temperature,
+        "questions": parse_quiz(raw),
+        "raw": raw,
+    }
+    with open(os.path.join(OUTPUT_DIR, f'quiz_{topic}.json'), 'w', encoding='utf-8') as quiz_file:
+        json.dump(quiz, quiz_file, indent=4, ensure_ascii=False)
+    return topic, facts_by_language, quiz, from_cache
 
-    with open('extracted_facts.txt', 'w', encoding='utf-8') as out_file:
-        for file_path in json_files:
-            topic = os.path.splitext(os.path.basename(file_path))[0]
-            out_file.write(f"\n=== Topic: {topic} ===\n")
-            print(f"\nProcessing topic: {topic}")
-            facts_by_language = extract_facts(file_path, topic)
-            all_topics_facts[topic] = facts_by_language
 
-            # GPT call for generating quiz questions
-            print(f"Generating quiz questions for topic: {topic}")
-            quiz_questions = generate_quiz_questions(topic, facts_by_language)
+def main():
+    parser = argparse.ArgumentParser(description="Generate quiz questions for the topics in the corpus manifest")
+    parser.add_argument("topics", nargs="*", help="Only these topics (default: every topic in the manifest)")
+    parser.add_argument("--manifest", default=CORPUS_MANIFEST)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE)
+    args = parser.parse_args()
+
+    topics = corpus_topics(args.manifest)
+    for topic in args.topics:
+        if topic not in topics:
+            print(f"Skipping {topic}: not in {args.manifest}.")
+    if args.topics:
+        topics = {topic: topics[topic] for topic in args.topics if topic in topics}
+    all_topics_facts = {}
 
-            # Saving generated quiz questions to a file
-            with open(f'./quiz_questions/quiz_{topic}.txt', 'w', encoding='utf-8') as quiz_file:
-                quiz_file.write(quiz_questions)
-            print(f"Quiz questions for {topic} saved successfully.")
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(process_topic, topic, key, paths, args.model, args.temperature): topic
+            for topic, (key, paths) in sorted(topics.items())
+        }
+        for future in as_completed(futures):
+            try:
+                topic, facts_by_language, quiz, from_cache = future.result()
+            except Exception as e:
+                print(f"Quiz generation failed for {futures[future]}: {e}")
+                continue
+            if quiz is None:
+                print(f"Skipping {futures[future]}: no facts for its topic key.")
+                continue
+            all_topics_facts[topic] = facts_by_language
+            source = "cache" if from_cache else args.model
+            print(f"Quiz questions for {topic} saved successfully ({len(quiz['questions'])} questions, {source}).")
 
-            for lang, facts in facts_by_language.items():
+    with open('extracted_facts.txt', 'w', encoding='utf-8') as out_file:
+        for topic in sorted(all_topics_facts):
+            out_file.write(f"\n=== Topic: {topic} ===\n")
+            for lang, facts in all_topics_facts[topic].items():
                 out_file.write(f"\n-- Language: {lang} --\n")
                 for idx, fact in enumerate(facts, start=1):
                     out_file.write(f"\nFact #{idx}:\n")